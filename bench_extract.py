@@ -0,0 +1,797 @@
+"""
+抽出パスのオフラインベンチマーク（bench_corpus/ の記録済みページを使う）
+
+  python bench_extract.py                    # micro + e2e をまとめて実行
+  python bench_extract.py micro -r 7         # 関数単位（パース・本文抽出・キーワード判定・プロンプト生成…）
+  python bench_extract.py e2e --source dvb   # collect → enqueue を通しで（ローカルHTTPサーバ経由）
+  python bench_extract.py micro --json after.json --compare before.json
+  python bench_extract.py record irrawaddy https://www.irrawaddy.com/news/burma/xxx.html
+
+ネットワークも Gemini も使わない（record のみ実サイトへ取りに行く）。
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unicodedata
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.getenv("BENCH_CORPUS", os.path.join(HERE, "bench_corpus"))
+SOURCES = ["mizzima", "bbc", "irrawaddy", "khit_thit", "dvb"]
+BASE_PLACEHOLDER = "{{BASE}}"
+
+# 各ソースのベースURLを差し替える環境変数（BBC は RSS の URL ごと差し替え）
+BASE_URL_ENV = {
+    "mizzima": "MIZZIMA_BASE_URL",
+    "irrawaddy": "IRRAWADDY_BASE_URL",
+    "khit_thit": "KHIT_THIT_BASE_URL",
+    "dvb": "DVB_BASE_URL",
+}
+# record 時に {{BASE}} に置き換える実サイトのオリジン
+LIVE_ORIGINS = {
+    "mizzima": "https://bur.mizzima.com",
+    "bbc": "https://www.bbc.com",
+    "irrawaddy": "https://www.irrawaddy.com",
+    "khit_thit": "https://yktnews.com",
+    "dvb": "https://burmese.dvb.no",
+}
+
+
+def peak_rss_mb() -> float:
+    # Linux は KB、macOS は bytes
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return r / (1024 * 1024) if sys.platform == "darwin" else r / 1024
+
+
+# ===== コーパス =====
+def load_corpus(sources=None):
+    corpus = {}
+    for src in sources or SOURCES:
+        manifest = os.path.join(CORPUS_DIR, src, "pages.json")
+        if not os.path.exists(manifest):
+            continue
+        with open(manifest, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        for page in meta["pages"]:
+            with open(os.path.join(CORPUS_DIR, src, page["file"]), "rb") as f:
+                page["raw"] = f.read()
+        corpus[src] = meta
+    return corpus
+
+
+def corpus_pages(corpus, kind=None, source=None):
+    for src, meta in corpus.items():
+        if source and src != source:
+            continue
+        for page in meta["pages"]:
+            if kind is None or page["kind"] == kind:
+                yield src, page
+
+
+def load_model_outputs():
+    path = os.path.join(CORPUS_DIR, "gemini", "outputs.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [b.strip() for b in f.read().split("\n---\n") if b.strip()]
+
+
+# ===== ローカル配信（ソースごとに1ポート。パスが衝突するため） =====
+class CorpusServer:
+    """
+    pages.json の path → file を返す。{{BASE}} は自分のURLに置換。
+    未登録パスは空ページ（200）を返す：未収録カテゴリや /page/N/ で
+    フェッチャのリトライ待ちが走ってベンチが歪むのを避けるため。
+    """
+
+    EMPTY = b"<!DOCTYPE html><html><head><title></title></head><body></body></html>"
+
+    def __init__(self, meta):
+        self.routes = {}
+        self.hits = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                key = urllib.parse.unquote(self.path)
+                body, ctype = server.routes.get(key, (server.EMPTY, "text/html"))
+                with server._lock:
+                    server.hits += 1
+                    server.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        for page in meta["pages"]:
+            body = page["raw"].replace(BASE_PLACEHOLDER.encode(), self.base.encode())
+            self.routes[urllib.parse.unquote(page["path"])] = (
+                body,
+                page.get("content_type", "text/html"),
+            )
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def reset_counters(self):
+        with self._lock:
+            self.hits = 0
+            self.bytes_sent = 0
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def import_pipeline(servers=None, state_dir=None):
+    """
+    fetch_articles は import 時に環境変数（ベースURL等）を読むので、先に差し替えてから import する。
+    状態ファイル・要約キャッシュ・WP REST 探索・BBC の差分取得は切ってコーパスの HTML を毎回通す。
+    """
+    env = {
+        "WP_DISCOVERY": "0",
+        "BBC_INCREMENTAL": "0",
+        "SUMMARY_CACHE": "0",
+        "DIGEST_STATE_DIR": state_dir or tempfile.mkdtemp(prefix="bench_state_"),
+    }
+    for src, srv in (servers or {}).items():
+        if src == "bbc":
+            env["BBC_RSS_URL"] = f"{srv.base}/rss.xml"
+        elif src in BASE_URL_ENV:
+            env[BASE_URL_ENV[src]] = srv.base
+    os.environ.update(env)
+    sys.path.insert(0, HERE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import fetch_articles
+    return fetch_articles
+
+
+# ===== 計測 =====
+def run_timed(fn, inputs, *, rounds, setup=None, min_round_s=0.05, mem=False):
+    """
+    inputs の各要素で fn を呼ぶのを1ラウンドとして rounds 回計測する。
+    setup() があればラウンドごとに入力を作り直す（soup を壊す抽出器向け、計測外）。
+    速い関数はラウンド内で繰り返して min_round_s 以上にする。
+    """
+    args = setup() if setup else inputs
+    t0 = time.perf_counter()
+    for a in args:
+        fn(a)
+    once = time.perf_counter() - t0
+    reps = 1 if setup else max(1, int(min_round_s / max(once, 1e-9)))
+
+    times = []
+    mem_peak = None
+    for r in range(rounds):
+        args = setup() if setup else inputs
+        gc.collect()
+        if mem and r == 0:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            for a in args:
+                fn(a)
+        times.append((time.perf_counter() - t0) / reps)
+        if mem and r == 0:
+            mem_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return times, mem_peak
+
+
+# ===== ルールエンジン（EXTRACT_RULES）導入前の抽出器：比較用にそのまま残す =====
+_LEGACY_EXCLUDED_CLASSES = {
+    "jnews_inline_related_post",
+    "jeg_postblock_21",
+    "widget",
+    "widget_jnews_popular",
+    "jeg_postblock_5",
+    "jnews_related_post_container",
+    "widget widget_jnews_popular",
+    "jeg_footer_primary clearfix",
+}
+_LEGACY_BBC_EXCLUDE_SELECTOR = ", ".join(
+    [
+        'section[role="region"][aria-labelledby="article-byline"]',
+        'section[data-e2e="recommendations-heading"][role="region"]',
+        'header[role="banner"]',
+        'nav[role="navigation"]',
+        'footer[role="contentinfo"]',
+        "aside",
+    ]
+)
+_LEGACY_HASHTAG_RE = re.compile(r"(?:(?<=\s)|^)\#[^\s#]+")
+
+
+def legacy_extract_body_generic_from_soup(soup):
+    for sel in ["div.entry-content p", "div.node-content p", "article p"]:
+        ps = soup.select(sel)
+        if ps:
+            break
+    else:
+        ps = soup.find_all("p")
+    txts = [p.get_text(strip=True) for p in ps if p.get_text(strip=True)]
+    return "\n".join(txts).strip()
+
+
+def legacy_extract_body_irrawaddy(soup):
+    # 段落ごとに祖先を全部たどる
+    def _is_excluded_by_ancestor(node):
+        for anc in node.parents:
+            if any(c in _LEGACY_EXCLUDED_CLASSES for c in anc.get("class", [])):
+                return True
+        return False
+
+    paragraphs = []
+    content_inners = soup.select("div.content-inner")
+    if not content_inners:
+        content_inners = [
+            div
+            for div in soup.find_all("div")
+            if "content-inner" in (div.get("class") or [])
+        ]
+    for root in content_inners:
+        for p in root.find_all("p"):
+            if _is_excluded_by_ancestor(p):
+                continue
+            txt = p.get_text(strip=True)
+            if txt:
+                paragraphs.append(unicodedata.normalize("NFC", txt))
+    return "\n".join(paragraphs).strip()
+
+
+def legacy_extract_body_mizzima(content_div):
+    # 段落ごとに文書の先頭まで後ろ向きに「Related Posts」を探す
+    paragraphs = []
+    for p in content_div.find_all("p"):
+        if p.find_previous("h2", string=re.compile("Related Posts", re.I)):
+            break
+        paragraphs.append(p)
+    body_text = "\n".join(p.get_text(strip=True) for p in paragraphs)
+    return unicodedata.normalize("NFC", body_text)
+
+
+def legacy_extract_body_bbc(soup):
+    """※ soup を破壊的に変更する"""
+    for node in soup.select(_LEGACY_BBC_EXCLUDE_SELECTOR):
+        node.decompose()
+    main = soup.select_one('main[role="main"]') or soup
+    paragraphs = [p.get_text(strip=True) for p in main.find_all("p")]
+    return "\n".join(t for t in paragraphs if t)
+
+
+def legacy_extract_body_khit_thit(soup_article):
+    """※ soup を破壊的に変更する（段落が無ければ変わらない soup で待って再試行していた）"""
+    for a in soup_article.select("a"):
+        if a.get_text(strip=True).startswith("#"):
+            a.decompose()
+    paragraphs = []
+    for _ in range(3):
+        paragraphs = soup_article.select("div.entry-content p")
+        if not paragraphs:
+            paragraphs = soup_article.select("div.node-content p")
+        if not paragraphs:
+            paragraphs = soup_article.select("article p")
+        if not paragraphs:
+            paragraphs = soup_article.find_all("p")
+        if paragraphs:
+            break
+        time.sleep(2)
+    body_text = "\n".join(
+        _LEGACY_HASHTAG_RE.sub("", p.get_text(strip=True)).strip()
+        for p in paragraphs
+        if p.get_text(strip=True)
+    )
+    return unicodedata.normalize("NFC", body_text)
+
+
+def legacy_extract_body_dvb(soup):
+    host = soup.select_one(".full_content")
+    if not host:
+        return ""
+    parts = []
+    for p in host.select("p"):
+        txt = re.sub(r"\s+", " ", p.get_text(" ", strip=True))
+        if txt:
+            parts.append(txt)
+    return "\n".join(parts).strip()
+
+
+def extractor_pairs(fa):
+    """(source, 入力の作り方, 新, 旧, soup を壊すか)"""
+
+    def _mizzima_div(soup):
+        return soup.find("div", class_="entry-content")
+
+    whole = None
+    return [
+        (
+            "mizzima",
+            _mizzima_div,
+            fa.extract_body_mizzima,
+            legacy_extract_body_mizzima,
+            False,
+        ),
+        ("bbc", whole, fa.extract_body_bbc, legacy_extract_body_bbc, True),
+        (
+            "khit_thit",
+            whole,
+            fa.extract_body_khit_thit,
+            legacy_extract_body_khit_thit,
+            True,
+        ),
+        (
+            "khit_thit",
+            whole,
+            fa.extract_body_generic_from_soup,
+            legacy_extract_body_generic_from_soup,
+            False,
+        ),
+        (
+            "irrawaddy",
+            whole,
+            fa.extract_body_irrawaddy,
+            legacy_extract_body_irrawaddy,
+            False,
+        ),
+        ("dvb", whole, fa.extract_body_dvb, legacy_extract_body_dvb, False),
+    ]
+
+
+def compare_extractors(fa, corpus, parser="html.parser"):
+    """新旧の抽出結果をページごとに突き合わせる（空行の有無は区別しない）"""
+
+    def _lines(text):
+        return [x for x in (text or "").splitlines() if x.strip()]
+
+    rows = []
+    for src, prep, new_fn, old_fn, _ in extractor_pairs(fa):
+        pages = [p for _, p in corpus_pages(corpus, "article", src)]
+        if not pages:
+            continue
+        same, diffs = 0, []
+        for page in pages:
+            new_in = fa.make_soup(page["raw"], parser)
+            old_in = fa.make_soup(page["raw"], parser)
+            if prep:
+                new_in, old_in = prep(new_in), prep(old_in)
+            new, old = _lines(new_fn(new_in)), _lines(old_fn(old_in))
+            if new == old:
+                same += 1
+            else:
+                diffs.append(page["path"])
+        rows.append(
+            {
+                "name": f"{src}:{new_fn.__name__}",
+                "pages": len(pages),
+                "same": same,
+                "diff": diffs,
+            }
+        )
+    return rows
+
+
+def micro_cases(fa, corpus, parser="html.parser"):
+    """(name, fn, inputs, bytes_per_round, setup) を返す"""
+    cases = []
+
+    def soups(source, kind="article"):
+        return [
+            fa.make_soup(p["raw"], parser)
+            for _, p in corpus_pages(corpus, kind, source)
+        ]
+
+    all_pages = [p["raw"] for _, p in corpus_pages(corpus) if p["kind"] != "rss"]
+    cases.append(
+        (
+            f"parse[{parser}]",
+            lambda raw: fa.make_soup(raw, parser),
+            all_pages,
+            sum(map(len, all_pages)),
+            None,
+        )
+    )
+    try:
+        import lxml  # noqa: F401
+
+        if parser != "lxml":
+            cases.append(
+                (
+                    "parse[lxml]",
+                    lambda raw: fa.make_soup(raw, "lxml"),
+                    all_pages,
+                    sum(map(len, all_pages)),
+                    None,
+                )
+            )
+    except ImportError:
+        pass
+
+    def raw_of(source):
+        return [p["raw"] for _, p in corpus_pages(corpus, "article", source)]
+
+    # 本文抽出：ルールエンジン版と導入前の版（legacy:）を同じページで
+    for src, prep, new_fn, old_fn, mutates in extractor_pairs(fa):
+        if src not in corpus:
+            continue
+        nbytes = sum(map(len, raw_of(src)))
+        for label, fn in (
+            (new_fn.__name__, new_fn),
+            (f"legacy:{new_fn.__name__}", old_fn),
+        ):
+
+            def _inputs(src=src, prep=prep):
+                return [prep(x) if prep else x for x in soups(src)]
+
+            if mutates and fn is old_fn:
+                # decompose するので毎回パースし直す
+                cases.append((f"{src}:{label}", fn, None, nbytes, _inputs))
+            else:
+                cases.append((f"{src}:{label}", fn, _inputs(), nbytes, None))
+    # 解析プールに渡す単位（bytes → 抽出結果。プールを使わずその場で）
+    article_pages = [
+        (src, p["raw"]) for src, p in corpus_pages(corpus, "article") if src != "bbc"
+    ]
+    if article_pages:
+        cases.append(
+            (
+                "parse_page",
+                lambda sp: fa.parse_page(sp[1], sp[0]),
+                article_pages,
+                sum(len(raw) for _, raw in article_pages),
+                None,
+            )
+        )
+    for src in corpus:
+        if src in fa.EXTRACTORS:
+            cases.append(
+                (
+                    f"{src}:extract_record",
+                    lambda soup, src=src: fa.extract_record(soup, src),
+                    soups(src),
+                    sum(map(len, raw_of(src))),
+                    None,
+                )
+            )
+
+    # キーワード判定・プロンプト生成用に (title, body) を作る（汎用抽出器で十分）
+    items = []
+    for src, page in corpus_pages(corpus, "article"):
+        soup = fa.make_soup(page["raw"], parser)
+        items.append(
+            {
+                "source": src,
+                "url": page["path"],
+                "title": fa._extract_title(soup) or "",
+                "body": fa.extract_body_generic_from_soup(soup),
+            }
+        )
+    if items:
+        text_bytes = sum(len((i["title"] + i["body"]).encode()) for i in items)
+        cases.append(
+            (
+                "any_keyword_hit",
+                lambda it: fa.any_keyword_hit(it["title"], it["body"]),
+                items,
+                text_bytes,
+                None,
+            )
+        )
+        cases.append(
+            (
+                "build_prompt",
+                lambda it: fa.build_prompt(
+                    it,
+                    skip_filters=(it["source"] == "irrawaddy"),
+                    body_max=fa.BODY_MAX_CHARS,
+                ),
+                items,
+                text_bytes,
+                None,
+            )
+        )
+
+    outputs = [o.splitlines() for o in load_model_outputs()]
+    if outputs:
+        cases.append(
+            (
+                "_cut_ultra_block",
+                fa._cut_ultra_block,
+                outputs,
+                sum(len("\n".join(o).encode()) for o in outputs),
+                None,
+            )
+        )
+    return cases
+
+
+def bench_micro(fa, corpus, *, rounds=5, mem=False, parser="html.parser", only=None):
+    rows = []
+    for name, fn, inputs, nbytes, setup in micro_cases(fa, corpus, parser):
+        if only and not any(o in name for o in only):
+            continue
+        # 抽出器のログ（本文が空でリトライ等）はベンチ出力に混ぜない
+        with contextlib.redirect_stdout(io.StringIO()):
+            times, mem_peak = run_timed(fn, inputs, rounds=rounds, setup=setup, mem=mem)
+        n = len(setup() if setup else inputs)
+        best = min(times)
+        rows.append(
+            {
+                "name": name,
+                "calls": n,
+                "best_ms": best * 1000,
+                "median_ms": statistics.median(times) * 1000,
+                "us_per_call": best / n * 1e6,
+                "calls_per_s": n / best,
+                "mb_per_s": (nbytes / (1024 * 1024)) / best if nbytes else None,
+                "tracemalloc_peak_kb": (mem_peak / 1024) if mem_peak else None,
+                "rss_peak_mb": peak_rss_mb(),
+            }
+        )
+    return rows
+
+
+def bench_e2e(fa, corpus, servers, *, rounds=3, only_sources=None):
+    """collect → enqueue をソースごとに通しで計測（HTTP はローカルサーバ）"""
+    rows = []
+    for spec in fa.SOURCE_SPECS:
+        src = spec["key"]
+        if src not in servers or (only_sources and src not in only_sources):
+            continue
+        target = fa.date.fromisoformat(corpus[src]["date"])
+        expect = corpus[src].get("expect") or {}
+        best = None
+        for _ in range(rounds):
+            srv = servers[src]
+            srv.reset_counters()
+            gc.collect()
+            queue = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                articles = spec["collect"](target, 1)
+                t1 = time.perf_counter()
+                fa.process_and_enqueue_articles(
+                    articles, spec["name"], set(), queue=queue, **spec["enqueue"]
+                )
+                t2 = time.perf_counter()
+            run = {
+                "name": f"e2e:{src}",
+                "collect_s": t1 - t0,
+                "enqueue_s": t2 - t1,
+                "total_s": t2 - t0,
+                "requests": srv.hits,
+                "bytes": srv.bytes_sent,
+                "pages_per_s": srv.hits / (t2 - t0),
+                "collected": len(articles),
+                "queued": len(queue),
+            }
+            if best is None or run["total_s"] < best["total_s"]:
+                best = run
+        best["rss_peak_mb"] = peak_rss_mb()
+        # コーパスの期待件数とずれたら抽出ロジックかコーパスが壊れている
+        mismatch = {k: (v, best.get(k)) for k, v in expect.items() if best.get(k) != v}
+        best["expect_mismatch"] = mismatch or None
+        rows.append(best)
+    return rows
+
+
+# ===== 表示・比較 =====
+def _fmt(v, spec):
+    return format(v, spec) if isinstance(v, (int, float)) else "-"
+
+
+def print_micro(rows, baseline=None):
+    base = {r["name"]: r for r in (baseline or {}).get("micro", [])}
+    print(
+        f"{'micro':<42} {'calls':>5} {'us/call':>10} {'calls/s':>10} "
+        f"{'MB/s':>8} {'heap KB':>9} {'RSS MB':>7}  {'vs base':>8}"
+    )
+    for r in rows:
+        delta = ""
+        if r["name"] in base:
+            delta = (
+                f"{(r['us_per_call'] / base[r['name']]['us_per_call'] - 1) * 100:+.1f}%"
+            )
+        print(
+            f"{r['name']:<42} {r['calls']:>5} {_fmt(r['us_per_call'], '10.1f')} "
+            f"{_fmt(r['calls_per_s'], '10.1f')} {_fmt(r['mb_per_s'], '8.2f')} "
+            f"{_fmt(r['tracemalloc_peak_kb'], '9.0f')} {_fmt(r['rss_peak_mb'], '7.1f')}  {delta:>8}"
+        )
+
+
+def print_agreement(rows):
+    print(f"{'extractor agreement (rules vs legacy)':<42} {'pages':>5} {'same':>5}")
+    for r in rows:
+        print(f"{r['name']:<42} {r['pages']:>5} {r['same']:>5}")
+        for path in r["diff"]:
+            print(f"  ⚠️ differs: {path}")
+
+
+def print_e2e(rows, baseline=None):
+    base = {r["name"]: r for r in (baseline or {}).get("e2e", [])}
+    print(
+        f"{'e2e':<16} {'collect s':>9} {'enqueue s':>9} {'req':>5} {'pages/s':>8} "
+        f"{'KB':>7} {'coll':>5} {'queued':>6} {'RSS MB':>7}  {'vs base':>8}"
+    )
+    for r in rows:
+        delta = ""
+        if r["name"] in base:
+            delta = f"{(r['total_s'] / base[r['name']]['total_s'] - 1) * 100:+.1f}%"
+        print(
+            f"{r['name']:<16} {r['collect_s']:>9.3f} {r['enqueue_s']:>9.3f} {r['requests']:>5} "
+            f"{r['pages_per_s']:>8.1f} {r['bytes'] / 1024:>7.0f} {r['collected']:>5} "
+            f"{r['queued']:>6} {r['rss_peak_mb']:>7.1f}  {delta:>8}"
+        )
+        if r.get("expect_mismatch"):
+            print(f"  ⚠️ expected vs actual: {r['expect_mismatch']}")
+
+
+# ===== record：実サイトのページをコーパスに追加 =====
+def record_page(source, url, kind, path=None):
+    fa = import_pipeline()
+    if source == "irrawaddy":
+        res = fa.fetch_with_retry_irrawaddy(url)
+    elif source == "dvb":
+        res = fa.fetch_with_retry_dvb(url)
+    else:
+        res = fa.fetch_with_retry(url)
+
+    origin = LIVE_ORIGINS[source]
+    text = res.content.decode("utf-8", errors="replace")
+    text = text.replace(origin, BASE_PLACEHOLDER)
+    if path is None:
+        parsed = urllib.parse.urlparse(url)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+    src_dir = os.path.join(CORPUS_DIR, source)
+    os.makedirs(src_dir, exist_ok=True)
+    manifest_path = os.path.join(src_dir, "pages.json")
+    meta = {"date": fa.get_today_date_mmt().isoformat(), "pages": []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    meta["pages"] = [p for p in meta["pages"] if p["path"] != path]
+    ext = "xml" if kind == "rss" else "html"
+    n = sum(1 for p in meta["pages"] if p["kind"] == kind) + 1
+    fname = f"{kind}_rec{n}.{ext}"
+    with open(os.path.join(src_dir, fname), "w", encoding="utf-8") as f:
+        f.write(text)
+    meta["pages"].append(
+        {
+            "path": path,
+            "file": fname,
+            "kind": kind,
+            "content_type": res.headers.get("Content-Type", "text/html"),
+        }
+    )
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    print(f"📝 recorded {url} → {source}/{fname} ({len(text)} chars, path={path})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command")
+
+    def _common(p):
+        p.add_argument("-r", "--rounds", type=int, default=5)
+        p.add_argument("--source", action="append", choices=SOURCES)
+        p.add_argument("--json", help="結果を JSON で保存")
+        p.add_argument("--compare", help="以前の --json 出力と比較")
+
+    p_all = sub.add_parser("all", help="micro + e2e（既定）")
+    _common(p_all)
+    p_micro = sub.add_parser("micro", help="関数単位")
+    _common(p_micro)
+    for p in (p_all, p_micro):
+        p.add_argument(
+            "--mem", action="store_true", help="tracemalloc でヒープ最大値も測る"
+        )
+        p.add_argument("--parser", default="html.parser")
+        p.add_argument("--only", action="append", help="名前に含まれる文字列で絞る")
+    p_e2e = sub.add_parser("e2e", help="collect → enqueue")
+    _common(p_e2e)
+
+    p_rec = sub.add_parser("record", help="実サイトのページをコーパスに追加")
+    p_rec.add_argument("source", choices=SOURCES)
+    p_rec.add_argument("url")
+    p_rec.add_argument(
+        "--kind", default="article", choices=["article", "listing", "rss"]
+    )
+    p_rec.add_argument("--path", help="配信パス（既定: URL のパス）")
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # サブコマンド省略時は all（python bench_extract.py -r 3 など）
+    if not argv or argv[0] not in sub.choices and argv[0] not in ("-h", "--help"):
+        argv = ["all", *argv]
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        record_page(args.source, args.url, args.kind, args.path)
+        return 0
+
+    corpus = load_corpus(args.source)
+    if not corpus:
+        print(f"corpus not found: {CORPUS_DIR}", file=sys.stderr)
+        return 1
+
+    servers = {}
+    if args.command in ("all", "e2e"):
+        servers = {src: CorpusServer(meta) for src, meta in corpus.items()}
+    fa = import_pipeline(servers)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    n_pages = sum(len(m["pages"]) for m in corpus.values())
+    n_bytes = sum(len(p["raw"]) for _, p in corpus_pages(corpus))
+    print(
+        f"corpus: {len(corpus)} sources / {n_pages} pages / {n_bytes / 1024:.0f} KB "
+        f"| python {platform.python_version()} | rounds={args.rounds}"
+    )
+
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "pages": n_pages,
+            "bytes": n_bytes,
+        }
+    }
+    try:
+        if args.command in ("all", "micro"):
+            result["micro"] = bench_micro(
+                fa,
+                corpus,
+                rounds=args.rounds,
+                mem=args.mem,
+                parser=args.parser,
+                only=args.only,
+            )
+            print_micro(result["micro"], baseline)
+            result["agreement"] = compare_extractors(fa, corpus, parser=args.parser)
+            print_agreement(result["agreement"])
+        if args.command in ("all", "e2e"):
+            result["e2e"] = bench_e2e(
+                fa, corpus, servers, rounds=max(1, min(args.rounds, 3))
+            )
+            print_e2e(result["e2e"], baseline)
+    finally:
+        for srv in servers.values():
+            srv.close()
+
+    result["meta"]["rss_peak_mb"] = peak_rss_mb()
+    print(f"peak RSS: {result['meta']['rss_peak_mb']:.1f} MB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"📝 saved → {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
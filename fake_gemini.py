@@ -0,0 +1,724 @@
+"""
+Gemini のローカル代役（負荷試験・障害注入用）
+
+  # 1) プロセス内：client を差し替える（models.generate_content だけ同じ形）
+  from fake_gemini import FakeGeminiClient, FakeProfile
+  fa.client_summary = FakeGeminiClient(FakeProfile(errors={"429": 0.1}))
+
+  # 2) HTTP サーバ：genai.Client をこちらへ向ける（fetch_articles は GEMINI_BASE_URL を見る）
+  python fake_gemini.py serve --port 8089 --latency lognormal:0.8,0.5 --errors 429=0.1,503=0.05
+  GEMINI_BASE_URL=http://127.0.0.1:8089 python fetch_articles.py summarize -i queued.jsonl
+
+  # 3) 負荷試験：要約スケジューラ＋リトライ＋重複判定を数百件で回す
+  python fake_gemini.py loadtest -n 300 --errors 429=0.1,503=0.05,disconnect=0.02 --time-scale 0.01
+
+エラー種別: 400 / 429 / 500 / 503 / 504 / timeout / disconnect
+応答の崩し: exit / malformed（重複判定の JSON 崩れ）/ missing_headings（【タイトル】等なし）/ empty
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import httpx
+except Exception:
+    httpx = None
+
+try:
+    from google.genai import errors as genai_errors
+except Exception:
+    genai_errors = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+ERROR_STATUS = {
+    "400": (400, "INVALID_ARGUMENT", "Request contains an invalid argument."),
+    "429": (
+        429,
+        "RESOURCE_EXHAUSTED",
+        "Resource has been exhausted (e.g. check quota).",
+    ),
+    "500": (500, "INTERNAL", "An internal error has occurred."),
+    "503": (503, "UNAVAILABLE", "The model is overloaded. Please try again later."),
+    "504": (
+        504,
+        "DEADLINE_EXCEEDED",
+        "Deadline expired before operation could complete.",
+    ),
+}
+ERROR_KINDS = [*ERROR_STATUS, "timeout", "disconnect"]
+RESPONSE_KINDS = ["exit", "malformed", "missing_headings", "empty"]
+
+DEDUPE_MARKER = "あなたはニュースの重複判定"
+SKIP_MARKER = "Step 1 と Step 2 は実施せず"
+
+
+# ===== 設定 =====
+def parse_latency(spec):
+    """
+    "0" / "fixed:0.3" / "uniform:0.1,0.8" / "normal:0.5,0.1" /
+    "lognormal:0.8,0.5"（中央値,σ）/ "exp:0.5"（平均） → rng を受け取って秒を返す関数
+    """
+    spec = str(spec or "0").strip()
+    kind, _, rest = spec.partition(":")
+    if not rest:
+        kind, rest = "fixed", kind
+    a = [float(x) for x in rest.split(",") if x]
+    if kind == "fixed":
+        return lambda rng: a[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(a[0], a[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(a[0], a[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(a[0]), a[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / a[0])
+    raise ValueError(f"unknown latency spec: {spec}")
+
+
+def parse_rates(spec, allowed):
+    """ "429=0.1,503=0.05" → {"429": 0.1, "503": 0.05}"""
+    rates = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        k, _, v = part.partition("=")
+        k = k.strip()
+        if k not in allowed:
+            raise ValueError(f"unknown kind {k!r} (allowed: {', '.join(allowed)})")
+        rates[k] = float(v)
+    return rates
+
+
+# usage の prompt_token_count は文字種ごとの「1トークンあたりの字数」で数える
+# （ミャンマー文字は英字よりずっと細かく切られる。fetch_articles の見積もりの較正確認用）
+TOKEN_KINDS = ["my", "cjk", "other"]
+DEFAULT_CHARS_PER_TOKEN = "my=1.6,cjk=1.1,other=4"
+_SCRIPT_RES = {
+    "my": re.compile(r"[\u1000-\u109f\uaa60-\uaa7f\ua9e0-\ua9ff]"),
+    "cjk": re.compile(r"[\u3000-\u30ff\u4e00-\u9fff\uff00-\uffef]"),
+}
+
+
+def _count_tokens(text, chars_per_token):
+    counts = {k: len(rx.findall(text)) for k, rx in _SCRIPT_RES.items()}
+    counts["other"] = len(text) - sum(counts.values())
+    return int(sum(n / chars_per_token[k] for k, n in counts.items()))
+
+
+class FakeProfile:
+    """
+    代役の振る舞い。
+    - latency: parse_latency の書式
+    - errors: {種別: 確率}（呼び出しごとに独立に抽選）
+    - responses: {exit/malformed/missing_headings/empty: 確率}
+    - script: 先頭から順に消費する1呼び出しぶんの指示（尽きたら確率抽選に戻る）
+        {"error": "429"} / {"kind": "exit"} / {"text": "..."} / {"latency": 1.2, ...}
+    - time_scale: 実際に眠る秒数の倍率（統計は倍率をかける前の秒で取る）
+    - dup_rate: 重複判定で「直前の記事の重複」として removed にする割合
+    """
+
+    def __init__(
+        self,
+        *,
+        latency="0",
+        errors=None,
+        responses=None,
+        script=None,
+        seed=None,
+        time_scale=1.0,
+        chars_per_token=DEFAULT_CHARS_PER_TOKEN,
+        dup_rate=0.1,
+        hang_seconds=30.0,
+    ):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency(latency)
+        self.errors = dict(errors or {})
+        self.responses = dict(responses or {})
+        self.script = list(script or [])
+        self.seed = seed
+        self.time_scale = float(time_scale)
+        if isinstance(chars_per_token, str):
+            chars_per_token = parse_rates(chars_per_token, TOKEN_KINDS)
+        if not isinstance(chars_per_token, dict):
+            chars_per_token = dict.fromkeys(TOKEN_KINDS, float(chars_per_token))
+        self.chars_per_token = {
+            k: float(chars_per_token.get(k, 4.0)) for k in TOKEN_KINDS
+        }
+        self.dup_rate = float(dup_rate)
+        self.hang_seconds = float(hang_seconds)
+
+    @classmethod
+    def from_args(cls, args):
+        script = []
+        if getattr(args, "script", None):
+            with open(args.script, "r", encoding="utf-8") as f:
+                script = [json.loads(ln) for ln in f if ln.strip()]
+        return cls(
+            latency=args.latency,
+            errors=parse_rates(args.errors, ERROR_KINDS),
+            responses=parse_rates(args.responses, RESPONSE_KINDS),
+            script=script,
+            seed=args.seed,
+            time_scale=args.time_scale,
+            chars_per_token=args.chars_per_token,
+            dup_rate=args.dup_rate,
+        )
+
+
+# ===== 応答生成 =====
+def _prompt_title(prompt):
+    m = re.search(r"\[記事タイトル\]\n###\n(.*?)\n", prompt)
+    return (m.group(1) if m else "").strip()
+
+
+def _dedupe_articles(prompt):
+    # プロンプト側は "\\n" がリテラルで埋め込まれている
+    m = re.search(r'"articles": (\[.*?\])\\n\}', prompt, re.S)
+    if not m:
+        return []
+    try:
+        return json.loads(m.group(1))
+    except Exception:
+        return []
+
+
+def _summary_text(prompt, rng):
+    title = _prompt_title(prompt)[:40] or "記事"
+    n = rng.randint(3, 6)
+    bullets = "\n".join(
+        f"・要点{i + 1}：{title}に関する状況が報告された。" for i in range(n)
+    )
+    return (
+        f"【タイトル】 {title}（訳）\n"
+        f"【要約】\n[概要]\n{bullets}\n"
+        f"【超要約】\n{title}をめぐり当局と住民の動きが伝えられた。"
+    )
+
+
+def _dedupe_text(prompt, rng, dup_rate):
+    arts = _dedupe_articles(prompt)
+    kept, removed, clusters = [], [], []
+    for a in arts:
+        if kept and rng.random() < dup_rate:
+            target = kept[-1]["id"]
+            removed.append(
+                {
+                    "id": a["id"],
+                    "duplicate_of": target,
+                    "why": "同一主旨の重複記事のため",
+                }
+            )
+            clusters[-1]["member_ids"].append(a["id"])
+            continue
+        cid = f"c{len(clusters) + 1}"
+        kept.append(
+            {"id": a["id"], "cluster_id": cid, "why": "固有情報が最も多い記事のため"}
+        )
+        clusters.append(
+            {
+                "cluster_id": cid,
+                "member_ids": [a["id"]],
+                "event_key": (a.get("title") or "")[:25],
+            }
+        )
+    return json.dumps(
+        {"kept": kept, "removed": removed, "clusters": clusters}, ensure_ascii=False
+    )
+
+
+def _malformed_text(prompt, rng):
+    good = _dedupe_text(prompt, rng, 0.0)
+    variant = rng.choice(["truncated", "prose", "bad_ids", "not_json"])
+    if variant == "truncated":
+        return good[: max(1, len(good) // 2)]
+    if variant == "prose":
+        return f"以下が判定結果です。\n```json\n{good}\n```\nご確認ください。"
+    if variant == "bad_ids":
+        return json.dumps(
+            {
+                "kept": [{"id": "https://example.invalid/x", "cluster_id": "c1"}],
+                "removed": [],
+                "clusters": [],
+            }
+        )
+    return "申し訳ありませんが、この要求には対応できません。"
+
+
+def _missing_headings_text(prompt, rng):
+    title = _prompt_title(prompt)[:40] or "記事"
+    return f"{title}の訳\n・要点：状況が報告された。\n・背景：詳細は不明。"
+
+
+class FakeGeminiCore:
+    """クライアント・HTTPサーバ共通の中身（抽選・応答生成・統計）"""
+
+    def __init__(self, profile=None):
+        self.profile = profile or FakeProfile()
+        self.rng = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        self.outcomes = Counter()
+        self.latencies = []
+        self.attempts_by_prompt = Counter()
+
+    def decide(self, prompt):
+        """1呼び出しぶんの (outcome, latency, text) を決める。outcome はエラー種別か応答種別"""
+        p = self.profile
+        with self._lock:
+            step = p.script.pop(0) if p.script else {}
+            latency = step.get("latency")
+            if latency is None:
+                latency = p.sample_latency(self.rng)
+            self.attempts_by_prompt[hashlib.sha1(prompt.encode()).hexdigest()] += 1
+
+            outcome, text = None, None
+            if "error" in step:
+                outcome = str(step["error"])
+            elif "text" in step:
+                outcome, text = "scripted", step["text"]
+            elif "kind" in step:
+                outcome = step["kind"]
+            else:
+                for kind, rate in p.errors.items():
+                    if self.rng.random() < rate:
+                        outcome = kind
+                        break
+            is_dedupe = DEDUPE_MARKER in prompt
+            if outcome is None:
+                for kind, rate in p.responses.items():
+                    # exit は Step 2 を通る要約プロンプトだけ、malformed は重複判定だけ
+                    if kind == "exit" and (is_dedupe or SKIP_MARKER in prompt):
+                        continue
+                    if kind == "malformed" and not is_dedupe:
+                        continue
+                    if kind == "missing_headings" and is_dedupe:
+                        continue
+                    if self.rng.random() < rate:
+                        outcome = kind
+                        break
+            if outcome is None:
+                outcome = "dedupe" if is_dedupe else "summary"
+
+            if text is None and outcome not in ERROR_KINDS:
+                text = self._text_for(outcome, prompt)
+            self.outcomes[outcome] += 1
+            self.latencies.append(latency)
+        return outcome, latency, text
+
+    def _text_for(self, outcome, prompt):
+        if outcome == "exit":
+            return "exit"
+        if outcome == "empty":
+            return ""
+        if outcome == "malformed":
+            return _malformed_text(prompt, self.rng)
+        if outcome == "missing_headings":
+            return _missing_headings_text(prompt, self.rng)
+        if outcome == "dedupe":
+            return _dedupe_text(prompt, self.rng, self.profile.dup_rate)
+        return _summary_text(prompt, self.rng)
+
+    def usage(self, prompt, text):
+        cpt = self.profile.chars_per_token
+        pin = _count_tokens(prompt, cpt)
+        pout = _count_tokens(text or "", cpt)
+        return {
+            "prompt_token_count": pin,
+            "candidates_token_count": pout,
+            "total_token_count": pin + pout,
+        }
+
+    def sleep(self, seconds):
+        if seconds > 0 and self.profile.time_scale > 0:
+            time.sleep(seconds * self.profile.time_scale)
+
+    def stats(self):
+        lat = sorted(self.latencies)
+
+        def pct(q):
+            return lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+
+        attempts = Counter(self.attempts_by_prompt.values())
+        return {
+            "calls": sum(self.outcomes.values()),
+            "outcomes": dict(self.outcomes),
+            "latency_p50": pct(0.5),
+            "latency_p95": pct(0.95),
+            "latency_p99": pct(0.99),
+            "latency_mean": statistics.fmean(lat) if lat else 0.0,
+            "attempts_histogram": dict(sorted(attempts.items())),
+        }
+
+
+# ===== 1) プロセス内クライアント =====
+class _Usage:
+    def __init__(self, d):
+        self.__dict__.update(d)
+
+
+class _Response:
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = _Usage(usage)
+
+
+def _raise_for(outcome):
+    if outcome in ERROR_STATUS:
+        code, status, message = ERROR_STATUS[outcome]
+        payload = {"error": {"code": code, "message": message, "status": status}}
+        if genai_errors is not None:
+            cls = genai_errors.ClientError if code < 500 else genai_errors.ServerError
+            raise cls(code, payload)
+        raise RuntimeError(f"{code} {status}. {payload}")
+    if outcome == "timeout":
+        if httpx is not None:
+            raise httpx.ReadTimeout("The read operation timed out")
+        raise TimeoutError("The read operation timed out")
+    if outcome == "disconnect":
+        if httpx is not None:
+            raise httpx.RemoteProtocolError(
+                "Server disconnected without sending a response."
+            )
+        raise ConnectionError("Server disconnected without sending a response.")
+
+
+class _FakeModels:
+    def __init__(self, core):
+        self._core = core
+
+    def generate_content(self, *, model, contents, config=None, **kwargs):
+        prompt = contents if isinstance(contents, str) else json.dumps(contents)
+        outcome, latency, text = self._core.decide(prompt)
+        self._core.sleep(latency)
+        if outcome in ERROR_KINDS:
+            _raise_for(outcome)
+        return _Response(text, self._core.usage(prompt, text))
+
+
+class FakeGeminiClient:
+    """genai.Client の代わりに渡せる（client.models.generate_content のみ）"""
+
+    def __init__(self, profile=None, core=None):
+        self.core = core or FakeGeminiCore(profile)
+        self.models = _FakeModels(self.core)
+
+
+# ===== 2) HTTP サーバ（generativelanguage API の generateContent 互換の最小実装） =====
+GENERATE_RE = re.compile(r"/models/([^/:]+):generateContent")
+
+
+def make_server(core, host="127.0.0.1", port=0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, code, obj):
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b"{}"
+            if not GENERATE_RE.search(self.path):
+                return self._json(
+                    404,
+                    {
+                        "error": {
+                            "code": 404,
+                            "status": "NOT_FOUND",
+                            "message": self.path,
+                        }
+                    },
+                )
+            try:
+                req = json.loads(raw or b"{}")
+            except Exception:
+                return self._json(
+                    400,
+                    {
+                        "error": {
+                            "code": 400,
+                            "status": "INVALID_ARGUMENT",
+                            "message": "bad json",
+                        }
+                    },
+                )
+            prompt = "".join(
+                part.get("text", "")
+                for c in req.get("contents", [])
+                for part in (c.get("parts") or [])
+            )
+            outcome, latency, text = core.decide(prompt)
+            core.sleep(latency)
+
+            if outcome == "disconnect":
+                # 応答を書かずに切る → クライアント側は RemoteProtocolError
+                self.close_connection = True
+                with contextlib.suppress(Exception):
+                    self.connection.shutdown(2)
+                return
+            if outcome == "timeout":
+                core.sleep(core.profile.hang_seconds)
+                self.close_connection = True
+                return
+            if outcome in ERROR_STATUS:
+                code, status, message = ERROR_STATUS[outcome]
+                return self._json(
+                    code,
+                    {"error": {"code": code, "message": message, "status": status}},
+                )
+
+            u = core.usage(prompt, text)
+            return self._json(
+                200,
+                {
+                    "candidates": [
+                        {
+                            "content": {"role": "model", "parts": [{"text": text}]},
+                            "finishReason": "STOP",
+                            "index": 0,
+                        }
+                    ],
+                    "usageMetadata": {
+                        "promptTokenCount": u["prompt_token_count"],
+                        "candidatesTokenCount": u["candidates_token_count"],
+                        "totalTokenCount": u["total_token_count"],
+                    },
+                    "modelVersion": GENERATE_RE.search(self.path).group(1),
+                },
+            )
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+# ===== 3) 負荷試験 =====
+_MY = [
+    "ဒေသခံများက ပြောကြားသည်။",
+    "စစ်ကောင်စီတပ်များ၏ တိုက်ခိုက်မှုကြောင့် ကျေးရွာသားများ ထွက်ပြေးခဲ့ရသည်။",
+    "မြန်မာနိုင်ငံ အနှံ့ စစ်ရေးတင်းမာမှုများ မြင့်တက်နေသည်။",
+    "စားသောက်ကုန် ဈေးနှုန်းများ ထပ်မံမြင့်တက်လာသည်။",
+]
+_EN = [
+    "Myanmar's military regime announced new travel restrictions on Friday.",
+    "Residents said the fighting forced hundreds of families to flee their homes.",
+]
+
+
+def synthetic_queue(n, seed=0):
+    rng = random.Random(seed)
+    sources = [
+        "Mizzima (Burmese)",
+        "BBC Burmese",
+        "Khit Thit Media",
+        "DVB",
+        "Irrawaddy",
+    ]
+    items = []
+    for i in range(n):
+        src = sources[i % len(sources)]
+        pool = _EN if src == "Irrawaddy" else _MY
+        items.append(
+            {
+                "source": src,
+                "url": f"https://example.invalid/{src.split()[0].lower()}/{i}",
+                "title": " ".join(rng.choice(pool) for _ in range(2))[:120],
+                "body": "\n".join(
+                    " ".join(rng.choice(pool) for _ in range(rng.randint(2, 6)))
+                    for _ in range(rng.randint(8, 30))
+                ),
+            }
+        )
+    return items
+
+
+def run_loadtest(args):
+    os.environ["SUMMARY_CACHE"] = "0"
+    os.environ["DIGEST_STATE_DIR"] = tempfile.mkdtemp(prefix="fake_gemini_state_")
+    sys.path.insert(0, HERE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import fetch_articles as fa
+
+    profile = FakeProfile.from_args(args)
+    summary_client = FakeGeminiClient(profile)
+    dedupe_client = FakeGeminiClient(
+        FakeProfile(
+            latency=args.latency,
+            errors=profile.errors,
+            responses={k: v for k, v in profile.responses.items() if k == "malformed"},
+            seed=None if args.seed is None else args.seed + 1,
+            time_scale=args.time_scale,
+            chars_per_token=profile.chars_per_token,
+            dup_rate=args.dup_rate,
+        )
+    )
+
+    # リトライ待ち・バッチ間待機は仮想時間で数え、実際には time_scale 倍だけ眠る
+    virtual_sleep = defaultdict(float)
+    real_sleep = fa.traced_sleep
+
+    def _scaled_sleep(seconds, reason):
+        virtual_sleep[reason] += seconds
+        real_sleep(seconds * args.time_scale, reason)
+
+    queue = synthetic_queue(args.n, seed=args.seed or 0)
+    log = open(args.log, "w", encoding="utf-8") if args.log else io.StringIO()
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="fake_gemini_run_")  # gemini_usage.log の書き先
+    fa.traced_sleep = _scaled_sleep
+    t0 = time.perf_counter()
+    try:
+        os.chdir(workdir)
+        with contextlib.redirect_stdout(log):
+            results = list(
+                fa.iter_summaries(
+                    queue, args.batch_size, args.wait, client=summary_client
+                )
+            )
+            t1 = time.perf_counter()
+            final = fa.dedupe_and_normalize(results, client=dedupe_client)
+        token_rows = fa.load_token_samples()
+    finally:
+        os.chdir(cwd)
+        fa.traced_sleep = real_sleep
+        if args.log:
+            log.close()
+    t2 = time.perf_counter()
+    token_rates = fa.fit_token_rates(token_rows)
+
+    s_stats = summary_client.core.stats()
+    d_stats = dedupe_client.core.stats()
+    exited = s_stats["outcomes"].get("exit", 0)
+    failed = len(queue) - len(results) - exited
+    virtual_latency = sum(summary_client.core.latencies) + sum(
+        dedupe_client.core.latencies
+    )
+    report = {
+        "items": len(queue),
+        "summarized": len(results),
+        "exited": exited,
+        "failed": failed,
+        "after_dedupe": len(final),
+        "summary": s_stats,
+        "dedupe": d_stats,
+        "wall_s": t2 - t0,
+        "summarize_wall_s": t1 - t0,
+        "virtual_sleep_s": dict(virtual_sleep),
+        "virtual_run_s": virtual_latency + sum(virtual_sleep.values()),
+    }
+
+    print(
+        f"items={report['items']} summarized={report['summarized']} exit={exited} failed={failed} after_dedupe={len(final)}"
+    )
+    print(f"summary calls={s_stats['calls']} outcomes={s_stats['outcomes']}")
+    print(f"  attempts/item={s_stats['attempts_histogram']}")
+    print(
+        f"  latency p50/p95/p99 = {s_stats['latency_p50']:.2f}/{s_stats['latency_p95']:.2f}/{s_stats['latency_p99']:.2f}s"
+    )
+    print(f"dedupe calls={d_stats['calls']} outcomes={d_stats['outcomes']}")
+    print(
+        "virtual sleep: "
+        + ", ".join(f"{k}={v:.1f}s" for k, v in sorted(virtual_sleep.items()))
+    )
+    print(
+        f"virtual run time ≈ {report['virtual_run_s'] / 60:.1f} min | "
+        f"wall {report['wall_s']:.1f}s (time-scale {args.time_scale})"
+    )
+    if token_rows:
+        print(
+            f"token estimate on {len(token_rows)} call(s): mean abs error "
+            f"{fa.token_rate_error(token_rows, token_rates):.1%} calibrated "
+            f"({', '.join(f'{k}={v:.3f}' for k, v in token_rates.items())}) / "
+            f"{fa.token_rate_error(token_rows, fa.DEFAULT_TOKEN_RATES):.1%} defaults"
+        )
+    for line in fa.token_report_lines():
+        print(line)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 saved → {args.json}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def _profile_opts(p):
+        p.add_argument("--latency", default="0", help="例: lognormal:0.8,0.5")
+        p.add_argument(
+            "--errors", default="", help="例: 429=0.1,503=0.05,disconnect=0.02"
+        )
+        p.add_argument(
+            "--responses",
+            default="",
+            help="例: exit=0.2,malformed=0.3,missing_headings=0.05",
+        )
+        p.add_argument("--script", help="JSONL：1行1呼び出しぶんの指示を先頭から消費")
+        p.add_argument("--seed", type=int)
+        p.add_argument(
+            "--time-scale", type=float, default=1.0, help="実際に眠る秒数の倍率"
+        )
+        p.add_argument("--dup-rate", type=float, default=0.1)
+        p.add_argument(
+            "--chars-per-token",
+            default=DEFAULT_CHARS_PER_TOKEN,
+            help="文字種ごとの1トークンあたり字数（usage の計算用）",
+        )
+
+    p = sub.add_parser(
+        "serve", help="HTTP サーバとして起動（GEMINI_BASE_URL で向ける）"
+    )
+    _profile_opts(p)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+
+    p = sub.add_parser("loadtest", help="iter_summaries → dedupe を代役で回す")
+    _profile_opts(p)
+    p.add_argument("-n", type=int, default=300)
+    p.add_argument("--batch-size", type=int, default=3)
+    p.add_argument("--wait", type=float, default=60, help="バッチ間待機（仮想秒）")
+    p.add_argument("--log", help="パイプラインのログ出力先（既定: 捨てる）")
+    p.add_argument("--json", help="結果を JSON で保存")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        core = FakeGeminiCore(FakeProfile.from_args(args))
+        httpd = make_server(core, args.host, args.port)
+        host, port = httpd.server_address[:2]
+        print(
+            f"fake gemini listening on http://{host}:{port}  (GEMINI_BASE_URL=http://{host}:{port})"
+        )
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(json.dumps(core.stats(), ensure_ascii=False))
+        return 0
+    run_loadtest(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
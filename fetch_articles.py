@@ -1,86 +1,459 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 from datetime import datetime, timedelta, timezone, date
-from dateutil.parser import parse as parse_date
 import re
 
 import os
 import sys
+import io
+import html as _html
+import urllib.parse
 from email.message import EmailMessage
-from email.utils import formataddr
+from email.utils import formataddr, parsedate_to_datetime
 import unicodedata
-from google import genai
-from collections import defaultdict
+from collections import Counter, defaultdict
+from collections.abc import Mapping
 import time
 import json
+import math
+import argparse
+import atexit
+import contextlib
+import contextvars
+import codecs
+import hashlib
+import functools
+import itertools
+import threading
 import pprint as _pprint
 import random
+import sqlite3
+import tempfile
+import zlib
 from typing import List, Dict, Optional
 from urllib.parse import urlparse  # 追加
 from collections import deque
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import base64
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google.oauth2.credentials import Credentials
 from email.policy import SMTP
 from email.header import Header
 
-try:
-    import httpx
-except Exception:
-    httpx = None
-try:
-    import urllib3
-except Exception:
-    urllib3 = None
-
-try:
-    from google.api_core.exceptions import (
-        ServiceUnavailable,
-        ResourceExhausted,
-        DeadlineExceeded,
-        InternalServerError,
-    )
-except Exception:
-    ServiceUnavailable = ResourceExhausted = DeadlineExceeded = InternalServerError = (
-        Exception
-    )
+# 重いモジュール（google-genai / Gmail API / dateutil）は初回利用時に import する。
+# 収集だけ・render だけのステージでは LLM や Gmail のスタックを読み込まない。
+# 起動コストは `python fetch_articles.py importtime` で確認できる。
+LAZY_MODULES = (
+    "google.genai",
+    "googleapiclient",
+    "google.oauth2",
+    "dateutil",
+    "numpy",
+)
+
+
+def _genai():
+    from google import genai
+
+    return genai
+
+
+def parse_date(text):
+    """dateutil.parser.parse の遅延 import 版"""
+    from dateutil.parser import parse
+
+    return parse(text)
+
+
+# ===== 実行トレース（span 単位の計測） =====
+# DIGEST_TRACE=<出力先ベース名>（"1" なら digest_trace）で有効化。
+# run → source → listing/article → http(strategy) → parse → extract / keyword、
+# run → summarize → batch → summary → gemini → sleep の入れ子を記録し、
+# 終了時に <base>.jsonl と <base>.trace.json（Chrome trace / Perfetto で開ける）を書き出す。
+class _Tracer:
+    def __init__(self, out_base=None):
+        self.out_base = out_base
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._t0 = time.perf_counter()
+        self._epoch0 = time.time()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.out_base)
+
+    def _stack(self):
+        st = getattr(self._local, "stack", None)
+        if st is None:
+            st = self._local.stack = []
+        return st
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        """with TRACER.span("fetch", url=u) as attrs: ... attrs["status"] = 200"""
+        if not self.enabled:
+            yield attrs
+            return
+        stack = self._stack()
+        sp = {
+            "id": next(self._ids),
+            "parent": stack[-1]["id"] if stack else None,
+            "name": name,
+            "start": time.perf_counter(),
+            "thread": threading.get_ident(),
+            "attrs": attrs,
+        }
+        stack.append(sp)
+        try:
+            yield attrs
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                attrs["error"] = f"{e.__class__.__name__}: {e}"[:300]
+            raise
+        finally:
+            sp["end"] = time.perf_counter()
+            # ジェネレータ経由の span は先頭以外から閉じることがあるので ID で外す
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i] is sp:
+                    del stack[i]
+                    break
+            with self._lock:
+                self.spans.append(sp)
+
+    def records(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        for sp in spans:
+            yield {
+                "id": sp["id"],
+                "parent": sp["parent"],
+                "name": sp["name"],
+                "ts": round(self._epoch0 + (sp["start"] - self._t0), 6),
+                "dur_ms": round((sp["end"] - sp["start"]) * 1000, 3),
+                "thread": sp["thread"],
+                "attrs": sp["attrs"],
+            }
+
+    def chrome_events(self):
+        pid = os.getpid()
+        tids = {}
+        events = []
+        for rec in self.records():
+            tid = tids.setdefault(rec["thread"], len(tids) + 1)
+            events.append(
+                {
+                    "name": rec["name"],
+                    "cat": rec["name"].split(".", 1)[0],
+                    "ph": "X",
+                    "ts": round((rec["ts"] - self._epoch0) * 1e6, 1),
+                    "dur": round(rec["dur_ms"] * 1000, 1),
+                    "pid": pid,
+                    "tid": tid,
+                    "args": rec["attrs"],
+                }
+            )
+        for ident, tid in tids.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": "main" if tid == 1 else f"thread-{ident}"},
+                }
+            )
+        return events
+
+    def print_summary(self, top=12):
+        # stdout はステージ出力（JSONL）に使うことがあるので stderr に出す
+        agg = defaultdict(lambda: [0, 0.0])
+        for rec in self.records():
+            a = agg[rec["name"]]
+            a[0] += 1
+            a[1] += rec["dur_ms"]
+        print("⏱ TRACE summary (name: count / total ms)", file=sys.stderr)
+        for name, (n, ms) in sorted(agg.items(), key=lambda kv: -kv[1][1])[:top]:
+            print(f"  {name:<14} {n:>5} / {ms:>10.1f}", file=sys.stderr)
+
+    def export(self, out_base=None):
+        base = out_base or self.out_base
+        if not base or not self.spans:
+            return
+        default = lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o)  # noqa: E731
+        with open(f"{base}.jsonl", "w", encoding="utf-8") as f:
+            for rec in self.records():
+                f.write(json.dumps(rec, ensure_ascii=False, default=default) + "\n")
+        with open(f"{base}.trace.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"},
+                f,
+                ensure_ascii=False,
+                default=default,
+            )
+        self.print_summary()
+        print(f"⏱ TRACE written → {base}.jsonl / {base}.trace.json", file=sys.stderr)
+
+
+def _trace_out_base_from_env():
+    v = (os.getenv("DIGEST_TRACE") or "").strip()
+    if v.lower() in ("", "0", "false", "off"):
+        return None
+    return "digest_trace" if v.lower() in ("1", "true", "on") else v
+
+
+TRACER = _Tracer(_trace_out_base_from_env())
+
+
+# ===== 実行時間の予算（締め切り） =====
+# run 全体の上限（分）。0 なら無制限。収集に全体の COLLECT_SHARE を割り当て、
+# 要約は「締め切り − FINISH_RESERVE 秒」まで（残りは重複判定とメール送信に取っておく）。
+RUN_DEADLINE_MIN = float(os.getenv("DIGEST_DEADLINE_MIN", "50") or 0)
+COLLECT_SHARE = float(os.getenv("DIGEST_COLLECT_SHARE", "0.5"))
+# ソースごとの予算のうち一覧・記事巡回に使う割合（残りは本文取得＝enqueue）
+SOURCE_COLLECT_SHARE = 0.6
+FINISH_RESERVE_SEC = float(os.getenv("DIGEST_FINISH_RESERVE_SEC", "120"))
+
+
+class Budget:
+    """締め切り（time.monotonic 基準）。親より後ろには延ばせない"""
+
+    def __init__(self, name, end=None):
+        self.name = name
+        self.end = end
+
+    def remaining(self) -> float:
+        if self.end is None:
+            return float("inf")
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.end is not None and time.monotonic() >= self.end
+
+
+_BUDGET = contextvars.ContextVar("digest_budget", default=Budget("unbounded"))
+
+
+def current_budget() -> Budget:
+    return _BUDGET.get()
+
+
+@contextlib.contextmanager
+def time_budget(name, seconds=None, *, share=None, reserve=0.0):
+    """
+    with time_budget("Irrawaddy", 300): ...
+    seconds: この区間の上限秒、share: 親の残り時間に対する割合、reserve: 親の締め切りから残しておく秒。
+    どれも指定しなければ親の締め切りをそのまま引き継ぐ（名前だけ変わる）。
+    """
+    parent = _BUDGET.get()
+    now = time.monotonic()
+    ends = [parent.end] if parent.end is not None else []
+    if seconds is not None:
+        ends.append(now + max(0.0, seconds))
+    if share is not None and parent.end is not None:
+        ends.append(now + parent.remaining() * share)
+    if reserve and parent.end is not None:
+        ends.append(parent.end - reserve)
+    token = _BUDGET.set(Budget(name, min(ends) if ends else None))
+    try:
+        yield _BUDGET.get()
+    finally:
+        _BUDGET.reset(token)
+
+
+# 時間切れで落としたもの（メール末尾と実行ログに出す）
+RUN_CUTS = []
+_RUN_CUTS_LOCK = threading.Lock()
+
+_CUT_LABELS = {
+    "listing": "未巡回の一覧ページ",
+    "article": "未確認の記事",
+    "enqueue": "本文未取得",
+    "fetch": "取得中断",
+    "summary": "未要約",
+}
+
+
+def record_cut(stage, items, *, more=False):
+    """予算切れで処理しなかった items を RUN_CUTS に積む。more=True は「これ以上あるが数えていない」"""
+    budget = current_budget().name
+    rows = []
+    for item in items:
+        # ソース別の予算の中ならその名前、要約などは記事側の source でまとめる
+        src = item.get("source") if isinstance(item, dict) else None
+        if budget in SOURCE_SPECS_BY_NAME:
+            src = budget
+        rows.append(
+            {
+                "budget": budget,
+                "stage": stage,
+                "source": src or budget,
+                "url": _span_value(item),
+                "more": more,
+            }
+        )
+    if not rows:
+        return
+    with _RUN_CUTS_LOCK:
+        RUN_CUTS.extend(rows)
+    print(f"⏱ budget '{budget}' exhausted: skipped {len(rows)} {stage}(s)")
+
+
+def cut_summary_lines(cuts=None):
+    """RUN_CUTS を「ソース: 未確認の記事 12件, 未要約 3件」の行にまとめる"""
+    cuts = RUN_CUTS if cuts is None else cuts
+    grouped = defaultdict(lambda: defaultdict(lambda: [0, False]))
+    for c in cuts:
+        g = grouped[c["source"]][c["stage"]]
+        g[0] += 1
+        g[1] = g[1] or c["more"]
+    lines = []
+    for source, stages in grouped.items():
+        if "dedupe" in stages:
+            n = stages["dedupe"][0]
+            lines.append(f"重複判定（LLM）を省略（{n}本をそのまま掲載）")
+            continue
+        parts = [
+            f"{_CUT_LABELS.get(stage, stage)} {n}件{'以上' if more else ''}"
+            for stage, (n, more) in stages.items()
+        ]
+        lines.append(f"{source}: " + ", ".join(parts))
+    return lines
+
+
+def _span_value(item):
+    if isinstance(item, dict):
+        return item.get("url") or item.get("link")
+    return item if isinstance(item, (str, int, float)) else None
+
+
+def traced_iter(name: str, iterable, *, attr="item", **attrs):
+    """
+    for url in traced_iter("article", urls, attr="url"): ...
+    ループ本体1回ぶんを1つの span にする（本体の中の span はその子になる）。
+    予算（time_budget）が切れたら残りを record_cut して打ち切る。
+    """
+    it = iter(iterable)
+    for item in it:
+        if current_budget().expired():
+            # 長さのあるものだけ残りを数える（ストリームは読み進めない）
+            sized = isinstance(iterable, (list, tuple, range, set, frozenset))
+            record_cut(name, [item, *it] if sized else [item], more=not sized)
+            return
+        with TRACER.span(name, **{attr: _span_value(item)}, **attrs):
+            yield item
+
+
+def traced(name: str, attrs_from=None):
+    """関数呼び出し全体を span にするデコレータ。attrs_from(*args, **kw) -> dict"""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            attrs = {}
+            if attrs_from:
+                try:
+                    attrs = attrs_from(*args, **kwargs) or {}
+                except Exception:
+                    attrs = {}
+            with TRACER.span(name, **attrs):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def _url_attr(url=None, *args, **kwargs):
+    return {"url": url}
+
+
+def traced_sleep(seconds: float, reason: str) -> None:
+    """time.sleep の代わり。待ち時間もタイムライン上に出す（予算の残りより長くは待たない）"""
+    seconds = min(seconds, current_budget().remaining())
+    if seconds <= 0:
+        return
+    with TRACER.span("sleep", reason=reason, seconds=round(seconds, 3)):
+        time.sleep(seconds)
+
+
+def _traced_http(strategy: str, getter, url, **kwargs):
+    """個々の HTTP リクエスト（curl_cffi / cloudscraper / requests）を span にする"""
+    with TRACER.span("http", strategy=strategy, url=url) as attrs:
+        r = getter(url, **kwargs)
+        attrs["status"] = getattr(r, "status_code", None)
+        if not kwargs.get("stream"):  # stream=True の本文はここで読まない
+            attrs["bytes"] = len(getattr(r, "content", b"") or b"")
+        return r
+
+
+def make_soup(markup, *args, **kwargs):
+    """BeautifulSoup(...) と同じ。パース時間を span に残す"""
+    with TRACER.span("parse", bytes=len(markup or "")):
+        return BeautifulSoup(markup, *args, **kwargs)
+
 
+# ローカルの代役サーバ（fake_gemini.py serve）に向けるときだけ指定する
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 
-# Gemini本番用
-client_summary = genai.Client(api_key=os.getenv("GEMINI_API_SUMMARY_KEY"))
-client_dedupe = genai.Client(api_key=os.getenv("GEMINI_API_DEDUPE_KEY"))
+
+def _gemini_client(api_key):
+    genai = _genai()
+    if GEMINI_BASE_URL:
+        return genai.Client(
+            api_key=api_key or "fake",
+            http_options=genai.types.HttpOptions(base_url=GEMINI_BASE_URL),
+        )
+    return genai.Client(api_key=api_key)
+
+
+# Gemini本番用（初回の要約/重複判定で作る。テストでは代役を代入しておけばそれを使う）
+client_summary = None
+client_dedupe = None
+
+
+def get_summary_client():
+    global client_summary
+    if client_summary is None:
+        client_summary = _gemini_client(os.getenv("GEMINI_API_SUMMARY_KEY"))
+    return client_summary
+
+
+def get_dedupe_client():
+    global client_dedupe
+    if client_dedupe is None:
+        client_dedupe = _gemini_client(os.getenv("GEMINI_API_DEDUPE_KEY"))
+    return client_dedupe
+
+
+def _loaded_attr(module, *names):
+    """module が import 済みのときだけ属性を返す（例外型の判定のために import しない）"""
+    mod = sys.modules.get(module)
+    return tuple(getattr(mod, n) for n in names if hasattr(mod, n)) if mod else ()
 
 
 def _is_retriable_exc(e: Exception) -> bool:
     msg = (str(e) or "").lower()
     name = e.__class__.__name__.lower()
 
-    # Google系の明示的リトライ対象
-    if isinstance(
-        e,
-        (ServiceUnavailable, ResourceExhausted, DeadlineExceeded, InternalServerError),
-    ):
-        return True
-
-    # httpx/urllib3系（環境に無ければ無視）
-    if httpx and isinstance(
-        e,
-        (
-            getattr(httpx, "RemoteProtocolError", Exception),
-            getattr(httpx, "ReadTimeout", Exception),
-            getattr(httpx, "ConnectError", Exception),
-        ),
-    ):
-        return True
-    if urllib3 and isinstance(
-        e,
-        (
-            urllib3.exceptions.ProtocolError,
-            urllib3.exceptions.ReadTimeoutError,
-            urllib3.exceptions.MaxRetryError,
-        ),
-    ):
+    # Google系の明示的リトライ対象、httpx/urllib3系
+    # （例外の型は送出元が import 済みなので、未 import のモジュールは見なくてよい）
+    retriable = (
+        _loaded_attr(
+            "google.api_core.exceptions",
+            "ServiceUnavailable",
+            "ResourceExhausted",
+            "DeadlineExceeded",
+            "InternalServerError",
+        )
+        + _loaded_attr("httpx", "RemoteProtocolError", "ReadTimeout", "ConnectError")
+        + _loaded_attr(
+            "urllib3.exceptions", "ProtocolError", "ReadTimeoutError", "MaxRetryError"
+        )
+    )
+    if retriable and isinstance(e, retriable):
         return True
 
     # 文字列での判定（実装差分吸収）
@@ -98,6 +471,9 @@ def _is_retriable_exc(e: Exception) -> bool:
         "timeout",
         "temporar",
         "overload",
+        # google-genai は 429 を ClientError("429 RESOURCE_EXHAUSTED ...") で投げる
+        "429",
+        "resource_exhausted",
     ]
     if any(h in msg or h in name for h in hints):
         return True
@@ -171,6 +547,9 @@ def call_gemini_with_retries(
                 "model": model,
                 **u,
             }
+            if isinstance(prompt, str):
+                # トークン見積もりの較正用（fit_token_rates）
+                rec["prompt_chars"] = script_counts(prompt)
             print(
                 "📊 TOKENS[{tag}] in={in_} out={out} total={tot} (cache create/read={cc}/{cr})".format(
                     tag=tag,
@@ -182,7 +561,7 @@ def call_gemini_with_retries(
                 )
             )
             try:
-                with open("gemini_usage.log", "a", encoding="utf-8") as f:
+                with open(GEMINI_USAGE_LOG, "a", encoding="utf-8") as f:
                     f.write(json.dumps(rec, ensure_ascii=False) + "\n")
             except Exception:
                 pass
@@ -315,16 +694,23 @@ def call_gemini_with_retries(
     kwargs = {}
     if cfg:
         try:
-            kwargs["config"] = genai.types.GenerateContentConfig(**cfg)  # type: ignore[attr-defined]
+            kwargs["config"] = _genai().types.GenerateContentConfig(**cfg)  # type: ignore[attr-defined]
         except Exception:
             kwargs["config"] = cfg
 
     delay = base_delay
     for attempt in range(1, max_retries + 1):
         try:
-            resp = client.models.generate_content(
-                model=model, contents=prompt, **kwargs
-            )
+            with TRACER.span(
+                "gemini", attempt=attempt, tag=(usage_tag or "gen"), model=model
+            ) as gattrs:
+                resp = client.models.generate_content(
+                    model=model, contents=prompt, **kwargs
+                )
+                if TRACER.enabled:
+                    u = _usage_from_resp(resp) or {}
+                    gattrs["in_tokens"] = u.get("prompt_token_count")
+                    gattrs["out_tokens"] = u.get("candidates_token_count")
 
             # 1) 使用量ログ
             _log_gemini_usage(resp, tag=(usage_tag or "gen"), model=model)
@@ -346,18 +732,23 @@ def call_gemini_with_retries(
 
             return resp
         except Exception as e:
-            if not _is_retriable_exc(e) or attempt == max_retries:
+            if (
+                not _is_retriable_exc(e)
+                or attempt == max_retries
+                or current_budget().expired()
+            ):
                 raise
             print(
                 f"⚠️ Gemini retry {attempt}/{max_retries} after: {e.__class__.__name__} | {e}"
             )
-            time.sleep(min(max_delay, delay) + random.random() * 0.5)
+            traced_sleep(min(max_delay, delay) + random.random() * 0.5, "gemini_retry")
             delay *= 2
 
 
-# 要約用に送る本文の最大文字数（固定）
-# Irrawaddy英語記事が3500文字くらいある
+# 要約用に送る本文の上限はトークン数で決める（BODY_MAX_TOKENS、下の「トークン見積もり」）。
+# 以前の固定字数は節約量の比較用に残す（Irrawaddy英語記事が3500文字くらいある）
 BODY_MAX_CHARS = 3500
+BODY_MAX_TOKENS = int(os.getenv("DIGEST_BODY_MAX_TOKENS", "1200"))
 
 # ミャンマー標準時 (UTC+6:30)
 MMT = timezone(timedelta(hours=6, minutes=30))
@@ -371,6 +762,53 @@ def get_today_date_mmt():
     return now_mmt.date()
 
 
+# 対象日の判定（通常は date 単体、backfill では date の集合を渡す）
+def date_matches(d, target) -> bool:
+    if isinstance(target, (set, frozenset)):
+        return d in target
+    return d == target
+
+
+def target_date_span(target):
+    """対象日の (最古日, 最新日)"""
+    if isinstance(target, (set, frozenset)):
+        return min(target), max(target)
+    return target, target
+
+
+# 実行をまたいで保持する状態（インデックス・履歴など）の保存先
+# GitHub Actions では actions/cache でこのディレクトリを引き継ぐ
+STATE_DIR = os.getenv("DIGEST_STATE_DIR", ".digest_state")
+
+
+def _state_path(name: str) -> str:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, name)
+
+
+def load_json_state(name: str, default):
+    try:
+        with open(_state_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"⚠️ state load failed ({name}): {e}")
+        return default
+
+
+def save_json_state(name: str, data) -> None:
+    """一時ファイルに書いてから置き換える（途中で落ちても壊れない）"""
+    path = _state_path(name)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"⚠️ state save failed ({name}): {e}")
+
+
 # 共通キーワードリスト（全メディア共通で使用する）
 NEWS_KEYWORDS = [
     # ミャンマー（国名・現行名称）
@@ -472,6 +910,7 @@ class _OrPattern:
 KYAT_PATTERN = _OrPattern(_KYAT_NUM_FIRST, _KYAT_CCY_FIRST)
 
 
+@traced("keyword")
 def any_keyword_hit(title: str, body: str) -> bool:
     # 通常のキーワード一致
     if any(kw in title or kw in body for kw in NEWS_KEYWORDS):
@@ -488,53 +927,352 @@ def clean_html_content(html: str) -> str:
     return "".join(c for c in html if unicodedata.category(c)[0] != "C")
 
 
-# 本文が取得できるまで「requestsでリトライする」
-def fetch_with_retry(url, retries=3, wait_seconds=2):
-    for attempt in range(retries):
+# ===== 共通フェッチエンジン =====
+# 取得手段（tier）を順に試し、429/5xx は Retry-After（無ければ指数バックオフ）に従って再試行する。
+# 403 は指紋で弾かれていることが多いので待たずに次の tier へ。404 等は再試行しない。
+# ホストごとのサーキットブレーカ：連続失敗が閾値を超えたら一定時間そのホストへの取得を即失敗にし、
+# 時間が経ったら1本だけ通して（half-open）復旧を確かめる。落ちているサイトに全URL×全tier×バックオフを払わない。
+FETCH_BREAKER_THRESHOLD = int(os.getenv("FETCH_BREAKER_THRESHOLD", "5"))
+FETCH_BREAKER_COOLDOWN = float(os.getenv("FETCH_BREAKER_COOLDOWN", "120"))
+# これより長い Retry-After は待たずに諦め、その間ホストを open にする
+FETCH_RETRY_AFTER_MAX = float(os.getenv("FETCH_RETRY_AFTER_MAX", "60"))
+
+BROWSER_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/128.0.0.0 Safari/537.36"
+)
+
+
+class FetchError(Exception):
+    """取得失敗（全 tier を試しても取れない、または再試行しても変わらない応答）"""
+
+
+class HostUnavailable(FetchError):
+    """サーキットブレーカが open（このホストへの取得はしばらく即失敗）"""
+
+
+class _HostBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _state(self, host):
+        return self._hosts.setdefault(
+            host,
+            {
+                "state": "closed",
+                "fails": 0,
+                "open_until": 0.0,
+                "not_before": 0.0,
+                "probing": False,
+            },
+        )
+
+    def before(self, host):
+        """
+        リクエスト前に呼ぶ。open 中なら HostUnavailable、cooldown 明けは1本だけ通す。
+        返り値はレート制限のために待つべき秒数。
+        """
+        with self._lock:
+            st = self._state(host)
+            now = time.monotonic()
+            if st["state"] != "closed":
+                if now < st["open_until"] or st["probing"]:
+                    raise HostUnavailable(
+                        f"circuit open for {host} ({max(0, st['open_until'] - now):.0f}s left)"
+                    )
+                st["state"] = "half_open"
+                st["probing"] = True
+            return max(0.0, st["not_before"] - now)
+
+    def success(self, host, pace=None):
+        with self._lock:
+            st = self._state(host)
+            if st["state"] != "closed":
+                print(f"[fetch] circuit closed: {host}")
+            st.update(state="closed", fails=0, probing=False)
+            if pace:
+                st["not_before"] = time.monotonic() + pace
+
+    def failure(self, host, *, count=True, hold=None):
+        """失敗を記録。hold 秒（Retry-After）が指定されたらその間は即 open"""
+        with self._lock:
+            st = self._state(host)
+            if count or st["state"] == "half_open":
+                st["fails"] += 1
+            st["probing"] = False
+            if (
+                hold is not None
+                or st["state"] == "half_open"
+                or st["fails"] >= self.threshold
+            ):
+                wait = max(self.cooldown if hold is None else 0.0, hold or 0.0)
+                st.update(state="open", open_until=time.monotonic() + wait)
+                print(
+                    f"[fetch] circuit open: {host} for {wait:.0f}s "
+                    f"(consecutive failures={st['fails']})"
+                )
+
+    def snapshot(self):
+        with self._lock:
+            return {h: dict(st) for h, st in self._hosts.items()}
+
+
+HOST_BREAKER = _HostBreaker(FETCH_BREAKER_THRESHOLD, FETCH_BREAKER_COOLDOWN)
+
+
+def _proxies_from_env():
+    proxies = {
+        "http": os.getenv("HTTP_PROXY") or os.getenv("http_proxy"),
+        "https": os.getenv("HTTPS_PROXY") or os.getenv("https_proxy"),
+    }
+    return {k: v for k, v in proxies.items() if v}
+
+
+def _cffi_getter(session):
+    from curl_cffi import requests as cfr  # type: ignore[import-not-found]
+
+    # ★ http2= は渡さない
+    return functools.partial(
+        cfr.get, impersonate="chrome124", proxies=_proxies_from_env()
+    )
+
+
+def _cloudscraper_getter(session):
+    import cloudscraper
+
+    scraper = cloudscraper.create_scraper(
+        sess=session or requests.Session(),
+        browser={"browser": "chrome", "platform": "windows", "mobile": False},
+        delay=7,
+    )
+    return scraper.get
+
+
+def _requests_getter(session):
+    return (session or requests).get
+
+
+# tier 名 → session を受け取って get(url, **kw) を返すファクトリ（ライブラリ未導入なら例外 → その tier は飛ばす）
+FETCH_STRATEGIES = {
+    "curl_cffi": _cffi_getter,
+    "cloudscraper": _cloudscraper_getter,
+    "requests": _requests_getter,
+}
+BROWSER_TIERS = ("curl_cffi", "cloudscraper", "requests")
+
+
+def _retry_after_seconds(headers):
+    """Retry-After（秒 or HTTP-date）、無ければ RateLimit-Remaining=0 のときの Reset（秒 or epoch）"""
+    headers = headers or {}
+    v = (headers.get("Retry-After") or "").strip()
+    if v:
+        if v.isdigit():
+            return float(v)
+        try:
+            return max(
+                0.0,
+                (parsedate_to_datetime(v) - datetime.now(timezone.utc)).total_seconds(),
+            )
+        except Exception:
+            return None
+    remaining = headers.get("RateLimit-Remaining") or headers.get(
+        "X-RateLimit-Remaining"
+    )
+    reset = headers.get("RateLimit-Reset") or headers.get("X-RateLimit-Reset")
+    if str(remaining).strip() == "0" and reset:
+        try:
+            r = float(reset)
+        except ValueError:
+            return None
+        return max(0.0, r - time.time()) if r > 1e9 else r
+    return None
+
+
+def _backoff(wait_seconds, attempt):
+    return wait_seconds * (2**attempt) + random.uniform(0, 0.8)
+
+
+class _StreamedPage:
+    """流し読みした 200 応答。content は読んだところまでの bytes（complete=False なら途中で閉じた）"""
+
+    __slots__ = ("status_code", "headers", "url", "content", "complete")
+
+    def __init__(self, r, content, complete):
+        self.status_code = r.status_code
+        self.headers = getattr(r, "headers", None)
+        self.url = getattr(r, "url", None)
+        self.content = content
+        self.complete = complete
+
+
+def _read_streamed(r, tracker):
+    """
+    stream=True の応答をチャンクで読み、bytes はそのまま貯めつつ tracker（HTMLParser）に
+    チャンクごとに流す。tracker.done になったら残りは読まずに接続を閉じる。
+    """
+    decode = codecs.getincrementaldecoder("utf-8")("replace").decode
+    chunks = []
+    complete = True
+    with TRACER.span("stream") as attrs:
+        try:
+            for chunk in r.iter_content(STREAM_CHUNK):
+                chunks.append(chunk)
+                tracker.feed(decode(chunk))
+                if tracker.done:
+                    complete = False
+                    break
+        finally:
+            r.close()
+        content = b"".join(chunks)
+        attrs.update(bytes=len(content), complete=complete)
+    return _StreamedPage(r, content, complete)
+
+
+def fetch_url(
+    url,
+    *,
+    strategies=("requests",),
+    retries=3,
+    wait_seconds=2,
+    session=None,
+    headers=None,
+    timeout=15,
+    amp_candidates=None,
+    count_host_failures=True,
+    stop_after=None,
+):
+    """
+    strategies の tier を順に試して 200（本文あり）の応答を返す。
+    - 429/5xx/接続エラー/空本文：同じ tier で retries 回まで（Retry-After があれば従う）
+    - 403：amp_candidates(url) があれば AMP を試し、ダメなら待たずに次の tier
+    - それ以外の 4xx：再試行せず FetchError
+    count_host_failures=False は探索用（/wp-json 等だけ塞がれていてもホストを open にしない）。
+    stop_after（stream_stop(source) の返り値）を渡すと 200 の本文を流し読みし、
+    抽出対象が閉じたところで読むのをやめる（返り値の content はそこまで）。
+    """
+    host = urlparse(url).netloc
+    kwargs = {"timeout": timeout, "allow_redirects": True}
+    if headers:
+        kwargs["headers"] = headers
+    if stop_after:
+        kwargs["stream"] = True
+    last = "no strategy available"
+
+    def _get(get, target):
+        r = _traced_http(name, get, target, **kwargs)
+        if stop_after and r.status_code == 200:
+            return _read_streamed(r, stop_after())
+        return r
+
+    def _ok(r):
+        # 空判定は bytes のまま（text のデコードを避ける）
+        return r.status_code == 200 and bool((r.content or b"").strip())
+
+    for name in strategies:
         try:
-            res = requests.get(url, timeout=10)
-            if res.status_code == 200 and res.text.strip():
-                return res
+            get = FETCH_STRATEGIES[name](session)
         except Exception as e:
-            print(f"Attempt {attempt + 1} failed for {url}: {e}")
-        time.sleep(wait_seconds)
-    raise Exception(f"Failed to fetch {url} after {retries} attempts.")
+            last = f"{name}: {e}"
+            continue
+        for attempt in range(retries):
+            budget = current_budget()
+            if budget.expired():
+                record_cut("fetch", [url])
+                raise FetchError(f"time budget '{budget.name}' exhausted → {url}")
+            # 締め切りをまたぐ長い待ちをしない（最低1秒は待つ）
+            kwargs["timeout"] = min(timeout, max(1.0, budget.remaining()))
+            pace = HOST_BREAKER.before(host)
+            if pace:
+                traced_sleep(pace, "rate_limit")
+            try:
+                r = _get(get, url)
+            except Exception as e:
+                last = f"{name}: {e}"
+                print(f"[fetch:{name}] {attempt + 1}/{retries} EXC: {e} → {url}")
+                HOST_BREAKER.failure(host, count=count_host_failures)
+                if attempt + 1 < retries:
+                    traced_sleep(_backoff(wait_seconds, attempt), "backoff")
+                continue
 
+            status = r.status_code
+            retry_after = _retry_after_seconds(getattr(r, "headers", None))
+            if _ok(r):
+                HOST_BREAKER.success(host, pace=retry_after)
+                # リダイレクトされたら行き先を正規形として覚える
+                if getattr(r, "url", None) and r.url != url:
+                    learn_canonical(url, r.url)
+                return r
+            last = f"{name}: HTTP {status} len={len(r.content or b'')}"
+
+            if status in (403, 503) and amp_candidates:
+                for amp in amp_candidates(url):
+                    try:
+                        r2 = _get(get, amp)
+                    except Exception:
+                        continue
+                    if _ok(r2):
+                        HOST_BREAKER.success(host)
+                        return r2
 
-# 本文が空なら「一定秒数待って再取得」
-def extract_paragraphs_with_wait(soup_article, retries=2, wait_seconds=2):
-    for attempt in range(retries + 1):
-        paragraphs = soup_article.select("div.entry-content p")
-        if not paragraphs:
-            paragraphs = soup_article.select("div.node-content p")
-        if not paragraphs:
-            paragraphs = soup_article.select("article p")
-        if not paragraphs:
-            paragraphs = soup_article.find_all("p")
+            if status == 403:
+                HOST_BREAKER.failure(host, count=count_host_failures)
+                break
+            if status == 429 or status >= 500 or status == 200:
+                if (
+                    status != 200
+                    and retry_after
+                    and retry_after > FETCH_RETRY_AFTER_MAX
+                ):
+                    # 探索用（count_host_failures=False）はホストを止めない（HTML 巡回に落ちられるように）
+                    if not count_host_failures:
+                        raise FetchError(
+                            f"{host} asked to retry after {retry_after:.0f}s → {url}"
+                        )
+                    HOST_BREAKER.failure(host, hold=retry_after)
+                    raise HostUnavailable(
+                        f"{host} asked to retry after {retry_after:.0f}s → {url}"
+                    )
+                # 空の 200 も失敗に数える（half_open の下見で probing を残さない）
+                HOST_BREAKER.failure(host, count=count_host_failures)
+                if attempt + 1 < retries:
+                    traced_sleep(
+                        max(_backoff(wait_seconds, attempt), retry_after or 0),
+                        "backoff",
+                    )
+                continue
 
-        if paragraphs:
-            return paragraphs
+            # 404 など：サイトは応答しているので再試行しても変わらない
+            HOST_BREAKER.success(host)
+            raise FetchError(f"HTTP {status} → {url}")
 
-        print(f"Paragraphs not found, waiting {wait_seconds}s and retrying...")
-        time.sleep(wait_seconds)
-    return []
+    raise FetchError(f"Failed to fetch {url} after {retries} attempts ({last})")
+
+
+# 本文が取得できるまで「requestsでリトライする」
+@traced("fetch", _url_attr)
+def fetch_with_retry(url, retries=3, wait_seconds=2, stop_after=None):
+    return fetch_url(
+        url,
+        retries=retries,
+        wait_seconds=wait_seconds,
+        timeout=10,
+        stop_after=stop_after,
+    )
 
 
 # === 汎用の <p> 抽出器（サイト共通） ===
 def extract_body_generic_from_soup(soup):
-    for sel in ["div.entry-content p", "div.node-content p", "article p"]:
-        ps = soup.select(sel)
-        if ps:
-            break
-    else:
-        ps = soup.find_all("p")
-    txts = [p.get_text(strip=True) for p in ps if p.get_text(strip=True)]
-    return "\n".join(txts).strip()
+    return extract_record(soup, "generic")["body"]
 
 
 # === requests を使うシンプルな fetch_once（1回） ===
+@traced("fetch", _url_attr)
 def fetch_once_requests(url, timeout=15):
-    r = requests.get(url, timeout=timeout)
+    r = _traced_http("requests", requests.get, url, timeout=timeout)
     r.raise_for_status()
     # 文字化け回避のため bytes を返す（デコードは BeautifulSoup に任せる）
     return r.content
@@ -553,12 +1291,12 @@ def get_body_with_refetch(
         try:
             html = fetcher(url)
             # bytes/str どちらでも BeautifulSoup に渡せる
-            soup = BeautifulSoup(html, "html.parser")
+            soup = make_soup(html, "html.parser")
 
             # 誤って latin-1 系で解釈された場合は UTF-8 で再解釈して保険をかける
             enc = (getattr(soup, "original_encoding", None) or "").lower()
             if enc in ("iso-8859-1", "latin-1", "windows-1252"):
-                soup = BeautifulSoup(html, "html.parser", from_encoding="utf-8")
+                soup = make_soup(html, "html.parser", from_encoding="utf-8")
 
             body = extractor(soup)
             if body:
@@ -570,7 +1308,7 @@ def get_body_with_refetch(
             last_err = e
             if not quiet:
                 print(f"[refetch] EXC {attempt+1}/{retries}: {e} → {url}")
-        time.sleep(wait_seconds)
+        traced_sleep(wait_seconds, "refetch")
 
     if not quiet and last_err:
         print(f"[refetch] give up after {retries+1} tries → {url}")
@@ -578,172 +1316,69 @@ def get_body_with_refetch(
 
 
 # === Irrawaddy専用 ===
+IRRAWADDY_HEADERS = {
+    "User-Agent": BROWSER_UA,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-User": "?1",
+    "Sec-Fetch-Dest": "document",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Referer": "https://www.irrawaddy.com/",
+    "Connection": "keep-alive",
+}
+
+
 # 本文が取得できるまで「requestsでリトライする」
-def fetch_with_retry_irrawaddy(url, retries=3, wait_seconds=2, session=None):
+@traced("fetch", _url_attr)
+def fetch_with_retry_irrawaddy(
+    url,
+    retries=3,
+    wait_seconds=2,
+    session=None,
+    count_host_failures=True,
+):
     """
     まず curl_cffi(Chrome指紋) を使い、ダメなら cloudscraper、最後に requests。
-    403/429/503 は指数バックオフ。記事URLは /amp も試す。
+    429/503 は Retry-After か指数バックオフ。記事URLは 403/503 のとき /amp も試す。
     """
-    import os
-    import random
-    import time
-    import urllib.parse
-
-    UA = (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/128.0.0.0 Safari/537.36"
-    )
-    HEADERS = {
-        "User-Agent": UA,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-User": "?1",
-        "Sec-Fetch-Dest": "document",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Referer": "https://www.irrawaddy.com/",
-        "Connection": "keep-alive",
-    }
 
-    def _amp_url(u: str) -> str:
+    def _amp_candidates(u: str):
+        # 記事URL（/news/... や /business/....html）だけ。一覧・/wp-json は AMP が無い
+        if "/news/" not in u and not urlparse(u).path.endswith(".html"):
+            return []
         # https://.../path/ なら https://.../path/amp
         # https://.../path  なら https://.../path/amp
         if not u.endswith("/"):
             u = u + "/"
-        return urllib.parse.urljoin(u, "amp")
-
-    # --- Try 1: curl_cffi (Chrome 指紋) ---
-    try:
-        from curl_cffi import requests as cfr  # type: ignore[import-not-found]
-
-        proxies = {
-            "http": os.getenv("HTTP_PROXY") or os.getenv("http_proxy"),
-            "https": os.getenv("HTTPS_PROXY") or os.getenv("https_proxy"),
-        }
-        for attempt in range(retries):
-            r = cfr.get(
-                url,
-                headers=HEADERS,
-                impersonate="chrome124",  # ★ http2= は渡さない
-                timeout=30,
-                allow_redirects=True,
-                proxies={k: v for k, v in proxies.items() if v},
-            )
-            if r.status_code == 200 and (r.text or "").strip():
-                return r
-
-            # 記事URLで 403/503 のときは /amp も試す
-            if r.status_code in (403, 503) and "/news/" in url:
-                amp = _amp_url(url)
-                r2 = cfr.get(
-                    amp,
-                    headers=HEADERS,
-                    impersonate="chrome124",
-                    timeout=30,
-                    allow_redirects=True,
-                    proxies={k: v for k, v in proxies.items() if v},
-                )
-                if r2.status_code == 200 and (r2.text or "").strip():
-                    return r2
-
-            if r.status_code in (403, 429, 503):
-                time.sleep(wait_seconds * (2**attempt) + random.uniform(0, 0.8))
-                continue
-            break
-    except Exception as e:
-        print(f"[fetch-cffi] EXC: {e} → {url}")
-
-    # --- Try 2: cloudscraper ---
-    try:
-        import cloudscraper
-        import requests as rq
-
-        sess = session or rq.Session()
-        scraper = cloudscraper.create_scraper(
-            sess=sess,
-            browser={"browser": "chrome", "platform": "windows", "mobile": False},
-            delay=7,
-        )
-        for attempt in range(retries):
-            try:
-                r = scraper.get(url, headers=HEADERS, timeout=30, allow_redirects=True)
-                if r.status_code == 200 and getattr(r, "text", "").strip():
-                    return r
-
-                # 記事URLのときは /amp も
-                if r.status_code in (403, 503) and "/news/" in url:
-                    amp = _amp_url(url)
-                    r2 = scraper.get(
-                        amp, headers=HEADERS, timeout=30, allow_redirects=True
-                    )
-                    if r2.status_code == 200 and getattr(r2, "text", "").strip():
-                        return r2
-
-                if r.status_code in (403, 429, 503):
-                    time.sleep(wait_seconds * (2**attempt) + random.uniform(0, 0.8))
-                    continue
-                break
-            except Exception as e:
-                print(f"[fetch-cs] {attempt+1}/{retries} EXC: {e} → {url}")
-                time.sleep(wait_seconds * (2**attempt) + random.uniform(0, 0.8))
-    except Exception as e:
-        print(f"[fetch-cs] INIT EXC: {e} → {url}")
-
-    # --- Try 3: requests ---
-    try:
-        import requests
-
-        sess = session or requests.Session()
-        r2 = sess.get(url, headers=HEADERS, timeout=20, allow_redirects=True)
-        print(
-            f"[fetch-rq] final: HTTP {r2.status_code} len={len(getattr(r2,'text',''))} → {url}"
-        )
-        if r2.status_code == 200 and getattr(r2, "text", "").strip():
-            return r2
-        if r2.status_code in (403, 503) and "/news/" in url:
-            amp = _amp_url(url)
-            r3 = sess.get(amp, headers=HEADERS, timeout=20, allow_redirects=True)
-            print(
-                f"[fetch-rq] amp: HTTP {r3.status_code} len={len(getattr(r3,'text',''))} → {amp}"
-            )
-            if r3.status_code == 200 and getattr(r3, "text", "").strip():
-                return r3
-
-        try:
-            svr = r2.headers.get("server") or r2.headers.get("Server")
-            ray = r2.headers.get("cf-ray")
-            sucuri = r2.headers.get("x-sucuri-id") or r2.headers.get("x-sucuri-block")
-            print(f"[fetch-rq] headers: server={svr} cf-ray={ray} sucuri={sucuri}")
-        except Exception:
-            pass
-    except Exception as e:
-        print(f"[fetch-rq] EXC final: {e} → {url}")
-
-    raise Exception(f"Failed to fetch {url} after {retries} attempts.")
+        return [urllib.parse.urljoin(u, "amp")]
+
+    return fetch_url(
+        url,
+        strategies=BROWSER_TIERS,
+        retries=retries,
+        wait_seconds=wait_seconds,
+        session=session,
+        headers=IRRAWADDY_HEADERS,
+        timeout=30,
+        amp_candidates=_amp_candidates,
+        count_host_failures=count_host_failures,
+    )
 
 
 # === DVB専用 ===
+@traced("fetch", _url_attr)
 def fetch_with_retry_dvb(url, retries=4, wait_seconds=2, session=None):
     """
     DVB (https://burmese.dvb.no) 向けの多段フェッチャ。
     1) curl_cffi(Chrome指紋) → 2) cloudscraper → 3) requests の順。
-    403/429/503 は指数バックオフ。/post/* では /amp / ?output=amp も試す。
+    429/503 は Retry-After か指数バックオフ。/post/* では /amp / ?output=amp も試す。
     """
-    import os
-    import time
-    import random
-
-    UA = (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/128.0.0.0 Safari/537.36"
-    )
-    BASE = "https://burmese.dvb.no"
+    BASE = SOURCE_BASE_URLS["dvb"]
     HEADERS = {
-        "User-Agent": UA,
+        "User-Agent": BROWSER_UA,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9,my;q=0.8,ja;q=0.7",
         "Upgrade-Insecure-Requests": "1",
@@ -757,179 +1392,1934 @@ def fetch_with_retry_dvb(url, retries=4, wait_seconds=2, session=None):
     }
 
     def _amp_candidates(u: str):
+        if "/post/" not in u:
+            return []
         u = u.strip()
         q = "&" if "?" in u else "?"
         return [u.rstrip("/") + "/amp", u + f"{q}output=amp"]
 
-    # --- Try 1: curl_cffi ---
-    try:
-        from curl_cffi import requests as cfr  # type: ignore
+    return fetch_url(
+        url,
+        strategies=BROWSER_TIERS,
+        retries=retries,
+        wait_seconds=wait_seconds,
+        session=session,
+        headers=HEADERS,
+        timeout=30,
+        amp_candidates=_amp_candidates,
+    )
 
-        proxies = {
-            "http": os.getenv("HTTP_PROXY") or os.getenv("http_proxy"),
-            "https": os.getenv("HTTPS_PROXY") or os.getenv("https_proxy"),
-        }
-        for attempt in range(retries):
-            r = cfr.get(
-                url,
-                headers=HEADERS,
-                impersonate="chrome124",
-                timeout=30,
-                allow_redirects=True,
-                proxies={k: v for k, v in proxies.items() if v},
-            )
-            if r.status_code == 200 and (r.text or "").strip():
-                return r
-            # 記事URLはAMP系も試す
-            if r.status_code in (403, 503) and "/post/" in url:
-                for amp in _amp_candidates(url):
-                    r2 = cfr.get(
-                        amp,
-                        headers=HEADERS,
-                        impersonate="chrome124",
-                        timeout=30,
-                        allow_redirects=True,
-                        proxies={k: v for k, v in proxies.items() if v},
-                    )
-                    if r2.status_code == 200 and (r2.text or "").strip():
-                        return r2
-            if r.status_code in (403, 429, 503):
-                time.sleep(wait_seconds * (2**attempt) + random.uniform(0, 0.8))
+
+def _norm_text(text: str) -> str:
+    return unicodedata.normalize("NFC", text)
+
+
+# ===== URL の正規化（同じ記事の別表記を1つのキーに） =====
+# /amp・?output=amp・追跡用パラメータ（utm_* や BBC RSS の at_*）・%エンコードの揺れ（生のビルマ文字と
+# %E1%80... の混在、大小）・ホストの大小・既定ポート・末尾の / を規則で揃え、さらに記事ページの
+# <link rel="canonical"> とリダイレクト先から「この URL の正規形はこれ」を学習して state に残す。
+# 学習した別名は次の実行から記事を取る前（処理済み URL の確認）にも効く。
+# 処理済み URL・URL 重複排除・LLM 重複判定の ID・要約キャッシュ・キューの一意キーはすべて _norm_id（＝これ）で引く。
+# 正規形はそのまま開ける URL（スキームと www は変えない。揃えるのは rel=canonical の学習に任せる）。
+CANONICAL_STATE = "canonical_urls.json"
+CANONICAL_MAX_ALIASES = 5000  # 覚えておく別名の数（古いものから捨てる）
+_TRACKING_PARAM_RE = re.compile(
+    r"^(utm_\w+|at_\w+|fbclid|gclid|dclid|mc_cid|mc_eid|igshid|ocid|ref_src)$", re.I
+)
+_AMP_PARAMS = {"amp": ("", "1", "amp"), "output": ("amp",)}
+_URL_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+_canonical_aliases = None
+_canonical_dirty = False
+_CANONICAL_LOCK = threading.Lock()
+
+
+def _drop_param(key: str, value: str) -> bool:
+    return bool(_TRACKING_PARAM_RE.match(key)) or value.lower() in _AMP_PARAMS.get(
+        key.lower(), ()
+    )
+
+
+@functools.lru_cache(maxsize=8192)
+def _canonical_by_rule(url: str) -> str:
+    url = url.strip()
+    try:
+        parts = urllib.parse.urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url.rstrip("/")
+    if not parts.scheme or not parts.netloc:
+        return url.rstrip("/")
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    path = unicodedata.normalize("NFC", urllib.parse.unquote(parts.path))
+    path = urllib.parse.quote(re.sub(r"/{2,}", "/", path), safe=_URL_PATH_SAFE)
+    path = path.rstrip("/")
+    if path.endswith("/amp"):
+        path = path[: -len("/amp")]
+    query = urllib.parse.urlencode(
+        sorted(
+            (k, v)
+            for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+            if not _drop_param(k, v)
+        )
+    )
+    return urllib.parse.urlunsplit((scheme, host, path, query, ""))
+
+
+def _aliases() -> dict:
+    global _canonical_aliases
+    if _canonical_aliases is None:
+        _canonical_aliases = load_json_state(CANONICAL_STATE, {})
+    return _canonical_aliases
+
+
+def canonical_url(url: str) -> str:
+    """規則で揃えた形を、学習済みの別名があれば正規形に置き換えて返す"""
+    aliases = _aliases()
+    u = _canonical_by_rule(url)
+    u = aliases.get(u, u)
+    return aliases.get(u, u)  # 後から正規形のほうが別名になった場合も辿る
+
+
+def _bare_host(netloc: str) -> str:
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+# 記事ではなく一覧・分類のページらしいパス（ここを正規形に名乗るページは信用しない）
+_LISTING_PATH_RE = re.compile(
+    r"/(?:category|categories|tag|tags|topic|topics|author|page|search|feed)(?:/|$)",
+    re.I,
+)
+
+
+def _article_like_target(src_path: str, dst_path: str) -> bool:
+    """正規形の行き先が記事ページらしいか（トップ・一覧・url の上位階層は不可）"""
+    if dst_path in ("", "/") or _LISTING_PATH_RE.search(dst_path):
+        return False
+    return not src_path.startswith(dst_path.rstrip("/") + "/")
+
+
+def learn_canonical(url, canonical) -> None:
+    """
+    url の正規形が canonical だと分かったら覚える。同じサイト内で、行き先が記事ページらしく、
+    まだ他の URL の正規形になっていないときだけ（一覧を指す canonical や、取り違えた link で
+    別々の記事を1つのキーにまとめないように）。それ以外は規則で揃えた URL のまま。
+    """
+    global _canonical_dirty
+    if not url or not canonical:
+        return
+    src = _canonical_by_rule(url)
+    dst = _canonical_by_rule(urllib.parse.urljoin(url, canonical))
+    if src == dst:
+        return
+    s, d = urllib.parse.urlsplit(src), urllib.parse.urlsplit(dst)
+    if _bare_host(s.netloc) != _bare_host(d.netloc):
+        return
+    if not _article_like_target(s.path, d.path):
+        return
+    with _CANONICAL_LOCK:
+        aliases = _aliases()
+        dst = aliases.get(dst, dst)
+        if aliases.get(src) == dst or dst == src:
+            return
+        if any(v == dst for k, v in aliases.items() if k != src):
+            return  # 別の URL がすでにここを正規形にしている
+        aliases.pop(src, None)
+        aliases[src] = dst
+        while len(aliases) > CANONICAL_MAX_ALIASES:
+            del aliases[next(iter(aliases))]
+        _canonical_dirty = True
+
+
+def canonical_save() -> None:
+    global _canonical_dirty
+    with _CANONICAL_LOCK:
+        if _canonical_aliases is None or not _canonical_dirty:
+            return
+        save_json_state(CANONICAL_STATE, _canonical_aliases)
+        _canonical_dirty = False
+
+
+def _norm_id(u):
+    """ID/URL照合用の正規化：文字列は canonical_url（規則＋学習した rel=canonical）に揃える"""
+    if isinstance(u, str):
+        return canonical_url(u)
+    return u
+
+
+# ===== 公開日の下見（記事ページの <head> だけ読む） =====
+# 一覧に日付が出ないソース（Mizzima / Khit Thit の HTML 巡回、Irrawaddy の候補）は、記事ページを
+# 丸ごと取ってから <head> の article:published_time を見て、大半を対象日外として捨てていた。
+# 先に先頭の数 KB だけを Range で頼み、<head> を逐次パースして公開日と rel=canonical を読む。
+# 対象日外なら本体は取らない。Range を無視して 200 で全体を返すサーバからは、</head>（か両方が
+# 揃ったところ）で読むのをやめて接続を閉じる。下見で分からなければ今まで通り全体を取る。
+HEAD_PROBE_ENABLED = str(os.getenv("DIGEST_HEAD_PROBE", "1")).lower() not in (
+    "0",
+    "false",
+    "no",
+)
+HEAD_PROBE_BYTES = int(
+    os.getenv("DIGEST_HEAD_PROBE_BYTES", "16384")
+)  # Range で頼む長さ
+HEAD_PROBE_MAX_BYTES = 256 * 1024  # Range を無視されたとき </head> を待つ上限
+HEAD_PROBE_CHUNK = 4096
+
+
+class _HeadParser(HTMLParser):
+    """<head> の公開日 meta と rel=canonical だけを拾う。</head> か <body> で done"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.published = None
+        self.canonical = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        if tag not in ("meta", "link"):
+            return
+        a = dict(attrs)
+        if tag == "meta" and a.get("property") == "article:published_time":
+            self.published = self.published or (a.get("content") or "").strip() or None
+        elif tag == "link" and "canonical" in (a.get("rel") or "").lower().split():
+            self.canonical = self.canonical or (a.get("href") or "").strip() or None
+        if self.published and self.canonical:
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def _read_head(r, limit: int) -> tuple:
+    """応答をチャンクで読みながらパーサに流し、done か limit で止める → (parser, 読んだバイト数)"""
+    parser = _HeadParser()
+    decode = codecs.getincrementaldecoder("utf-8")("replace").decode
+    n = 0
+    for chunk in r.iter_content(HEAD_PROBE_CHUNK):
+        n += len(chunk)
+        parser.feed(decode(chunk))
+        if parser.done or n >= limit:
+            break
+    return parser, n
+
+
+def probe_head(
+    url, *, strategies=("requests",), session=None, headers=None, timeout=10
+):
+    """
+    記事ページの <head> だけを読んで {"published", "date", "canonical"} を返す。
+    再試行はしない。取れない・<head> が読み切れないうちに公開日が無いときは None（全体を取る側に任せる）。
+    """
+    host = urlparse(url).netloc
+    kwargs = {
+        "headers": {**(headers or {}), "Range": f"bytes=0-{HEAD_PROBE_BYTES - 1}"},
+        "allow_redirects": True,
+        "stream": True,
+    }
+    for name in strategies:
+        try:
+            get = FETCH_STRATEGIES[name](session)
+        except Exception:
+            continue
+        budget = current_budget()
+        if budget.expired():
+            return None
+        kwargs["timeout"] = min(timeout, max(1.0, budget.remaining()))
+        try:
+            pace = HOST_BREAKER.before(host)
+        except HostUnavailable:
+            return None
+        if pace:
+            traced_sleep(pace, "rate_limit")
+        with TRACER.span("probe", strategy=name, url=url) as attrs:
+            try:
+                r = _traced_http(name, get, url, **kwargs)
+            except Exception:
+                HOST_BREAKER.failure(host, count=False)
                 continue
+            try:
+                attrs["status"] = r.status_code
+                if r.status_code not in (200, 206):
+                    # 失敗には数えない（本体の取得で改めて判断する）。403 だけは次の tier へ
+                    HOST_BREAKER.failure(host, count=False)
+                    if r.status_code == 403:
+                        continue
+                    return None
+                HOST_BREAKER.success(host)
+                limit = (
+                    HEAD_PROBE_BYTES if r.status_code == 206 else HEAD_PROBE_MAX_BYTES
+                )
+                head, attrs["bytes"] = _read_head(r, limit)
+            finally:
+                r.close()
+            if not head.published and not head.done:
+                return None
+            attrs["published"] = head.published
+            if getattr(r, "url", None) and r.url != url:
+                learn_canonical(url, r.url)
+            return {
+                "published": head.published,
+                "date": _published_date_mmt(head.published),
+                "canonical": head.canonical
+                and urllib.parse.urljoin(url, head.canonical),
+            }
+    return None
+
+
+def head_probe_skip(source_name, url, date_obj, **fetch_kw) -> bool:
+    """
+    本体を取る前の下見。対象日外（off_date として処理済みに残す）か、正規形で見ると
+    処理済みだった記事なら True。下見できない・公開日が無いときは False（全体を取る）。
+    """
+    if not HEAD_PROBE_ENABLED:
+        return False
+    head = probe_head(url, **fetch_kw)
+    if head is None:
+        return False
+    learn_canonical(url, head["canonical"])
+    if seen_skip(source_name, url):
+        return True
+    if head["date"] and not date_matches(head["date"], date_obj):
+        seen_record(source_name, url, "off_date")
+        return True
+    return False
+
+
+# ===== 定型文（ボイラープレート）の学習と除去 =====
+# 署名・購読の案内・「フォローしてください」・関連記事の見出しなど、同じソースの記事に繰り返し出る
+# 行（と、行の中の文）を、記事をまたいだ出現頻度から学習して要約の前に落とす。
+# 「何記事に出たか」をソースごとに数えて state に残し、読み込むたびに減衰させるので最近の実行に追従する。
+# 同じ URL は二度数えない（backfill の重なりや再実行で偏らないように）。
+BOILERPLATE_ENABLED = str(os.getenv("DIGEST_BOILERPLATE", "1")).lower() not in (
+    "0",
+    "false",
+    "no",
+)
+BOILERPLATE_STATE = "boilerplate.json"
+BOILERPLATE_MIN_DOCS = 20  # ソースの記事数（減衰後）がこれ未満のうちは落とさない
+BOILERPLATE_MIN_COUNT = 5  # 最低この記事数に出たもの
+BOILERPLATE_MIN_SHARE = 0.3  # かつ、この割合以上の記事に出たもの
+BOILERPLATE_DECAY = 0.9  # 読み込みごとの減衰
+BOILERPLATE_MAX_UNITS = 3000  # ソースごとに残す候補数
+BOILERPLATE_SEEN_URLS = 3000  # ソースごとに覚えておく URL 数
+BOILERPLATE_MIN_CHARS = 4
+_UNIT_DIGITS_RE = re.compile(r"[0-9\u1040-\u1049]+")
+_UNIT_SPACE_RE = re.compile(r"\s+")
+
+
+def _unit_key(text: str) -> Optional[str]:
+    """行・文の比較用キー（小文字化・数字を 0 に・空白を1つに。短すぎるものは None）"""
+    norm = _UNIT_SPACE_RE.sub(" ", _UNIT_DIGITS_RE.sub("0", text.lower())).strip()
+    if len(norm) < BOILERPLATE_MIN_CHARS:
+        return None
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16]
+
+
+def _line_units(line: str):
+    """行 → [(キー, 文)]（1文だけの行は文に分けない）"""
+    sents = [m.group() for m in _SENTENCE_RE.finditer(line) if m.group().strip()]
+    if len(sents) < 2:
+        return []
+    return [(_unit_key(t), t) for t in sents]
+
+
+class BoilerplateModel:
+    """
+    ソースごとの {"docs": 記事数, "units": {キー: [記事数, 見本]}, "seen": [URL ハッシュ]}。
+    記事数はいずれも減衰つき（float）。
+    """
+
+    def __init__(self, state=None):
+        self.sources = state or {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls):
+        state = load_json_state(BOILERPLATE_STATE, {})
+        for src in state.values():
+            src["docs"] *= BOILERPLATE_DECAY
+            for unit in src["units"].values():
+                unit[0] *= BOILERPLATE_DECAY
+        return cls(state)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        for src in self.sources.values():
+            units = src["units"]
+            if len(units) > BOILERPLATE_MAX_UNITS:
+                keep = sorted(units.items(), key=lambda kv: -kv[1][0])
+                src["units"] = dict(keep[:BOILERPLATE_MAX_UNITS])
+            src["seen"] = src["seen"][-BOILERPLATE_SEEN_URLS:]
+        save_json_state(BOILERPLATE_STATE, self.sources)
+        self.dirty = False
+
+    def observe(self, source: str, url: str, body: str) -> None:
+        """記事1件ぶんの行・文を数える（同じ URL は一度だけ）"""
+        src = self.sources.setdefault(source, {"docs": 0.0, "units": {}, "seen": []})
+        h = hashlib.sha1(_norm_id(url or "").encode("utf-8")).hexdigest()[:12]
+        if h in src["seen"]:
+            return
+        src["seen"].append(h)
+        src["docs"] += 1
+        found = {}
+        for line in body.split("\n"):
+            found.setdefault(_unit_key(line), line)
+            for key, sent in _line_units(line):
+                found.setdefault(key, sent)
+        found.pop(None, None)
+        units = src["units"]
+        for key, text in found.items():
+            unit = units.get(key)
+            if unit is None:
+                units[key] = [1.0, text.strip()[:80]]
+            else:
+                unit[0] += 1
+        self.dirty = True
+
+    def is_boilerplate(self, source: str, key: Optional[str]) -> bool:
+        src = self.sources.get(source)
+        if key is None or not src or src["docs"] < BOILERPLATE_MIN_DOCS:
+            return False
+        unit = src["units"].get(key)
+        return (
+            unit is not None
+            and unit[0] >= BOILERPLATE_MIN_COUNT
+            and unit[0] >= BOILERPLATE_MIN_SHARE * src["docs"]
+        )
+
+    def strip(self, source: str, body: str):
+        """定型文の行・文を落とした本文と、落としたテキストのリスト"""
+        out, removed = [], []
+        for line in body.split("\n"):
+            if self.is_boilerplate(source, _unit_key(line)):
+                removed.append(line)
+                continue
+            units = _line_units(line)
+            if units and any(self.is_boilerplate(source, k) for k, _ in units):
+                kept = []
+                for key, sent in units:
+                    (removed if self.is_boilerplate(source, key) else kept).append(sent)
+                line = "".join(kept).rstrip()
+                if not line:
+                    continue
+            out.append(line)
+        stripped = "\n".join(out).strip()
+        if not removed or not stripped:  # 全部が定型文に見えるときは何もしない
+            return body, []
+        return stripped, removed
+
+    def learned(self, source: str):
+        """定型文とみなしている見本（多い順）"""
+        src = self.sources.get(source) or {"units": {}}
+        return sorted(
+            (
+                (unit[0], unit[1])
+                for key, unit in src["units"].items()
+                if self.is_boilerplate(source, key)
+            ),
+            reverse=True,
+        )
+
+
+_boilerplate = None
+# ソースごとの除去量 {source: {"articles", "units", "bytes", "tokens"}}
+BOILERPLATE_STATS = defaultdict(
+    lambda: dict.fromkeys(("articles", "units", "bytes", "tokens"), 0)
+)
+
+
+def boilerplate_model() -> BoilerplateModel:
+    global _boilerplate
+    if _boilerplate is None:
+        _boilerplate = BoilerplateModel.load()
+    return _boilerplate
+
+
+def strip_boilerplate(source: str, body: str) -> str:
+    """そのソースの定型文を落とすだけ（学習はしない。DIGEST_BOILERPLATE=0 なら素通し）"""
+    if not BOILERPLATE_ENABLED or not body:
+        return body
+    model = boilerplate_model()
+    stripped, removed = model.strip(source, body)
+    if removed:
+        text = "\n".join(removed)
+        st = BOILERPLATE_STATS[source]
+        st["articles"] += 1
+        st["units"] += len(removed)
+        st["bytes"] += len(text.encode("utf-8"))
+        st["tokens"] += estimate_tokens(text)
+    return stripped
+
+
+def observe_boilerplate(source: str, url: str, body: str) -> None:
+    """記事を定型文の学習に足す（落とすのは strip_boilerplate）"""
+    if BOILERPLATE_ENABLED and body:
+        boilerplate_model().observe(source, url, body)
+
+
+def boilerplate_save() -> None:
+    if _boilerplate is not None:
+        _boilerplate.save()
+
+
+def boilerplate_report_lines(stats=None):
+    stats = BOILERPLATE_STATS if stats is None else stats
+    return [
+        f"boilerplate {source}: {st['units']:,} line(s)/sentence(s) in "
+        f"{st['articles']} article(s), {st['bytes']:,} B, ~{st['tokens']:,} tokens removed"
+        for source, st in sorted(stats.items())
+    ]
+
+
+# ===== 記事レコード =====
+# コレクタ → enqueue → キュー → 要約 を流れる記事1件。dict と同じ読み方（art["url"] /
+# art.get("body") / {**art}）ができるので、JSONL やキューにはそのまま渡せる。
+# NFC 正規化・キーワード判定・指紋・トークン数は一度計算したら持ち回り、後段で再計算しない。
+ARTICLE_FIELDS = ("source", "url", "title", "body", "date")
+
+
+@functools.lru_cache(maxsize=None)
+def canonical_source(name):
+    """コレクタのキー（"irrawaddy"）や大文字小文字の揺れを SOURCE_SPECS の表示名にそろえる"""
+    if not name:
+        return name
+    for spec in SOURCE_SPECS:
+        if name in (spec["key"], spec["name"]) or name.lower() in (
+            spec["key"],
+            spec["name"].lower(),
+        ):
+            return spec["name"]
+    return name
+
+
+# ===== トークン見積もり（文字種別、gemini_usage.log で較正） =====
+# ミャンマー文字は英字よりずっと細かくトークン化されるので、同じ字数でもトークン数が大きく違う。
+# 「ミャンマー文字・日本語（CJK）・その他」の字数 × 文字種ごとの 1字あたりトークン数で見積もる。
+# 係数は gemini_usage.log（プロンプトの文字種別字数と実際の prompt_token_count）から最小二乗で求め、
+# 記録が少ないうちは既定値に寄せる。確認は `python fetch_articles.py tokens`。
+GEMINI_USAGE_LOG = "gemini_usage.log"
+DEFAULT_TOKEN_RATES = {"my": 0.5, "cjk": 0.8, "other": 0.25}
+TOKEN_SCRIPTS = tuple(DEFAULT_TOKEN_RATES)
+TOKEN_CALIBRATION_MIN = 20  # これ未満の記録なら既定値のまま
+TOKEN_CALIBRATION_TAIL = 2000  # 直近何件で較正するか
+_SCRIPT_RES = {
+    "my": re.compile(r"[\u1000-\u109f\uaa60-\uaa7f\ua9e0-\ua9ff]+"),
+    "cjk": re.compile(r"[\u3000-\u30ff\u4e00-\u9fff\uff00-\uffef]+"),
+}
+_token_rates = None
+
+
+def script_counts(text: str) -> dict:
+    """文字種別の字数 {"my", "cjk", "other"}"""
+    counts = {k: sum(map(len, rx.findall(text))) for k, rx in _SCRIPT_RES.items()}
+    counts["other"] = len(text) - sum(counts.values())
+    return counts
+
+
+def load_token_samples(path=GEMINI_USAGE_LOG, *, tail=TOKEN_CALIBRATION_TAIL):
+    """gemini_usage.log の直近 tail 件から [([字数 my, cjk, other], prompt_token_count)]"""
+    rows = []
+    with contextlib.suppress(FileNotFoundError):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in deque(f, maxlen=tail):
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                chars, tokens = rec.get("prompt_chars"), rec.get("prompt_token_count")
+                if isinstance(chars, dict) and tokens:
+                    rows.append(([chars.get(k, 0) for k in TOKEN_SCRIPTS], tokens))
+    return rows
+
+
+def fit_token_rates(rows) -> dict:
+    """
+    文字種別の係数を最小二乗で求める（記録が TOKEN_CALIBRATION_MIN 件未満なら既定値）。
+    (XᵀX + λI) a = Xᵀy + λ·既定値 として、どれかの文字種がほとんど出ないときは既定値に寄せる。
+    """
+    if len(rows) < TOKEN_CALIBRATION_MIN:
+        return dict(DEFAULT_TOKEN_RATES)
+    n = len(TOKEN_SCRIPTS)
+    xtx = [[sum(x[i] * x[j] for x, _ in rows) for j in range(n)] for i in range(n)]
+    xty = [sum(x[i] * y for x, y in rows) for i in range(n)]
+    lam = 1e-3 * (sum(xtx[i][i] for i in range(n)) / n or 1.0)
+    prior = [DEFAULT_TOKEN_RATES[k] for k in TOKEN_SCRIPTS]
+    a = [row[:] + [xty[i] + lam * prior[i]] for i, row in enumerate(xtx)]
+    for i in range(n):
+        a[i][i] += lam
+    for i in range(n):  # ガウスの消去法（正定値なのでピボット不要）
+        for j in range(i + 1, n):
+            f = a[j][i] / a[i][i]
+            for k in range(i, n + 1):
+                a[j][k] -= f * a[i][k]
+    coef = [0.0] * n
+    for i in reversed(range(n)):
+        coef[i] = (a[i][n] - sum(a[i][k] * coef[k] for k in range(i + 1, n))) / a[i][i]
+    return {k: max(c, 0.01) for k, c in zip(TOKEN_SCRIPTS, coef)}
+
+
+def token_rate_error(rows, rates) -> Optional[float]:
+    """見積もりと実際の prompt_token_count の平均絶対誤差率"""
+    if not rows:
+        return None
+    return sum(
+        abs(sum(rates[k] * c for k, c in zip(TOKEN_SCRIPTS, x)) - y) / y
+        for x, y in rows
+    ) / len(rows)
+
+
+def token_rates() -> dict:
+    """初回に gemini_usage.log で較正した係数（以後は使い回す）"""
+    global _token_rates
+    if _token_rates is None:
+        _token_rates = fit_token_rates(load_token_samples())
+    return _token_rates
+
+
+def estimate_tokens(text: str, rates=None) -> int:
+    rates = rates or token_rates()
+    counts = script_counts(text)
+    return round(sum(rates[k] * counts[k] for k in TOKEN_SCRIPTS))
+
+
+# 段落（改行）→ 文（ミャンマー語の ။、日本語の 。、英語の . ! ?）の順に切れ目を探す
+_PARAGRAPH_RE = re.compile(r"[^\n]*(?:\n+|$)")
+_SENTENCE_RE = re.compile(r".+?(?:[။。！？]+\s*|[.!?]+(?:\s+|$)|$)", re.S)
+
+
+def truncate_to_tokens(text: str, budget: int, rates=None):
+    """
+    text を見積もり budget トークン以内の先頭部分に切る（段落、だめなら文の切れ目で）。
+    返り値: (切った本文, 元の見積もりトークン数, 切った後の見積もりトークン数)
+    """
+    rates = rates or token_rates()
+    full = estimate_tokens(text, rates)
+    if full <= budget:
+        return text, full, full
+
+    used, end = 0, 0
+    for para in _PARAGRAPH_RE.finditer(text):
+        if para.start() == para.end():
             break
+        t = estimate_tokens(para.group(), rates)
+        if used + t <= budget:
+            used, end = used + t, para.end()
+            continue
+        for sent in _SENTENCE_RE.finditer(text, para.start(), para.end()):
+            t = estimate_tokens(sent.group(), rates)
+            if used + t > budget:
+                # 入りきらない文（切れ目の無い長い段落など）は残りの予算ぶんを比例で切って足す
+                end, t = _cut_to_fit(
+                    text, sent.start(), sent.end(), budget - used, rates
+                )
+                used += t
+                break
+            used, end = used + t, sent.end()
+        break
+    kept = text[:end].strip()
+    return kept, full, used
+
+
+def _cut_to_fit(text: str, start: int, stop: int, budget: int, rates):
+    """text[start:stop] の先頭を budget トークンに収まるだけ取る → (終わりの位置, 見積もり)"""
+    if budget <= 0:
+        return start, 0
+    total = estimate_tokens(text[start:stop], rates)
+    end = start + max(1, (stop - start) * budget // max(total, 1))
+    t = estimate_tokens(text[start:end], rates)
+    while t > budget and end > start:
+        # 文字種の偏りで少し超えたら縮める
+        end = start + min(end - start - 1, (end - start) * budget // t)
+        t = estimate_tokens(text[start:end], rates)
+    return end, t
+
+
+# ===== 長い本文の抽出的な事前要約（TextRank） =====
+# 予算を超える本文は先頭から切る代わりに、文どうしの類似度グラフで PageRank を回し、
+# 重要度の高い文から予算まで選んで元の順に並べる（DIGEST_EXTRACTIVE=1 のときだけ）。
+# 英語は単語、ミャンマー語（語の区切りが無い）は文字 3-gram を特徴にした TF-IDF のコサイン類似度。
+# ランダムジャンプ先はタイトルとの類似度と先頭寄りの重みで偏らせ、見出しの事実を含む文を選びやすくする。
+# numpy があれば行列演算、無ければ転置インデックスで同じ計算をする。
+EXTRACTIVE_ENABLED = str(os.getenv("DIGEST_EXTRACTIVE", "0")).lower() in (
+    "1",
+    "true",
+    "yes",
+)
+EXTRACTIVE_MIN_SENTENCES = 4  # これより文が少なければ先頭から切る
+EXTRACTIVE_DAMPING = 0.85
+EXTRACTIVE_MAX_DF = 0.5  # 半分以上の文に出る特徴は捨てる（ほぼストップワード）
+EXTRACTIVE_MAX_OVERLAP = 0.7  # 選んだ文とこれ以上似ている文は重複として飛ばす
+_EN_WORD_RE = re.compile(r"[a-z][a-z'\-]+")
+_MY_RUN_RE = re.compile(r"[\u1000-\u109f]+")
+_EN_STOPWORDS = frozenset(
+    "the and for that with was were are has have had from this his her its their "
+    "they them said says not but been will would also who which what when where "
+    "into than then there about after before over under more most such".split()
+)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _sentence_features(text: str) -> Counter:
+    feats = Counter(
+        w for w in _EN_WORD_RE.findall(text.lower()) if w not in _EN_STOPWORDS
+    )
+    for run in _MY_RUN_RE.findall(text):
+        feats.update(run[i : i + 3] for i in range(len(run) - 2))
+    return feats
+
+
+def _tfidf(docs):
+    """Counter のリスト → L2 正規化した {特徴: 重み} のリスト"""
+    n = len(docs)
+    df = Counter(f for d in docs for f in d)
+    max_df = max(2, EXTRACTIVE_MAX_DF * n)
+    vecs = []
+    for d in docs:
+        v = {
+            f: (1 + math.log(tf)) * math.log((n + 1) / (df[f] + 1))
+            for f, tf in d.items()
+            if df[f] <= max_df
+        }
+        norm = math.sqrt(sum(w * w for w in v.values())) or 1.0
+        vecs.append({f: w / norm for f, w in v.items()})
+    return vecs
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(f, 0.0) for f, w in a.items())
+
+
+def _pagerank_py(vecs, teleport, damping, iters=50, tol=1e-8):
+    n = len(vecs)
+    index = defaultdict(list)
+    for i, v in enumerate(vecs):
+        for f, w in v.items():
+            index[f].append((i, w))
+    sim = [defaultdict(float) for _ in range(n)]
+    for postings in index.values():
+        for a, (i, wi) in enumerate(postings):
+            for j, wj in postings[a + 1 :]:
+                sim[i][j] += wi * wj
+                sim[j][i] += wi * wj
+    out = [sum(row.values()) for row in sim]
+    score = list(teleport)
+    for _ in range(iters):
+        dangling = sum(score[i] for i in range(n) if not out[i])
+        new = [(1 - damping + damping * dangling) * t for t in teleport]
+        for i, row in enumerate(sim):
+            if out[i]:
+                share = damping * score[i] / out[i]
+                for j, s in row.items():
+                    new[j] += share * s
+        delta = sum(abs(a - b) for a, b in zip(new, score))
+        score = new
+        if delta < tol:
+            break
+    return score
+
+
+def _pagerank_np(np, vecs, teleport, damping, iters=50, tol=1e-8):
+    feats = {f: k for k, f in enumerate({f for v in vecs for f in v})}
+    x = np.zeros((len(vecs), len(feats)))
+    for i, v in enumerate(vecs):
+        for f, w in v.items():
+            x[i, feats[f]] = w
+    sim = x @ x.T
+    np.fill_diagonal(sim, 0.0)
+    out = sim.sum(axis=1)
+    has_out = out > 0
+    trans = np.divide(sim, out[:, None], out=np.zeros_like(sim), where=has_out[:, None])
+    t = np.asarray(teleport)
+    score = t.copy()
+    for _ in range(iters):
+        dangling = score[~has_out].sum()
+        new = (1 - damping + damping * dangling) * t + damping * (score @ trans)
+        delta = np.abs(new - score).sum()
+        score = new
+        if delta < tol:
+            break
+    return score.tolist()
+
+
+def extractive_select(text: str, budget: int, title: str = "", rates=None):
+    """
+    本文から重要な文を予算（見積もりトークン）まで選び、元の順に並べて返す。
+    文が少なすぎるときは None（呼び出し側で先頭から切る）。
+    """
+    rates = rates or token_rates()
+    sents = []  # (段落番号, 文)
+    for p_no, para in enumerate(_PARAGRAPH_RE.finditer(text)):
+        for m in _SENTENCE_RE.finditer(text, para.start(), para.end()):
+            if m.group().strip():
+                sents.append((p_no, m.group().strip()))
+    if len(sents) < EXTRACTIVE_MIN_SENTENCES:
+        return None
+
+    vecs = _tfidf([_sentence_features(t) for _, t in sents + [(None, title)]])
+    title_vec = vecs.pop()
+    n = len(sents)
+    teleport = [
+        1.0 + 2.0 * _cosine(title_vec, v) + 1.0 / (1 + i) for i, v in enumerate(vecs)
+    ]
+    total = sum(teleport)
+    teleport = [t / total for t in teleport]
+    np = _numpy()
+    if np is not None:
+        scores = _pagerank_np(np, vecs, teleport, EXTRACTIVE_DAMPING)
+    else:
+        scores = _pagerank_py(vecs, teleport, EXTRACTIVE_DAMPING)
+
+    cost = [estimate_tokens(t, rates) for _, t in sents]
+    chosen, used = set(), 0
+    for i in sorted(range(n), key=lambda i: (-scores[i], i)):
+        if used + cost[i] > budget:
+            continue
+        if any(_cosine(vecs[i], vecs[j]) >= EXTRACTIVE_MAX_OVERLAP for j in chosen):
+            continue
+        chosen.add(i)
+        used += cost[i]
+    if not chosen:
+        return None
+    parts, prev_para = [], None
+    for i in sorted(chosen):
+        p_no, t = sents[i]
+        if parts:
+            parts.append(" " if p_no == prev_para else "\n")
+        parts.append(t)
+        prev_para = p_no
+    return "".join(parts), used
+
+
+# 切り詰めの記録（1記事ごとの本文トークン見積もり：全文 / 予算で切った後 / 従来の固定字数）
+# extractive は抽出的要約を使った記事数。daemon で際限なく溜まらないよう直近の分だけ残す
+TOKEN_STATS_KEEP = 5000
+TOKEN_STATS = {
+    "full": deque(maxlen=TOKEN_STATS_KEEP),
+    "kept": deque(maxlen=TOKEN_STATS_KEEP),
+    "fixed": deque(maxlen=TOKEN_STATS_KEEP),
+    "extractive": 0,
+}
+
+
+def prepare_model_input(body: str, source=None, title=""):
+    """
+    本文 → モデル入力（学習済みの定型文を落としてから BODY_MAX_TOKENS に収める）。
+    予算を超える本文は、DIGEST_EXTRACTIVE=1 なら重要な文を選び、それ以外は先頭から切る。
+    節約量（元の本文との差）を TOKEN_STATS に積む。
+    """
+    text = strip_boilerplate(source, body) if source else body
+    picked = None
+    if EXTRACTIVE_ENABLED and estimate_tokens(text) > BODY_MAX_TOKENS:
+        picked = extractive_select(text, BODY_MAX_TOKENS, title)
+    if picked:
+        kept, used = picked
+        TOKEN_STATS["extractive"] += 1
+    else:
+        kept, _, used = truncate_to_tokens(text, BODY_MAX_TOKENS)
+    full = estimate_tokens(body)
+    TOKEN_STATS["full"].append(full)
+    TOKEN_STATS["kept"].append(used)
+    TOKEN_STATS["fixed"].append(
+        full if len(body) <= BODY_MAX_CHARS else estimate_tokens(body[:BODY_MAX_CHARS])
+    )
+    return kept, used
+
+
+def print_token_report(file=None):
+    """モデル入力の見積もり（定型文の除去・切り詰めの節約量）を出す"""
+    for line in boilerplate_report_lines():
+        print(f"🧹 {line}", file=file)
+    for line in token_report_lines():
+        print(f"🔢 {line}", file=file)
+
+
+def token_report_lines(stats=None):
+    """切り詰めの節約量（見積もり）。記事が無ければ空"""
+    stats = stats or TOKEN_STATS
+    n = len(stats["kept"])
+    if not n:
+        return []
+
+    def _p90(xs):
+        return sorted(xs)[min(n - 1, int(n * 0.9))]
+
+    full, kept, fixed = (sum(stats[k]) for k in ("full", "kept", "fixed"))
+    return [
+        f"body tokens (est.) for {n} article(s): sent {kept:,} of {full:,} "
+        f"(saved {full - kept:,}, {100 * (full - kept) / max(full, 1):.0f}%)",
+        f"vs fixed {BODY_MAX_CHARS}-char cut: {fixed:,} ({kept - fixed:+,}); "
+        f"per article p90/max {_p90(stats['kept']):,}/{max(stats['kept']):,} "
+        f"vs {_p90(stats['fixed']):,}/{max(stats['fixed']):,} "
+        f"(budget {BODY_MAX_TOKENS:,}"
+        + (f", extractive {stats['extractive']}" if stats.get("extractive") else "")
+        + ")",
+    ]
+
+
+class Article(Mapping):
+    __slots__ = ARTICLE_FIELDS + (
+        "_nfc",
+        "_keyword_hit",
+        "_fingerprint",
+        "_tokens",
+        "_input",
+    )
+
+    def __init__(
+        self,
+        source,
+        url,
+        title,
+        body="",
+        date=None,
+        *,
+        nfc=False,
+        keyword_hit=None,
+        model_input=False,
+    ):
+        self.source = canonical_source(source)
+        self.url = url
+        self.title = title or ""
+        self.body = body or ""
+        self.date = date.isoformat() if hasattr(date, "isoformat") else date
+        self._nfc = nfc
+        self._keyword_hit = keyword_hit
+        self._fingerprint = None
+        self._tokens = None
+        # モデルに渡す本文。本文の先頭そのままなら長さ（int）だけ持つ
+        # （model_input=True は本文がすでにモデル入力）
+        self._input = len(self.body) if model_input else None
+
+    @classmethod
+    def of(cls, obj, source=None) -> "Article":
+        """dict（JSONL から読んだものなど）や Article を Article にする（source を渡すと上書き）"""
+        if isinstance(obj, Article):
+            if source is None or canonical_source(source) == obj.source:
+                return obj
+            obj = dict(obj)
+        return cls(
+            source if source is not None else obj.get("source"),
+            obj["url"],
+            obj.get("title"),
+            obj.get("body"),
+            obj.get("date"),
+        )
+
+    def with_body(self, body: str) -> "Article":
+        """本文を差し替えた新しい Article（同じ本文なら計算済みの値ごと自分を返す）"""
+        if body == self.body:
+            return self
+        return Article(self.source, self.url, self.title, body, self.date)
+
+    def normalized(self) -> "Article":
+        """タイトル・本文を NFC にする（済んでいれば何もしない）"""
+        if not self._nfc:
+            self.title = unicodedata.normalize("NFC", self.title)
+            self.body = unicodedata.normalize("NFC", self.body)
+            self._nfc = True
+        return self
+
+    @property
+    def keyword_hit(self) -> bool:
+        if self._keyword_hit is None:
+            self.normalized()
+            self._keyword_hit = any_keyword_hit(self.title, self.body)
+        return self._keyword_hit
+
+    def model_input(self) -> str:
+        """
+        モデルに渡す本文。記事を定型文の学習に足してから（observe_boilerplate）定型文を落とし
+        （prepare_model_input 内の strip_boilerplate）、BODY_MAX_TOKENS に段落・文の切れ目で切る。
+        """
+        if self._input is None:
+            self.normalized()
+            observe_boilerplate(self.source, self.url, self.body)
+            kept, body_tokens = prepare_model_input(self.body, self.source, self.title)
+            self._input = len(kept) if self.body.startswith(kept) else kept
+            self._tokens = estimate_tokens(self.title) + body_tokens
+        if isinstance(self._input, int):
+            return self.body[: self._input]
+        return self._input
+
+    @property
+    def fingerprint(self) -> str:
+        """モデルに渡す範囲（タイトル＋本文先頭）の内容ハッシュ"""
+        if self._fingerprint is None:
+            text = f"{self.title}\n{self.model_input()}"
+            self._fingerprint = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return self._fingerprint
+
+    @property
+    def tokens(self) -> int:
+        """モデル入力（タイトル＋本文先頭）の見積もりトークン数"""
+        if self._tokens is None:
+            self._tokens = estimate_tokens(self.title) + estimate_tokens(
+                self.model_input()
+            )
+        return self._tokens
+
+    def __getitem__(self, key):
+        if key not in ARTICLE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(ARTICLE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(ARTICLE_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Article({self.source!r}, {self.url!r}, {self.title[:30]!r}, date={self.date!r})"
+
+
+def _parse_category_date_text(text: str):
+    # 例: 'August 9, 2025'
+    text = re.sub(r"\s+", " ", text.strip())
+    return datetime.strptime(text, "%B %d, %Y").date()
+
+
+def _article_date_from_meta_mmt(soup):
+    meta = soup.find("meta", attrs={"property": "article:published_time"})
+    if not meta or not meta.get("content"):
+        return None
+    iso = meta["content"].replace("Z", "+00:00")  # 末尾Z対策
+    dt = datetime.fromisoformat(iso)
+    return dt.astimezone(MMT).date()
+
+
+def _published_date_mmt(published) -> Optional[date]:
+    """article:published_time（ISO 8601）→ MMT の日付。読めなければ None"""
+    if not published:
+        return None
+    try:
+        dt = datetime.fromisoformat(published.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt.astimezone(MMT).date()
+
+
+def _extract_title(soup):
+    t = soup.find("title")
+    return _norm_text(t.get_text(strip=True)) if t else None
+
+
+# 空白or行頭から始まる #トークンを除去（多言語対応）
+KHIT_THIT_HASHTAG_RE = re.compile(r"(?:(?<=\s)|^)\#[^\s#]+")
+
+
+# ===== 宣言的な抽出ルール =====
+# ソースごとに「本文のルート」「除外するコンテナ」「ここから先は本文でない目印」
+# 「段落ごとに消すノイズ」「タイトル・公開日の場所」を書いておき、
+# import 時に1回だけコンパイルして、1ページを1回の木の走査で抽出する。
+# セレクタは tag / .class / [attr=value] の組み合わせだけ（子孫結合子は使わない）。
+#   roots: 優先順。最初に段落が取れたルートを使う（fallback=True なら最後に文書全体）
+#   exclude: この要素の配下は丸ごと読まない
+#   exclude_text_prefix: {tag: prefix} 可視テキストが prefix で始まる要素は読まない
+#   stop: [(selector, regex)] 文書順でこれが出たら以降の段落は捨てる
+#   noise: 段落テキストから消す正規表現
+#   sep / collapse_ws: 段落内の文字列の連結（get_text(sep, strip=True) 相当）
+#   title / date: 優先順のセレクタ（カンマ区切りは文書順で最初のもの）。meta は content を読む
+EXTRACT_RULES = {
+    "generic": {
+        "roots": ["div.entry-content", "div.node-content", "article"],
+        "fallback": True,
+    },
+    "mizzima": {
+        "roots": ["div.entry-content"],
+        "stop": [("h2", re.compile("Related Posts", re.I))],
+        "title": ["meta[property=og:title]"],
+    },
+    "irrawaddy": {
+        "roots": ["div.content-inner"],
+        "exclude": [
+            ".jnews_inline_related_post",
+            ".jnews_related_post_container",
+            ".jeg_postblock_21",
+            ".jeg_postblock_5",
+            ".widget",
+            ".widget_jnews_popular",
+        ],
+        "title": ["title"],
+    },
+    "bbc": {
+        "roots": ["main[role=main]"],
+        "fallback": True,
+        "exclude": [
+            # 記事署名やメタ情報
+            "section[role=region][aria-labelledby=article-byline]",
+            # 「おすすめ／最も読まれた」ブロック
+            "section[data-e2e=recommendations-heading][role=region]",
+            "header[role=banner]",
+            "nav[role=navigation]",
+            "footer[role=contentinfo]",
+            "aside",
+        ],
+        "title": ["h1", "title"],
+    },
+    "khit_thit": {
+        "roots": ["div.entry-content", "div.node-content", "article"],
+        "fallback": True,
+        # <a>や<strong><a>…</a></strong>の入れ子も含め、'#' で始まるアンカーは読まない
+        "exclude_text_prefix": {"a": "#"},
+        "noise": [KHIT_THIT_HASHTAG_RE],
+        "title": ["h1"],
+    },
+    "dvb": {
+        "roots": [".full_content"],
+        "sep": " ",
+        "collapse_ws": True,
+        "title": ["title", ".text-2xl, h1, .post-title"],
+    },
+}
+
+_SELECTOR_RE = re.compile(r"^([\w-]*)((?:\.[\w-]+)*)((?:\[[\w-]+=[^\]]+\])*)$")
+_DEFAULT_DATE_LOCATORS = ["meta[property=article:published_time]"]
+_WS_RE = re.compile(r"\s+")
+
+
+class _Selector:
+    __slots__ = ("tag", "classes", "attrs")
+
+    def __init__(self, text):
+        m = _SELECTOR_RE.match(text.strip())
+        if not m:
+            raise ValueError(f"unsupported selector: {text!r}")
+        tag, classes, attrs = m.groups()
+        self.tag = tag or None
+        self.classes = frozenset(c for c in classes.split(".") if c)
+        self.attrs = tuple(
+            tuple(x.split("=", 1)) for x in re.findall(r"\[([^\]]+)\]", attrs)
+        )
+
+    def matches(self, node) -> bool:
+        if self.tag and node.name != self.tag:
+            return False
+        if self.classes and not self.classes.issubset(node.get("class") or ()):
+            return False
+        return all(node.get(k) == v for k, v in self.attrs)
+
+    def matches_start(self, tag, attrs: dict) -> bool:
+        """HTMLParser の開始タグ（tag 名と属性 dict、class は空白区切りの文字列）に照合する"""
+        if self.tag and tag != self.tag:
+            return False
+        if self.classes and not self.classes.issubset(
+            (attrs.get("class") or "").split()
+        ):
+            return False
+        return all(attrs.get(k) == v for k, v in self.attrs)
+
+
+class ExtractRule:
+    """
+    EXTRACT_RULES の1エントリをコンパイルしたもの。
+    セレクタはタグ名（無ければ先頭のクラス）で索引しておき、各要素では
+    そのタグ・クラスに関係するセレクタだけを照合する。
+    """
+
+    _FIELDS = ("title", "date", "canonical")
+
+    def __init__(self, spec):
+        self.n_roots = len(spec.get("roots", []))
+        self.fallback = bool(spec.get("fallback"))
+        self.exclude_text_prefix = dict(spec.get("exclude_text_prefix", {}))
+        self.noise = list(spec.get("noise", []))
+        self.sep = spec.get("sep", "")
+        self.collapse_ws = bool(spec.get("collapse_ws"))
+
+        # (selector, action)。action: ("exclude",) / ("root", i) / ("stop", rx) / (field, 優先順位)
+        entries = [(x, ("exclude",)) for x in spec.get("exclude", [])]
+        entries += [(x, ("root", i)) for i, x in enumerate(spec.get("roots", []))]
+        entries += [(x, ("stop", rx)) for x, rx in spec.get("stop", [])]
+        locators = {
+            "title": spec.get("title", []),
+            "date": spec.get("date", _DEFAULT_DATE_LOCATORS),
+            "canonical": ["link[rel=canonical]"],
+        }
+        for field, groups in locators.items():
+            for prio, group in enumerate(groups):
+                entries += [(x, (field, prio)) for x in group.split(",")]
+
+        self.by_tag = defaultdict(list)
+        self.by_class = defaultdict(list)
+        for text, action in entries:
+            sel = _Selector(text)
+            if sel.tag:
+                self.by_tag[sel.tag].append((sel, action))
+            elif sel.classes:
+                self.by_class[next(iter(sel.classes))].append((sel, action))
+            else:
+                raise ValueError(f"selector needs a tag or class: {text!r}")
+
+    def _actions(self, node):
+        cands = self.by_tag.get(node.name, ())
+        classes = node.get("class")
+        if classes and self.by_class:
+            for c in classes:
+                extra = self.by_class.get(c)
+                if extra:
+                    cands = [*cands, *extra]
+        return [action for sel, action in cands if sel.matches(node)]
+
+    def _text_excluded(self, node) -> bool:
+        prefix = self.exclude_text_prefix.get(node.name)
+        return bool(prefix) and node.get_text(strip=True).startswith(prefix)
+
+    def _paragraph_text(self, p) -> str:
+        parts = []
+        stack = [p]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Tag):
+                if node is not p and (
+                    ("exclude",) in self._actions(node) or self._text_excluded(node)
+                ):
+                    continue
+                stack.extend(reversed(node.contents))
+            elif type(node) is NavigableString:
+                t = node.strip()
+                if t:
+                    parts.append(t)
+        text = self.sep.join(parts)
+        if self.collapse_ws:
+            text = _WS_RE.sub(" ", text)
+        for rx in self.noise:
+            text = rx.sub("", text)
+        return text.strip()
+
+    @staticmethod
+    def _locator_value(node):
+        if node.name == "meta":
+            return (node.get("content") or "").strip()
+        if node.name == "link":
+            return (node.get("href") or "").strip()
+        return node.get_text(strip=True)
+
+    def apply(self, soup) -> dict:
+        # groups[i]: roots[i] 配下の段落、groups[n_roots]: 文書全体（fallback 用）
+        groups = [[] for _ in range(self.n_roots + 1)]
+        found = {field: {} for field in self._FIELDS}
+        stopped = False
+
+        stack = [(soup, (self.n_roots,) if self.fallback else ())]
+        while stack:
+            node, active = stack.pop()
+            actions = self._actions(node)
+            if node is not soup and (
+                ("exclude",) in actions
+                or (self.exclude_text_prefix and self._text_excluded(node))
+            ):
+                continue  # 配下は丸ごと読まない（祖先をたどり直さない）
+
+            for action in actions:
+                kind = action[0]
+                if kind == "root":
+                    active = active + (action[1],)
+                elif kind == "stop":
+                    if action[1].search(node.string or ""):
+                        stopped = True
+                elif action[1] not in found[kind]:
+                    value = self._locator_value(node)
+                    if value:
+                        found[kind][action[1]] = value
+
+            if node.name == "p":
+                if active and not stopped:
+                    text = self._paragraph_text(node)
+                    if text:
+                        for i in active:
+                            groups[i].append(text)
+                continue  # 段落の中はもう見ない
+
+            children = node.contents
+            for i in range(len(children) - 1, -1, -1):
+                child = children[i]
+                if isinstance(child, Tag):
+                    stack.append((child, active))
+
+        paragraphs = next((g for g in groups if g), [])
+        rec = {
+            field: next((vals[i] for i in sorted(vals)), None)
+            for field, vals in found.items()
+        }
+        rec["title"] = _norm_text(rec["title"]) if rec["title"] else None
+        rec["published"] = rec.pop("date")
+        rec["date"] = _published_date_mmt(rec["published"])
+        rec["body"] = _norm_text("\n".join(paragraphs))
+        return rec
+
+
+EXTRACTORS = {key: ExtractRule(spec) for key, spec in EXTRACT_RULES.items()}
+
+
+# ===== 記事ページの流し読み（抽出対象が閉じたら打ち切る） =====
+# 記事ページは本文のあとに関連記事・フッタ・スクリプトが何百 KB も続く。取得中に bytes を
+# HTMLParser へ逐次流し、抽出ルールの先頭ルート（本文のコンテナ）が閉じたらそこで読むのをやめて
+# 接続を閉じる。解析（parse_page）には読んだところまでの bytes を渡す。本文のコンテナに段落が
+# 1つも無かったとき（後ろのルートや fallback を使う場合）は最後まで読む。
+# 先頭ルートに合う要素が1つだけのソースに限る。Irrawaddy は本文が div.content-inner 複数に
+# 分かれることがあり最初の1つで止めると後ろが欠けるので、DVB は __NEXT_DATA__ が本文より後ろに
+# あり、BBC はルートが <main> 全体なので流し読みしない。
+STREAM_ENABLED = str(os.getenv("DIGEST_STREAM", "1")).lower() not in (
+    "0",
+    "false",
+    "no",
+)
+STREAM_SOURCES = ("mizzima", "khit_thit")
+STREAM_CHUNK = 16 * 1024
+
+
+class _TargetTracker(HTMLParser):
+    """selector に合う要素が（段落を含んで）閉じたら done。同名タグの入れ子を数える"""
+
+    def __init__(self, selector: _Selector):
+        super().__init__(convert_charrefs=False)
+        self.selector = selector
+        self.tag = None
+        self.depth = 0
+        self.paragraphs = 0
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            if tag == self.tag:
+                self.depth += 1
+            elif tag == "p":
+                self.paragraphs += 1
+        elif self.selector.matches_start(tag, dict(attrs)):
+            self.tag, self.depth = tag, 1
+
+    def handle_endtag(self, tag):
+        if self.depth and tag == self.tag:
+            self.depth -= 1
+            if not self.depth and self.paragraphs:
+                self.done = True
+
+
+_STREAM_TARGETS = {
+    key: _Selector(EXTRACT_RULES[key]["roots"][0]) for key in STREAM_SOURCES
+}
+
+
+def stream_stop(source: str):
+    """fetch_url(stop_after=...) に渡すトラッカの生成関数。流し読みしないソースは None"""
+    sel = _STREAM_TARGETS.get(source) if STREAM_ENABLED else None
+    return functools.partial(_TargetTracker, sel) if sel else None
+
+
+@traced("extract")
+def extract_record(soup, source: str) -> dict:
+    """
+    EXTRACT_RULES[source] で1ページを抽出する（soup は変更しない）。
+    返り値: {"title", "date"(MMT の date), "published"(元の文字列), "canonical", "body"(NFC)}
+    """
+    return EXTRACTORS[source].apply(soup)
+
+
+# 本文抽出
+def extract_body_irrawaddy(soup):
+    # <div class="content-inner "> 配下の <p>のみ（関連記事・ウィジェット配下は除外）
+    return extract_record(soup, "irrawaddy")["body"]
+
+
+def extract_body_mizzima(content_div):
+    # div.entry-content 配下の <p>（「Related Posts」見出し以降は関連記事なので捨てる）
+    return extract_record(content_div, "mizzima")["body"]
+
+
+def extract_body_bbc(soup):
+    # main 内の <p>（署名・おすすめ・ヘッダー/ナビ/フッター等は除外）
+    return extract_record(soup, "bbc")["body"]
+
+
+def extract_body_khit_thit(soup_article):
+    # #アンカーは読まず、テキスト化後も保険で #トークンを除去
+    return extract_record(soup_article, "khit_thit")["body"]
+
+
+def extract_body_dvb(soup) -> str:
+    return extract_record(soup, "dvb")["body"]
+
+
+# ===== DVB：ページに埋め込まれた Next.js のデータ（__NEXT_DATA__） =====
+# DVB はクライアント描画のアプリで、一覧・記事の中身は <script id="__NEXT_DATA__"> の
+# JSON にも入っている。Tailwind のクラス名で DOM を読むより壊れにくく、公開時刻も正確。
+# JSON は bytes から正規表現で切り出すだけで、ページ全体の DOM は作らない。
+# 見つからない・形が合わないときは None を返し、呼び出し側で従来の DOM 抽出に戻る。
+_NEXT_DATA_RE = re.compile(
+    rb"<script[^>]*\bid=[\"']__NEXT_DATA__[\"'][^>]*>(.*?)</script>", re.S
+)
+_POST_TIME_KEYS = (
+    "published_at",
+    "publishedAt",
+    "published_date",
+    "publish_date",
+    "date",
+    "created_at",
+    "createdAt",
+)
+_POST_LINK_KEYS = ("url", "link", "permalink", "href")
+_POST_CONTENT_KEYS = ("content", "body", "content_html", "html")
+
+
+def next_data_page_props(raw) -> Optional[dict]:
+    """__NEXT_DATA__ の props.pageProps（無ければ None）"""
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    m = _NEXT_DATA_RE.search(raw or b"")
+    if not m:
+        return None
+    try:
+        data = json.loads(m.group(1))
+    except ValueError:
+        return None
+    props = (
+        (data.get("props") or {}).get("pageProps") if isinstance(data, dict) else None
+    )
+    return props if isinstance(props, dict) else None
+
+
+def _parse_timestamp(v) -> Optional[datetime]:
+    """ISO 文字列 / epoch 秒・ミリ秒 → aware datetime（タイムゾーン無しは UTC とみなす）"""
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return datetime.fromtimestamp(v / 1000 if v > 1e12 else v, tz=timezone.utc)
+    if isinstance(v, str) and v.strip():
+        try:
+            dt = datetime.fromisoformat(v.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    return None
+
+
+def _text_field(d, key):
+    v = d.get(key)
+    if isinstance(v, dict):  # WordPress 形式 {"rendered": "..."}
+        v = v.get("rendered")
+    return v.strip() if isinstance(v, str) and v.strip() else None
+
+
+def _as_post(d) -> Optional[dict]:
+    """投稿らしい dict（タイトル・公開時刻・id か URL がある）を共通の形にする"""
+    if not isinstance(d, dict):
+        return None
+    title = _text_field(d, "title")
+    dt = next(
+        (t for t in (_parse_timestamp(d.get(k)) for k in _POST_TIME_KEYS) if t), None
+    )
+    link = next((d[k] for k in _POST_LINK_KEYS if isinstance(d.get(k), str)), None)
+    ident = d.get("id") if d.get("id") is not None else d.get("slug")
+    if not title or not dt or (link is None and ident is None):
+        return None
+    content = next(
+        (c for c in (_text_field(d, k) for k in _POST_CONTENT_KEYS) if c and "<" in c),
+        None,
+    )
+    return {
+        "title": _html.unescape(title),
+        "dt": dt,
+        "id": ident,
+        "link": link,
+        "content_html": content,
+    }
+
+
+def _iter_json_containers(obj):
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        yield o
+        children = o.values() if isinstance(o, dict) else o
+        stack.extend(c for c in children if isinstance(c, (dict, list)))
+
+
+def dvb_listing_from_next_data(raw, base) -> Optional[List[tuple]]:
+    """
+    一覧ページの埋め込みデータ → [(記事URL, MMT の公開日)]
+    pageProps には「人気記事」などの別リストも入るので、投稿が一番多いリストを一覧とみなす。
+    """
+    props = next_data_page_props(raw)
+    if props is None:
+        return None
+    lists = [
+        posts
+        for o in _iter_json_containers(props)
+        if isinstance(o, list)
+        for posts in [[p for p in (_as_post(x) for x in o if isinstance(x, dict)) if p]]
+        if posts
+    ]
+    if not lists:
+        return None
+    cards = []
+    for post in max(lists, key=len):
+        if post["link"]:
+            url = urllib.parse.urljoin(f"{base}/", post["link"])
+        else:
+            url = f"{base}/post/{post['id']}"
+        cards.append((url, post["dt"].astimezone(MMT).date()))
+    return cards
+
+
+def dvb_listing(raw, base) -> tuple:
+    """
+    一覧ページ → ([(記事URL, MMT の公開日)], "next_data" | "dom")
+    埋め込みデータが無い・読めない（形が想定外で例外）・空のときは DOM のカードを読む。
+    """
+    try:
+        cards = dvb_listing_from_next_data(raw, base)
     except Exception as e:
-        print(f"[dvb-cffi] EXC: {e} → {url}")
+        print(f"[dvb] __NEXT_DATA__ unreadable, falling back to DOM: {e}")
+        cards = None
+    if cards:
+        return cards, "next_data"
+    return dvb_listing_from_dom(raw, base), "dom"
+
+
+def _parse_dvb_date(text: str) -> Optional[date]:
+    if not text:
+        return None
+    s = re.sub(r"\s+", " ", text.strip())
+    try:
+        return datetime.strptime(s, "%B %d, %Y").date()
+    except ValueError:
+        return None
+
+
+def dvb_listing_from_dom(raw, base) -> List[tuple]:
+    """一覧ページの DOM（Tailwind のカード）→ [(記事URL, 表示日)]（埋め込みデータが無いとき）"""
+    soup = make_soup(raw, "html.parser")
+
+    # 一覧ブロック（特徴で特定。無ければフォールバックでページ全体）
+    blocks = soup.select(
+        "div.md\\:grid.grid-cols-3.gap-4.mt-5, div.grid.grid-cols-3.gap-4.mt-5"
+    ) or [soup]
+
+    cards = []
+    for scope in blocks:
+        for a in scope.select('a[href^="/post/"]'):
+            href = a.get("href") or ""
+            # 第一候補：カード内の date ブロック
+            date_div = a.select_one("div.flex.gap-1.text-xs.mt-2.text-gray-500 div")
+            date_text = (date_div.get_text(" ", strip=True) if date_div else "").strip()
+            # フォールバック：英語月名パターン
+            if not date_text:
+                full = a.get_text(" ", strip=True)
+                m = re.search(
+                    r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s*\d{4}",
+                    full,
+                )
+                date_text = m.group(0) if m else ""
+            uabs = href if href.startswith("http") else f"{base}{href}"
+            cards.append((uabs, _parse_dvb_date(date_text)))
+    return cards
+
+
+def dvb_record_from_next_data(raw) -> Optional[dict]:
+    """記事ページの埋め込みデータ → extract_record と同じ形（本文 HTML の断片だけをパース）"""
+    props = next_data_page_props(raw)
+    if props is None:
+        return None
+    posts = [
+        p
+        for o in _iter_json_containers(props)
+        if isinstance(o, dict)
+        for p in [_as_post(o)]
+        if p and p["content_html"]
+    ]
+    if not posts:
+        return None
+    post = max(posts, key=lambda p: len(p["content_html"]))
+    frag = make_soup(
+        f'<div class="full_content">{post["content_html"]}</div>', "html.parser"
+    )
+    body = extract_record(frag, "dvb")["body"]
+    if not body:
+        return None
+    return {
+        "title": _norm_text(post["title"]),
+        "date": post["dt"].astimezone(MMT).date(),
+        "published": post["dt"].isoformat(),
+        "canonical": post["link"],
+        "body": body,
+    }
+
+
+# ページ全体をパースせずに取れるソース（取れなければ None → DOM 抽出）
+PAGE_DATA_EXTRACTORS = {"dvb": dvb_record_from_next_data}
+
+
+# ===== 記事ページの解析を別プロセスで =====
+# パース（BeautifulSoup）と NFC 正規化は CPU を使うので、取得した bytes とソース名だけを
+# プロセスプールに渡し、抽出結果（小さな dict）だけを受け取る。木はプロセスをまたがない。
+# DIGEST_PARSE_WORKERS: 0 なら CPU 数、1 ならプロセスを使わずその場で解析する
+# ワーカーは fork ではなく forkserver（無い環境では spawn）で起こす。プールを作る時点では
+# Irrawaddy の一覧スレッドや HTTP セッションが動いていることがあり、fork だとロックや
+# ソケットの状態ごと子に写る。
+
+
+def _env_workers(name: str) -> int:
+    """ワーカー数の環境変数。未設定・0・読めない値は CPU 数（起動前に落とさない）"""
+    raw = os.getenv(name, "")
+    try:
+        n = int(raw or 0)
+    except ValueError:
+        print(f"[parse] ignoring invalid {name}={raw!r}")
+        n = 0
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+PARSE_WORKERS = _env_workers("DIGEST_PARSE_WORKERS")
+_PARSE_POOL = None
+_PARSE_POOL_LOCK = threading.Lock()
+
+
+def parse_page(raw, source: str) -> dict:
+    """
+    記事ページの bytes → extract_record の結果＋キーワード判定（プール内で動く）
+    返り値: {"title", "date", "published", "canonical", "body", "keyword_hit"}
+    """
+    fast = PAGE_DATA_EXTRACTORS.get(source)
+    try:
+        rec = fast(raw) if fast else None
+    except Exception:
+        rec = None  # 埋め込みデータの形が想定外なら DOM 抽出に落ちる
+    if rec is None:
+        soup = make_soup(raw, "html.parser")
+        # 誤って latin-1 系で解釈された場合は UTF-8 で読み直す
+        enc = (getattr(soup, "original_encoding", None) or "").lower()
+        if enc in ("iso-8859-1", "latin-1", "windows-1252"):
+            soup = make_soup(raw, "html.parser", from_encoding="utf-8")
+        rec = extract_record(soup, source)
+    rec["keyword_hit"] = bool(rec["body"]) and any_keyword_hit(
+        rec["title"] or "", rec["body"]
+    )
+    return rec
+
+
+def _parse_pool():
+    global _PARSE_POOL
+    if PARSE_WORKERS <= 1:
+        return None
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None:
+            import multiprocessing
+
+            method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _PARSE_POOL = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+            atexit.register(_PARSE_POOL.shutdown, cancel_futures=True)
+        return _PARSE_POOL
 
-    # --- Try 2: cloudscraper ---
-    try:
-        import cloudscraper
-        import requests as rq
-
-        sess = session or rq.Session()
-        scraper = cloudscraper.create_scraper(
-            sess=sess,
-            browser={"browser": "chrome", "platform": "windows", "mobile": False},
-            delay=7,
-        )
-        for attempt in range(retries):
+
+def parse_fetched(fetched, source: str):
+    """
+    fetched: (key, bytes) を取得しながら返すイテレータ
+    取得と並行して別プロセスで parse_page し、(key, record) を投入順に返す。
+    解析に失敗したものは record=None。
+    """
+    pool = _parse_pool()
+    if pool is None:
+        for key, raw in fetched:
             try:
-                r = scraper.get(url, headers=HEADERS, timeout=30, allow_redirects=True)
-                if r.status_code == 200 and getattr(r, "text", "").strip():
-                    return r
-                if r.status_code in (403, 503) and "/post/" in url:
-                    for amp in _amp_candidates(url):
-                        r2 = scraper.get(
-                            amp, headers=HEADERS, timeout=30, allow_redirects=True
-                        )
-                        if r2.status_code == 200 and getattr(r2, "text", "").strip():
-                            return r2
-                if r.status_code in (403, 429, 503):
-                    time.sleep(wait_seconds * (2**attempt) + random.uniform(0, 0.8))
-                    continue
-                break
+                rec = parse_page(raw, source)
             except Exception as e:
-                print(f"[dvb-cs] {attempt+1}/{retries} EXC: {e} → {url}")
-                time.sleep(wait_seconds * (2**attempt) + random.uniform(0, 0.8))
-    except Exception as e:
-        print(f"[dvb-cs] INIT EXC: {e} → {url}")
+                print(f"Error parsing {key}: {e}")
+                yield key, None
+                continue
+            learn_canonical(key, rec.get("canonical"))
+            yield key, rec
+        return
 
-    # --- Try 3: requests ---
-    try:
-        import requests
-
-        sess = session or requests.Session()
-        r2 = sess.get(url, headers=HEADERS, timeout=30, allow_redirects=True)
-        if r2.status_code == 200 and getattr(r2, "text", "").strip():
-            return r2
-        if r2.status_code in (403, 503) and "/post/" in url:
-            for amp in _amp_candidates(url):
-                r3 = sess.get(amp, headers=HEADERS, timeout=30, allow_redirects=True)
-                if r3.status_code == 200 and getattr(r3, "text", "").strip():
-                    return r3
-    except Exception as e:
-        print(f"[dvb-rq] EXC final: {e} → {url}")
+    def _result(key, fut):
+        try:
+            rec = fut.result()
+        except Exception as e:
+            print(f"Error parsing {key}: {e}")
+            return key, None
+        # ページが名乗る正規 URL を覚える（key は取得した URL）
+        learn_canonical(key, rec.get("canonical"))
+        return key, rec
+
+    pending = deque()
+    for key, raw in fetched:
+        pending.append((key, pool.submit(parse_page, raw, source)))
+        # 終わった分から先に渡す（順序は保つ）
+        while pending and pending[0][1].done():
+            yield _result(*pending.popleft())
+    while pending:
+        yield _result(*pending.popleft())
 
-    raise Exception(f"Failed to fetch DVB {url} after {retries} attempts.")
 
+#  Irrawaddy 用 fetch_once（既存の fetch_with_retry_irrawaddy を1回ラップ）
+def fetch_once_irrawaddy(url, session=None):
+    r = fetch_with_retry_irrawaddy(url, retries=1, wait_seconds=0, session=session)
+    # cloudscraper のレスポンスも bytes を返す（デコードは BeautifulSoup に任せる）
+    return r.content
 
-def _norm_text(text: str) -> str:
-    return unicodedata.normalize("NFC", text)
 
+# === ここまで ===
 
-def _norm_id(u):
-    """ID/URL照合用の軽量正規化：末尾スラッシュを落とす"""
-    if isinstance(u, str):
-        return u.rstrip("/")
-    return u
 
+# === WordPress REST / news sitemap による記事探索（Mizzima / Khit Thit / Irrawaddy） ===
+# 一覧HTMLをテーマ依存のCSSセレクタで巡回する代わりに、構造化エンドポイントへ
+# 「1日分の投稿（本文つき）」を問い合わせる。ブロックされていたら None を返し、
+# 呼び出し側で従来の HTML 巡回にフォールバックする。
+WP_DISCOVERY_ENABLED = str(os.getenv("WP_DISCOVERY", "1")).lower() not in (
+    "0",
+    "false",
+    "off",
+)
 
-def _parse_category_date_text(text: str):
-    # 例: 'August 9, 2025'
-    text = re.sub(r"\s+", " ", text.strip())
-    return datetime.strptime(text, "%B %d, %Y").date()
+# ソースごとのベースURL（ローカルのフィクスチャサーバで試すときは環境変数で差し替え）
+SOURCE_BASE_URLS = {
+    "mizzima": os.getenv("MIZZIMA_BASE_URL", "https://bur.mizzima.com").rstrip("/"),
+    "khit_thit": os.getenv("KHIT_THIT_BASE_URL", "https://yktnews.com").rstrip("/"),
+    "irrawaddy": os.getenv("IRRAWADDY_BASE_URL", "https://www.irrawaddy.com").rstrip(
+        "/"
+    ),
+    "dvb": os.getenv("DVB_BASE_URL", "https://burmese.dvb.no").rstrip("/"),
+}
 
+WP_NEWS_SITEMAP_PATHS = ["/news-sitemap.xml", "/sitemap-news.xml"]
 
-def _article_date_from_meta_mmt(soup):
-    meta = soup.find("meta", attrs={"property": "article:published_time"})
-    if not meta or not meta.get("content"):
-        return None
-    iso = meta["content"].replace("Z", "+00:00")  # 末尾Z対策
-    dt = datetime.fromisoformat(iso)
-    return dt.astimezone(MMT).date()
 
+class WpDiscoveryUnavailable(Exception):
+    """REST / sitemap が使えない（403・HTML のチャレンジページ・JSON不正など）"""
 
-def _extract_title(soup):
-    t = soup.find("title")
-    return _norm_text(t.get_text(strip=True)) if t else None
 
+def _mmt_day_bounds_utc(date_obj):
+    """MMT の1日を UTC の [start, end) に変換"""
+    start = datetime(date_obj.year, date_obj.month, date_obj.day, tzinfo=MMT)
+    return start.astimezone(timezone.utc), (start + timedelta(days=1)).astimezone(
+        timezone.utc
+    )
 
-def _is_excluded_by_ancestor(node) -> bool:
-    excluded = {
-        "jnews_inline_related_post",
-        "jeg_postblock_21",
-        "widget",
-        "widget_jnews_popular",
-        "jeg_postblock_5",
-        "jnews_related_post_container",
-        "widget widget_jnews_popular",
-        "jeg_footer_primary clearfix",
-    }
-    for anc in node.parents:
-        classes = anc.get("class", [])
-        if any(c in excluded for c in classes):
-            return True
-    return False
 
+def _wp_default_fetcher(url):
+    return _traced_http(
+        "requests",
+        requests.get,
+        url,
+        timeout=15,
+        headers={"Accept": "application/json, application/xml;q=0.9, */*;q=0.5"},
+    )
 
-# 本文抽出
-def extract_body_irrawaddy(soup):
-    # <div class="content-inner "> 配下の <p>のみ（除外ブロック配下は除外）
-    paragraphs = []
-    content_inners = soup.select("div.content-inner")
-    if not content_inners:
-        content_inners = [
-            div
-            for div in soup.find_all("div")
-            if "content-inner" in (div.get("class") or [])
-        ]
-    for root in content_inners:
-        for p in root.find_all("p"):
-            if _is_excluded_by_ancestor(p):
+
+def _wp_get(url, fetcher):
+    try:
+        r = fetcher(url)
+    except Exception as e:
+        raise WpDiscoveryUnavailable(f"fetch failed: {e}") from e
+    status = getattr(r, "status_code", 200)
+    if status != 200:
+        raise WpDiscoveryUnavailable(f"HTTP {status}")
+    return r
+
+
+def _wp_get_json(url, fetcher):
+    r = _wp_get(url, fetcher)
+    try:
+        data = json.loads(r.content)
+    except Exception as e:
+        # Cloudflare 等のチャレンジページは 200 の HTML で返ってくる
+        raise WpDiscoveryUnavailable(f"non-JSON response: {e}") from e
+    return data, (getattr(r, "headers", None) or {})
+
+
+def _wp_category_ids(base_url, slugs, fetcher):
+    """カテゴリ slug → ID（非ASCII slug はデコードした文字列で問い合わせる）"""
+    slugs = [urllib.parse.unquote(s).strip("/") for s in slugs if s]
+    if not slugs:
+        return []
+    q = urllib.parse.urlencode(
+        {"slug": ",".join(slugs), "_fields": "id,slug", "per_page": 100}
+    )
+    data, _ = _wp_get_json(f"{base_url}/wp-json/wp/v2/categories?{q}", fetcher)
+    if not isinstance(data, list):
+        raise WpDiscoveryUnavailable("unexpected categories payload")
+    return [c["id"] for c in data if isinstance(c, dict) and "id" in c]
+
+
+def _wp_rest_posts_for(
+    date_obj,
+    base_url,
+    *,
+    category_slugs=None,
+    exclude_category_slugs=None,
+    fetcher=_wp_default_fetcher,
+    max_pages=10,
+):
+    first, last = target_date_span(date_obj)
+    start_utc, _ = _mmt_day_bounds_utc(first)
+    _, end_utc = _mmt_day_bounds_utc(last)
+    # after/before の解釈（サイトTZ/GMT）は WP のバージョン差があるので前後1日広めに取り、
+    # date_gmt で厳密に MMT 日付を判定する
+    params = {
+        "after": (start_utc - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S"),
+        "before": (end_utc + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S"),
+        "_fields": "id,link,date_gmt,title,content",
+        "per_page": 100,
+        "orderby": "date",
+        "order": "desc",
+    }
+    if category_slugs:
+        ids = _wp_category_ids(base_url, category_slugs, fetcher)
+        if not ids:
+            raise WpDiscoveryUnavailable(f"categories not found: {category_slugs}")
+        params["categories"] = ",".join(str(i) for i in ids)
+    if exclude_category_slugs:
+        ids = _wp_category_ids(base_url, exclude_category_slugs, fetcher)
+        if ids:
+            params["categories_exclude"] = ",".join(str(i) for i in ids)
+
+    posts = []
+    for page in range(1, max_pages + 1):
+        q = urllib.parse.urlencode({**params, "page": page})
+        data, headers = _wp_get_json(f"{base_url}/wp-json/wp/v2/posts?{q}", fetcher)
+        if not isinstance(data, list):
+            raise WpDiscoveryUnavailable("unexpected posts payload")
+        for p in data:
+            try:
+                dt = datetime.fromisoformat(p["date_gmt"]).replace(tzinfo=timezone.utc)
+            except Exception:
                 continue
-            txt = p.get_text(strip=True)
-            if txt:
-                paragraphs.append(_norm_text(txt))
-    return "\n".join(paragraphs).strip()
+            post_date = dt.astimezone(MMT).date()
+            if not date_matches(post_date, date_obj):
+                continue
+            title_html = (p.get("title") or {}).get("rendered") or ""
+            posts.append(
+                {
+                    "url": p.get("link") or "",
+                    "title": _html.unescape(re.sub(r"<[^>]+>", "", title_html)).strip(),
+                    "date": post_date.isoformat(),
+                    "content_html": (p.get("content") or {}).get("rendered") or "",
+                }
+            )
+        try:
+            total_pages = int(headers.get("X-WP-TotalPages") or 1)
+        except (TypeError, ValueError):
+            total_pages = 1
+        if page >= total_pages or not data:
+            break
+    return [p for p in posts if p["url"]]
 
 
-#  Irrawaddy 用 fetch_once（既存の fetch_with_retry_irrawaddy を1回ラップ）
-def fetch_once_irrawaddy(url, session=None):
-    r = fetch_with_retry_irrawaddy(url, retries=1, wait_seconds=0, session=session)
-    # cloudscraper のレスポンスも bytes を返す（デコードは BeautifulSoup に任せる）
-    return r.content
+def _wp_news_sitemap_for(date_obj, base_url, *, fetcher=_wp_default_fetcher):
+    """Google News sitemap から当日分の URL/タイトルを取る（本文は含まない）"""
+    import xml.etree.ElementTree as ET
+
+    last_err = None
+    for path in WP_NEWS_SITEMAP_PATHS:
+        try:
+            r = _wp_get(f"{base_url}{path}", fetcher)
+            posts = []
+            loc = title = pub = None
+            for _, el in ET.iterparse(io.BytesIO(r.content), events=("end",)):
+                tag = el.tag.rsplit("}", 1)[-1]
+                if tag == "loc":
+                    loc = (el.text or "").strip()
+                elif tag == "title":
+                    title = (el.text or "").strip()
+                elif tag == "publication_date":
+                    pub = (el.text or "").strip()
+                elif tag == "url":
+                    try:
+                        d = (
+                            datetime.fromisoformat(pub.replace("Z", "+00:00"))
+                            .astimezone(MMT)
+                            .date()
+                        )
+                    except Exception:
+                        d = None
+                    if loc and d and date_matches(d, date_obj):
+                        posts.append(
+                            {
+                                "url": loc,
+                                "title": _html.unescape(title or ""),
+                                "date": d.isoformat(),
+                                "content_html": None,
+                            }
+                        )
+                    loc = title = pub = None
+                    el.clear()
+            return posts
+        except Exception as e:
+            last_err = e
+            continue
+    raise WpDiscoveryUnavailable(f"news sitemap unavailable: {last_err}")
 
 
-# === ここまで ===
+def discover_wp_posts_for(
+    date_obj,
+    base_url,
+    *,
+    category_slugs=None,
+    exclude_category_slugs=None,
+    fetcher=None,
+    use_sitemap=True,
+    url_filter=None,
+    log_tag="wp",
+):
+    """
+    WordPress サイトから MMT の指定日（または日付集合）に公開された投稿を構造化エンドポイントで取得する。
+    1) /wp-json/wp/v2/posts（after/before/_fields、本文は content.rendered）
+    2) ダメなら news sitemap（本文なし → 記事ページは呼び出し側で取得）
+    どちらも使えなければ None（呼び出し側で従来の HTML 巡回にフォールバック）。
+    返り値: [{"url", "title", "date", "content_html"(sitemap時は None)}]
+    """
+    if not WP_DISCOVERY_ENABLED:
+        return None
+    fetcher = fetcher or _wp_default_fetcher
+
+    posts = None
+    try:
+        posts = _wp_rest_posts_for(
+            date_obj,
+            base_url,
+            category_slugs=category_slugs,
+            exclude_category_slugs=exclude_category_slugs,
+            fetcher=fetcher,
+        )
+        print(f"[{log_tag}] wp-json posts={len(posts)} @ {base_url}")
+    except WpDiscoveryUnavailable as e:
+        print(f"[{log_tag}] wp-json unavailable ({e}) @ {base_url}")
+        if use_sitemap:
+            try:
+                posts = _wp_news_sitemap_for(date_obj, base_url, fetcher=fetcher)
+                print(f"[{log_tag}] news-sitemap posts={len(posts)} @ {base_url}")
+            except WpDiscoveryUnavailable as e2:
+                print(f"[{log_tag}] {e2} → fallback to HTML crawl")
+                return None
+        else:
+            print(f"[{log_tag}] fallback to HTML crawl")
+            return None
+
+    if url_filter:
+        posts = [p for p in posts if url_filter(p["url"])]
+    return posts
 
 
 # ===== キーワード未ヒット時の共通ロガー（簡素版） =====
@@ -939,7 +3329,9 @@ LOG_NO_KEYWORD_MISSES = True
 def log_no_keyword_hit(source: str, url: str, title: str, body: str, stage: str):
     """
     キーワード未ヒットの記事を標準出力に出す（stage・本文抜粋は出力しない）。
+    処理済み URL にも no_keyword として残す（同じ日の再実行では取りにいかない）。
     """
+    seen_record(source, url, "no_keyword")
     if not LOG_NO_KEYWORD_MISSES:
         return
     try:
@@ -954,128 +3346,195 @@ def log_no_keyword_hit(source: str, url: str, title: str, body: str, stage: str)
     print("----- END NO KEYWORD HIT -----\n")
 
 
+# Mizzima除外対象キーワード（タイトル用）
+MIZZIMA_EXCLUDE_TITLE_KEYWORDS = [
+    # 春の革命日誌
+    "နွေဦးတော်လှန်ရေး နေ့စဉ်မှတ်စု",
+    # 写真ニュース
+    "ဓာတ်ပုံသတင်း",
+]
+
+
+def mizzima_listing_links(raw) -> List[str]:
+    """カテゴリ一覧ページ → 記事URL（出現順）"""
+    soup = make_soup(raw, "html.parser")
+    return [
+        a["href"] for a in soup.select("main.site-main article a.post-thumbnail[href]")
+    ]
+
+
 # Mizzimaカテゴリーページ巡回で取得
 def get_mizzima_articles_from_category(
     date_obj, base_url, source_name, category_path, max_pages=3
 ):
-    # ==== ローカル定数 Mizzima除外対象キーワード（タイトル用）====
-    EXCLUDE_TITLE_KEYWORDS = [
-        # 春の革命日誌
-        "နွေဦးတော်လှန်ရေး နေ့စဉ်မှတ်စု",
-        # 写真ニュース
-        "ဓာတ်ပုံသတင်း",
-    ]
+    def _build_article(url, title, article_date, body_text, keyword_hit=None):
+        art = Article(
+            source_name, url, title, body_text, article_date, keyword_hit=keyword_hit
+        ).normalized()
+        # === 除外キーワード判定（タイトルをNFC正規化してから） ===
+        if any(kw in art.title for kw in MIZZIMA_EXCLUDE_TITLE_KEYWORDS):
+            print(f"SKIP: excluded keyword in title → {url} | TITLE: {art.title}")
+            seen_record(source_name, url, "excluded")
+            return None
+
+        if not art.body.strip():
+            seen_record(source_name, url, "empty")
+            return None
 
-    article_urls = []
+        # キーワード判定は正規化済みタイトルで行う（解析プールで判定済みならそれを使う）
+        if not art.keyword_hit:
+            log_no_keyword_hit(
+                source_name, url, art.title, art.body, "mizzima:category"
+            )
+            return None
+
+        return art
+
+    # ==== 0) WordPress REST で当日分を本文ごと取得（使えなければ HTML 巡回へ） ====
+    posts = discover_wp_posts_for(
+        date_obj,
+        base_url,
+        category_slugs=[category_path.rstrip("/").rsplit("/", 1)[-1]],
+        # sitemap ではカテゴリを絞れないので使わない
+        use_sitemap=False,
+        log_tag="mizzima",
+    )
+    if posts is not None:
+        filtered_articles = []
+        for post in traced_iter("article", posts, attr="url"):
+            if seen_skip(source_name, post["url"]):
+                continue
+            try:
+                content_div = make_soup(
+                    f'<div class="entry-content">{post["content_html"]}</div>',
+                    "html.parser",
+                ).find("div", class_="entry-content")
+                art = _build_article(
+                    post["url"],
+                    post["title"],
+                    date.fromisoformat(post["date"]),
+                    extract_body_mizzima(content_div),
+                )
+                if art:
+                    filtered_articles.append(art)
+            except Exception as e:
+                print(f"Error processing {post['url']}: {e}")
+                continue
+        return filtered_articles
 
-    for page_num in range(1, max_pages + 1):
+    article_urls = {}  # 正規化キー → URL（ページをまたいだ重複を落とす）
+
+    for page_num in traced_iter("listing", range(1, max_pages + 1), attr="page"):
         if page_num == 1:
             url = f"{base_url}{category_path}"
         else:
             url = f"{base_url}{category_path}/page/{page_num}/"
 
         try:
-            res = requests.get(url, timeout=10)
-            if res.status_code != 200:
-                continue
-
-            soup = BeautifulSoup(res.content, "html.parser")
-            links = [
-                a["href"]
-                for a in soup.select("main.site-main article a.post-thumbnail[href]")
-            ]
-            article_urls.extend(links)
+            res = fetch_with_retry(url)
+            for href in mizzima_listing_links(res.content):
+                article_urls.setdefault(_norm_id(href), href)
 
         except Exception as e:
             print(f"Error crawling category page {url}: {e}")
             continue
 
+    def _fetch_pages():
+        for url in traced_iter("article", list(article_urls.values()), attr="url"):
+            if seen_skip(source_name, url):
+                continue
+            if head_probe_skip(source_name, url, date_obj):
+                continue
+            try:
+                yield (
+                    url,
+                    fetch_with_retry(url, stop_after=stream_stop("mizzima")).content,
+                )
+            except Exception as e:
+                print(f"Error processing {url}: {e}")
+
+    # 取得しながら解析プールへ（日付・og:title・本文・キーワード判定まで向こうで済ませる）
     filtered_articles = []
-    for url in article_urls:
+    for url, rec in parse_fetched(_fetch_pages(), "mizzima"):
         try:
-            res_article = fetch_with_retry(url)
-            soup_article = BeautifulSoup(res_article.content, "html.parser")
-
-            meta_tag = soup_article.find("meta", property="article:published_time")
-            if not meta_tag or not meta_tag.has_attr("content"):
+            if not rec:
+                continue
+            if not rec["date"] or not rec["title"]:
+                seen_record(source_name, url, "empty")
+                continue
+            if not date_matches(rec["date"], date_obj):
+                seen_record(source_name, url, "off_date")
                 continue
 
-            date_str = meta_tag["content"]
-            article_datetime_utc = datetime.fromisoformat(date_str)
-            article_datetime_mmt = article_datetime_utc.astimezone(MMT)
-            article_date = article_datetime_mmt.date()
+            art = _build_article(
+                url, rec["title"], rec["date"], rec["body"], rec["keyword_hit"]
+            )
+            if art:
+                filtered_articles.append(art)
 
-            if article_date != date_obj:
-                continue
+        except Exception as e:
+            print(f"Error processing {url}: {e}")
+            continue
 
-            title_tag = soup_article.find("meta", attrs={"property": "og:title"})
-            if not title_tag or not title_tag.has_attr("content"):
-                continue
-            title = title_tag["content"].strip()
+    return filtered_articles
 
-            # === 除外キーワード判定（タイトルをNFC正規化してから） ===
-            title_nfc = unicodedata.normalize("NFC", title)
-            if any(kw in title_nfc for kw in EXCLUDE_TITLE_KEYWORDS):
-                print(f"SKIP: excluded keyword in title → {url} | TITLE: {title_nfc}")
-                continue
 
-            content_div = soup_article.find("div", class_="entry-content")
-            if not content_div:
-                continue
+# BBC RSS の差分ポーリング設定
+BBC_RSS_URL = os.getenv("BBC_RSS_URL", "https://feeds.bbci.co.uk/burmese/rss.xml")
+BBC_INCREMENTAL_ENABLED = str(os.getenv("BBC_INCREMENTAL", "1")).lower() not in (
+    "0",
+    "false",
+    "off",
+)
+BBC_INDEX_STATE = "bbc_rss_index.json"
+BBC_INDEX_KEEP_DAYS = 3
+# 同一プロセス内の繰り返しポーリングで接続を使い回す
+_BBC_SESSION = requests.Session()
 
-            paragraphs = []
-            for p in content_div.find_all("p"):
-                if p.find_previous("h2", string=re.compile("Related Posts", re.I)):
-                    break
-                paragraphs.append(p)
 
-            body_text = "\n".join(p.get_text(strip=True) for p in paragraphs)
-            body_text = unicodedata.normalize("NFC", body_text)
+BBC_NOISE_PATTERNS = [
+    r"BBC\s*News\s*မြန်မာ",  # 固定署名（Burmese表記）
+    r"BBC\s*Burmese",  # 英語表記
+]
 
-            if not body_text.strip():
-                continue
 
-            # キーワード判定は正規化済みタイトルで行う
-            if not any_keyword_hit(title, body_text):
-                log_no_keyword_hit(
-                    source_name, url, title, body_text, "mizzima:category"
-                )
-                continue
+def _remove_bbc_noise(text: str) -> str:
+    """BBC署名などのノイズフレーズを除去"""
+    if not text:
+        return text
+    for pat in BBC_NOISE_PATTERNS:
+        text = re.sub(pat, "", text, flags=re.IGNORECASE)
+    return text.strip()
 
-            filtered_articles.append(
-                {
-                    "source": source_name,
-                    "url": url,
-                    "title": title,
-                    "date": article_date.isoformat(),
-                    "body": body_text,
-                }
-            )
 
-        except Exception as e:
-            print(f"Error processing {url}: {e}")
+def _iter_rss_items(stream):
+    """RSS を ElementTree.iterparse で1件ずつ読む（全体のツリーを作らない）"""
+    import xml.etree.ElementTree as ET
+
+    for _, el in ET.iterparse(stream, events=("end",)):
+        if el.tag != "item":
             continue
+        yield {
+            "guid": (el.findtext("guid") or "").strip(),
+            "link": (el.findtext("link") or "").strip(),
+            "title": (el.findtext("title") or "").strip(),
+            "pubDate": (el.findtext("pubDate") or "").strip(),
+            "description": (el.findtext("description") or "").strip(),
+        }
+        el.clear()
 
-    return filtered_articles
+
+def _rss_date_mmt(pub_date: str) -> date:
+    """RSS の pubDate（UTC）→ MMT の日付"""
+    try:
+        dt = parsedate_to_datetime(pub_date)
+    except Exception:
+        dt = parse_date(pub_date)
+    return dt.astimezone(MMT).date()
 
 
 # BCCはRSSあるのでそれ使う
 def get_bbc_burmese_articles_for(target_date_mmt):
-    # ==== ローカル定数 ====
-    NOISE_PATTERNS = [
-        r"BBC\s*News\s*မြန်မာ",  # 固定署名（Burmese表記）
-        r"BBC\s*Burmese",  # 英語表記
-    ]
-
-    # ==== ローカル関数 ====
-    def _remove_noise_phrases(text: str) -> str:
-        """BBC署名などのノイズフレーズを除去"""
-        if not text:
-            return text
-        for pat in NOISE_PATTERNS:
-            text = re.sub(pat, "", text, flags=re.IGNORECASE)
-        return text.strip()
-
     # MEMO: ログ用
     # あるテキスト中でキーワードがどこにヒットしたかを返す（周辺文脈つき）
     # def _find_hits(text: str, keywords):
@@ -1093,236 +3552,313 @@ def get_bbc_burmese_articles_for(target_date_mmt):
     #             start = i + len(kw)
     #     return hits
 
-    rss_url = "https://feeds.bbci.co.uk/burmese/rss.xml"
-    session = requests.Session()
+    def _fetch_article(link, title, pub_date_mmt):
+        """記事を取得して抽出。キーワード未ヒットは None"""
+        article_res = fetch_url(link, session=session, timeout=10)
+        article_soup = make_soup(article_res.content, "html.parser")
+        body_text = extract_body_bbc(article_soup)
+
+        # ミャンマー文字の合成差異を避けるため NFC 正規化
+        title_nfc = unicodedata.normalize("NFC", title)
+        title_nfc = _remove_bbc_noise(title_nfc)
+        body_text_nfc = unicodedata.normalize("NFC", body_text)
+        body_text_nfc = _remove_bbc_noise(body_text_nfc)
+
+        art = Article(
+            "BBC Burmese", link, title_nfc, body_text_nfc, pub_date_mmt, nfc=True
+        )
+
+        # キーワード判定
+        if not art.keyword_hit:
+            log_no_keyword_hit(
+                "BBC Burmese", link, title_nfc, body_text_nfc, "bbc:article"
+            )
+            return None
+
+        print(f"✅ 抽出記事: {title_nfc} ({link})")
+        return art
+
+    def _item_hash(it) -> str:
+        raw = "\x1f".join(
+            [it["title"], it["link"], it["pubDate"], it["description"]]
+        ).encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+
+    def _cached_articles(index):
+        return [
+            rec["article"]
+            for rec in index["items"].values()
+            if rec.get("status") == "kept"
+            and date_matches(date.fromisoformat(rec.get("date")), target_date_mmt)
+        ]
+
+    rss_url = BBC_RSS_URL
+    session = _BBC_SESSION
+
+    # guid → {link, hash, date, status, article} の永続インデックス
+    # covered: フィードを最後まで読んで対象日として処理し終えた MMT の日付
+    index = (
+        load_json_state(BBC_INDEX_STATE, None) if BBC_INCREMENTAL_ENABLED else None
+    ) or {"etag": None, "last_modified": None, "items": {}}
+    wanted = {
+        d.isoformat()
+        for d in (
+            target_date_mmt
+            if isinstance(target_date_mmt, (set, frozenset))
+            else (target_date_mmt,)
+        )
+    }
+
+    # 条件付きGET（前回から変化がなければ 304 で終わり）。
+    # 取り直す記事（error）が残っているときと、インデックスが対象日を処理していないとき
+    # （backfill・--date で別の日を見る）は 304 では足りないので全体を取る
+    headers = {}
+    retry = any(
+        r.get("status") not in ("kept", "nokw") for r in index["items"].values()
+    )
+    if not retry and wanted <= set(index.get("covered") or ()):
+        if index.get("etag"):
+            headers["If-None-Match"] = index["etag"]
+        if index.get("last_modified"):
+            headers["If-Modified-Since"] = index["last_modified"]
 
     try:
-        res = session.get(rss_url, timeout=10)
+        res = _traced_http(
+            "requests", session.get, rss_url, timeout=10, headers=headers, stream=True
+        )
+        if res.status_code == 304:
+            res.close()
+            cached = _cached_articles(index)
+            print(f"[bbc] RSS 304 Not Modified → cached {len(cached)} article(s)")
+            return cached
         res.raise_for_status()
     except Exception as e:
         print(f"❌ RSS取得エラー: {e}")
         return []
 
-    soup = BeautifulSoup(res.content, "xml")
     articles = []
+    fetched = reused = 0
+    complete = False
+    try:
+        res.raw.decode_content = True
+        for item in traced_iter("article", _iter_rss_items(res.raw), attr="url"):
+            if not item["pubDate"]:
+                continue
 
-    for item in soup.find_all("item"):
-        pub_date_tag = item.find("pubDate")
-        if not pub_date_tag:
-            continue
-
-        # RSSはUTC → MMTへ変換し、対象日だけ通す
-        try:
-            pub_date = parse_date(pub_date_tag.text)
-            pub_date_mmt = pub_date.astimezone(MMT).date()
-        except Exception as e:
-            print(f"❌ pubDate parse error: {e}")
-            continue
-
-        if pub_date_mmt != target_date_mmt:
-            continue
+            # RSSはUTC → MMTへ変換し、対象日だけ通す
+            try:
+                pub_date_mmt = _rss_date_mmt(item["pubDate"])
+            except Exception as e:
+                print(f"❌ pubDate parse error: {e}")
+                continue
 
-        title = (
-            (item.find("title") or {}).get_text(strip=True)
-            if item.find("title")
-            else ""
-        )
-        link = (
-            (item.find("link") or {}).get_text(strip=True) if item.find("link") else ""
-        )
-        if not link:
-            continue
+            if not date_matches(pub_date_mmt, target_date_mmt):
+                continue
 
-        try:
-            article_res = session.get(link, timeout=10)
-            article_res.raise_for_status()
-            article_soup = BeautifulSoup(article_res.content, "html.parser")
+            title = item["title"]
+            link = item["link"]
+            if not link:
+                continue
 
-            # ===== ここで除外セクションをまとめて削除 =====
-            # 記事署名やメタ情報
-            for node in article_soup.select(
-                'section[role="region"][aria-labelledby="article-byline"]'
-            ):
-                node.decompose()
-            # 「おすすめ／最も読まれた」ブロック
-            for node in article_soup.select(
-                'section[data-e2e="recommendations-heading"][role="region"]'
+            # 新規 or 内容が変わった guid だけ記事ページを取りにいく
+            guid = item["guid"] or link
+            h = _item_hash(item)
+            prev = index["items"].get(guid)
+            if (
+                prev
+                and prev.get("hash") == h
+                and prev.get("status") in ("kept", "nokw")
             ):
-                node.decompose()
-            # ついでにヘッダー/ナビ/フッター等のノイズも落としておく（任意）
-            for node in article_soup.select(
-                'header[role="banner"], nav[role="navigation"], footer[role="contentinfo"], aside'
-            ):
-                node.decompose()
-            # ============================================
-
-            # 本文は main 内の <p> に限定
-            main = article_soup.select_one('main[role="main"]') or article_soup
-            paragraphs = [p.get_text(strip=True) for p in main.find_all("p")]
-            # 空行やノイズを削る
-            paragraphs = [t for t in paragraphs if t]
-            body_text = "\n".join(paragraphs)
-
-            # ミャンマー文字の合成差異を避けるため NFC 正規化
-            title_nfc = unicodedata.normalize("NFC", title)
-            title_nfc = _remove_noise_phrases(title_nfc)
-            body_text_nfc = unicodedata.normalize("NFC", body_text)
-            body_text_nfc = _remove_noise_phrases(body_text_nfc)
-
-            # キーワード判定
-            if not any_keyword_hit(title_nfc, body_text_nfc):
-                log_no_keyword_hit(
-                    "BBC Burmese", link, title_nfc, body_text_nfc, "bbc:article"
-                )
+                reused += 1
+                if prev["status"] == "kept":
+                    articles.append(prev["article"])
+                continue
+
+            if seen_skip("BBC Burmese", link):
                 continue
 
-            # MEMO: ログ用、=== デバッグ: 判定前にタイトル/本文の要約を出す ===
-            # print("----- DEBUG CANDIDATE -----")
-            # print("URL:", link)
-            # print("TITLE:", repr(title_nfc))
-            # print("BODY_HEAD:", repr(body_text_nfc[:500]))
-            # print("BODY_LEN:", len(body_text_nfc))
+            rec = {"link": link, "hash": h, "date": pub_date_mmt.isoformat()}
+            try:
+                fetched += 1
+                art = _fetch_article(link, title, pub_date_mmt)
+                rec["status"] = "kept" if art else "nokw"
+                if art:
+                    rec["article"] = dict(art)  # state は JSON なので素の dict で残す
+                    articles.append(art)
+            except Exception as e:
+                # 失敗分はハッシュを残さず次回再取得
+                print(f"❌ 記事取得/解析エラー: {e}")
+                rec["status"] = "error"
+                rec["hash"] = None
+            index["items"][guid] = rec
+        # traced_iter は予算切れで黙って抜けるので、最後まで読めたかは予算で見る
+        complete = not current_budget().expired()
+    except Exception as e:
+        print(f"❌ RSS解析エラー: {e}")
+        return articles
+    finally:
+        res.close()
+
+    print(
+        f"[bbc] fetched={fetched} reused={reused} kept={len(articles)}"
+        + ("" if complete else " (cut by time budget)")
+    )
 
-            # # キーワード判定（ヒット詳細も取る）
-            # title_hits = _find_hits(title_nfc, NEWS_KEYWORDS)
-            # body_hits  = _find_hits(body_text_nfc, NEWS_KEYWORDS)
-            # total_hits = title_hits + body_hits
+    if BBC_INCREMENTAL_ENABLED:
+        # 古い guid は捨てる（インデックスの肥大化防止）
+        oldest, _ = target_date_span(target_date_mmt)
+        horizon = (oldest - timedelta(days=BBC_INDEX_KEEP_DAYS)).isoformat()
+        index["items"] = {
+            g: r for g, r in index["items"].items() if (r.get("date") or "") >= horizon
+        }
+        covered = set(index.get("covered") or ())
+        if complete:
+            covered |= wanted
+            index["etag"] = res.headers.get("ETag")
+            index["last_modified"] = res.headers.get("Last-Modified")
+        else:
+            # 途中で打ち切ったら検証子は残さない（次回は 304 にせず全体を取る）
+            index["etag"] = index["last_modified"] = None
+        index["covered"] = sorted(d for d in covered if d >= horizon)
+        save_json_state(BBC_INDEX_STATE, index)
 
-            # if not total_hits:
-            #     print("SKIP: no keyword hits.")
-            #     continue
+    return articles
 
-            # # === デバッグ: どのキーワードがどこで当たったか ===
-            # print("HITS:", len(total_hits))
-            # if title_hits:
-            #     print(" - in TITLE:")
-            #     for h in title_hits[:10]:
-            #         print(f"   kw={repr(h['kw'])} ctx=…{h['ctx']}…")
-            # if body_hits:
-            #     print(" - in BODY:")
-            #     for h in body_hits[:10]:  # 長くなるので最大10件
-            #         print(f"   kw={repr(h['kw'])} ctx=…{h['ctx']}…")
-
-            print(f"✅ 抽出記事: {title_nfc} ({link})")
-            articles.append(
-                {
-                    "title": title_nfc,
-                    "url": link,
-                    "date": pub_date_mmt.isoformat(),
-                    "source": "BBC Burmese",
-                    "body": body_text_nfc,
-                }
-            )
 
-        except Exception as e:
-            print(f"❌ 記事取得/解析エラー: {e}")
-            continue
+# Khit Thit の巡回対象カテゴリ（先頭の news が一番更新が多い）
+KHIT_THIT_CATEGORY_SLUGS = [
+    "news",
+    "politics",
+    "editor-choice",
+    "interview",
+    "china-watch",
+]
 
-    return articles
+
+def khit_thit_listing_links(raw) -> List[str]:
+    """カテゴリ一覧ページ → 記事URL（出現順）"""
+    soup = make_soup(raw, "html.parser")
+    return [
+        a.get("href")
+        for a in soup.select("p.entry-title.td-module-title a[href]")
+        if a.get("href")
+    ]
 
 
 # khit_thit_mediaカテゴリーページ巡回で取得
 def get_khit_thit_media_articles_from_category(date_obj, max_pages=3):
+    BASE = SOURCE_BASE_URLS["khit_thit"]
     # 追加カテゴリを含む巡回対象
-    CATEGORY_URLS = [
-        "https://yktnews.com/category/news/",
-        "https://yktnews.com/category/politics/",
-        "https://yktnews.com/category/editor-choice/",
-        "https://yktnews.com/category/interview/",
-        "https://yktnews.com/category/china-watch/",
-    ]
+    CATEGORY_SLUGS = KHIT_THIT_CATEGORY_SLUGS
+    CATEGORY_URLS = [f"{BASE}/category/{slug}/" for slug in CATEGORY_SLUGS]
+
+    def _build_article(url, title, article_date, body_text, keyword_hit=None):
+        if not body_text.strip():
+            seen_record("Khit Thit Media", url, "empty")
+            return None  # 本文が空ならスキップ
+
+        art = Article(
+            "Khit Thit Media",
+            url,
+            title,
+            body_text,
+            article_date,
+            keyword_hit=keyword_hit,
+        ).normalized()
+        if not art.keyword_hit:
+            log_no_keyword_hit(
+                "Khit Thit Media", url, art.title, art.body, "khitthit:category"
+            )
+            return None  # キーワード無しは除外
 
-    HASHTAG_TOKEN_RE = re.compile(
-        r"(?:(?<=\s)|^)\#[^\s#]+"
-    )  # 空白or行頭から始まる #トークンを除去（多言語対応）
+        return art
 
-    def _remove_hashtag_links(soup):
-        """
-        <a>や<strong><a>…</a></strong>のような入れ子を含め、
-        テキストが '#' で始まるアンカーを本文から除去する。
-        """
-        # a要素の中で可視テキストが '#' で始まるものをまるごと削除
-        for a in soup.select("a"):
-            txt = a.get_text(strip=True)
-            if txt.startswith("#"):
-                a.decompose()
-
-    collected_urls = set()
-    for base_url in CATEGORY_URLS:
-        for page in range(1, max_pages + 1):
-            url = f"{base_url}page/{page}/" if page > 1 else base_url
-            print(f"Fetching {url}")
+    # ==== 0) WordPress REST / news sitemap で当日分を取得（使えなければ HTML 巡回へ） ====
+    # sitemap はカテゴリで絞れないが、キーワード判定で落ちるので候補の拡大は許容する
+    posts = discover_wp_posts_for(
+        date_obj, BASE, category_slugs=CATEGORY_SLUGS, log_tag="khitthit"
+    )
+
+    filtered_articles = []
+    collected_urls = {}  # 正規化キー → URL
+    if posts is not None:
+        for post in posts:
+            if seen_skip("Khit Thit Media", post["url"]):
+                continue
+            if post["content_html"] is None:
+                # sitemap 由来（本文なし）は記事ページを取りにいく
+                collected_urls.setdefault(_norm_id(post["url"]), post["url"])
+                continue
             try:
-                res = fetch_with_retry(url)
+                soup_post = make_soup(
+                    f'<div class="entry-content">{post["content_html"]}</div>',
+                    "html.parser",
+                )
+                art = _build_article(
+                    post["url"],
+                    post["title"],
+                    date.fromisoformat(post["date"]),
+                    extract_body_khit_thit(soup_post),
+                )
+                if art:
+                    filtered_articles.append(art)
             except Exception as e:
-                print(f"[khitthit] stop pagination (missing/unreachable): {url} -> {e}")
-                break
+                print(f"Error processing {post['url']}: {e}")
+                continue
+    else:
+        for base_url in traced_iter("listing", CATEGORY_URLS, attr="url"):
+            for page in range(1, max_pages + 1):
+                url = f"{base_url}page/{page}/" if page > 1 else base_url
+                print(f"Fetching {url}")
+                try:
+                    res = fetch_with_retry(url)
+                except Exception as e:
+                    print(
+                        f"[khitthit] stop pagination (missing/unreachable): {url} -> {e}"
+                    )
+                    break
 
-            soup = BeautifulSoup(res.content, "html.parser")
-            entry_links = soup.select("p.entry-title.td-module-title a[href]")
-            if not entry_links:
-                print(f"[khitthit] stop pagination (no entries): {url}")
-                break
+                entry_links = khit_thit_listing_links(res.content)
+                if not entry_links:
+                    print(f"[khitthit] stop pagination (no entries): {url}")
+                    break
 
-            for a in entry_links:
-                href = a.get("href")
-                if not href:
-                    continue
-                if href in collected_urls:  # ← 既出URLは明示スキップ
-                    continue
-                collected_urls.add(href)
+                for href in entry_links:
+                    # 既出URLは明示スキップ（utm 付き・AMP 版も同一視）
+                    collected_urls.setdefault(_norm_id(href), href)
 
-    filtered_articles = []
-    for url in collected_urls:
-        try:
-            res_article = fetch_with_retry(url)
-            soup_article = BeautifulSoup(res_article.content, "html.parser")
+    def _fetch_pages():
+        for url in traced_iter("article", list(collected_urls.values()), attr="url"):
+            if seen_skip("Khit Thit Media", url):
+                continue
+            # 一覧由来（日付なし）だけ下見する。sitemap 由来は当日分と分かっている
+            if posts is None and head_probe_skip("Khit Thit Media", url, date_obj):
+                continue
+            try:
+                yield (
+                    url,
+                    fetch_with_retry(url, stop_after=stream_stop("khit_thit")).content,
+                )
+            except Exception as e:
+                print(f"Error processing {url}: {e}")
 
-            # 日付取得
-            meta_tag = soup_article.find("meta", property="article:published_time")
-            if not meta_tag or not meta_tag.has_attr("content"):
+    # 取得しながら解析プールへ（日付・h1・本文・キーワード判定まで向こうで済ませる）
+    for url, rec in parse_fetched(_fetch_pages(), "khit_thit"):
+        try:
+            if not rec:
+                continue
+            if not rec["date"] or not rec["title"]:
+                seen_record("Khit Thit Media", url, "empty")
                 continue
-            date_str = meta_tag["content"]
-            article_datetime_utc = datetime.fromisoformat(date_str)
-            article_datetime_mmt = article_datetime_utc.astimezone(MMT)
-            article_date = article_datetime_mmt.date()
-            if article_date != date_obj:
+            if not date_matches(rec["date"], date_obj):
+                seen_record("Khit Thit Media", url, "off_date")
                 continue  # 対象日でなければスキップ
 
-            # タイトル取得
-            title_tag = soup_article.find("h1")
-            if not title_tag:
-                continue
-            title = title_tag.get_text(strip=True)
-
-            # 本文取得  ← この直前に “ハッシュタグ除去” を差し込む
-            _remove_hashtag_links(soup_article)  # ① HTML段階で #アンカーを除去
-            paragraphs = extract_paragraphs_with_wait(soup_article)
-            # ② テキスト化後も保険で #トークンを除去
-            body_text = "\n".join(
-                HASHTAG_TOKEN_RE.sub("", p.get_text(strip=True)).strip()
-                for p in paragraphs
-                if p.get_text(strip=True)  # 空パラはそもそも捨てる
-            )
-            body_text = unicodedata.normalize("NFC", body_text)
-            if not body_text.strip():
-                continue  # 本文が空ならスキップ
-
-            if not any_keyword_hit(title, body_text):
-                log_no_keyword_hit(
-                    "Khit Thit Media", url, title, body_text, "khitthit:category"
-                )
-                continue  # キーワード無しは除外
-
-            filtered_articles.append(
-                {
-                    "url": url,
-                    "title": title,
-                    "date": date_obj.isoformat(),
-                    "source": "Khit Thit Media",  # deduplicate_by_urlのログで使われる
-                    "body": body_text,
-                }
+            art = _build_article(
+                url, rec["title"], rec["date"], rec["body"], rec["keyword_hit"]
             )
+            if art:
+                filtered_articles.append(art)
         except Exception as e:
             print(f"Error processing {url}: {e}")
             continue
@@ -1334,8 +3870,115 @@ def get_khit_thit_media_articles_from_category(date_obj, max_pages=3):
     return filtered_articles
 
 
+# Irrawaddy のカテゴリ一覧は同じ記事が何か所にも出るので、カテゴリごとに
+# 「上位のカテゴリで拾えなかった当日候補が何件増えたか」を指数移動平均で覚えておき、
+# 期待値の高い順に並べ、ほぼ増えないカテゴリは間引く（ときどき見に行って変化は拾う）
+IRRAWADDY_ADAPTIVE_ENABLED = str(os.getenv("IRRAWADDY_ADAPTIVE", "1")).lower() not in (
+    "0",
+    "false",
+    "off",
+)
+IRRAWADDY_YIELD_STATE = "irrawaddy_category_yield.json"
+IRRAWADDY_YIELD_ALPHA = 0.3  # EMA の重み（1回の観測の効き）
+IRRAWADDY_YIELD_MIN_RUNS = 5  # これだけ観測するまでは間引かない
+IRRAWADDY_YIELD_SKIP_EPS = 0.05  # 平均の新規候補数がこれ未満なら間引く
+IRRAWADDY_EXPLORE_RATE = float(os.getenv("IRRAWADDY_EXPLORE_RATE", "0.1"))
+IRRAWADDY_EXPLORE_DAYS = 7  # 間引いたカテゴリもこの日数に一度は見る
+IRRAWADDY_LISTING_WORKERS = int(os.getenv("IRRAWADDY_LISTING_WORKERS", "4"))
+
+
+class _CategoryYield:
+    """カテゴリごとの新規候補数の履歴 {key: {"ema", "runs", "last"}}"""
+
+    def __init__(self, state):
+        self.state = state
+        self.cats = state.setdefault("categories", {})
+
+    def plan(self, keys, today: date, rng=random):
+        """(巡回する順のキー, 間引くキー) を返す。未観測のカテゴリは先頭に置いて必ず見る"""
+
+        def _expected(k):
+            c = self.cats.get(k)
+            return float("inf") if not c else c["ema"]
+
+        order, skipped = [], []
+        for k in sorted(keys, key=_expected, reverse=True):
+            c = self.cats.get(k)
+            stale = True
+            if c and c.get("last"):
+                stale = (today - date.fromisoformat(c["last"])).days >= (
+                    IRRAWADDY_EXPLORE_DAYS
+                )
+            if (
+                c
+                and c["runs"] >= IRRAWADDY_YIELD_MIN_RUNS
+                and c["ema"] < IRRAWADDY_YIELD_SKIP_EPS
+                and not stale
+                and rng.random() >= IRRAWADDY_EXPLORE_RATE
+            ):
+                skipped.append(k)
+            else:
+                order.append(k)
+        return order, skipped
+
+    def update(self, key, new_count: int, today: date):
+        c = self.cats.setdefault(key, {"ema": float(new_count), "runs": 0})
+        if c["runs"]:
+            a = IRRAWADDY_YIELD_ALPHA
+            c["ema"] = round(a * new_count + (1 - a) * c["ema"], 4)
+        c["runs"] += 1
+        c["last"] = today.isoformat()
+
+
+IRRAWADDY_EXCLUDE_PREFIXES = [
+    "/category/news/asia",  # 除外依頼有
+    "/category/news/world",  # 除外依頼有
+    "/video",  # "/category/Video"は除外対象だがこのパターンもある
+    "/cartoons",  # "/category/Cartoons"は除外対象だがこのパターンもある
+]  # 先頭一致・大小無視
+
+
+def _irrawaddy_excluded_url(href: str) -> bool:
+    try:
+        p = urlparse(href or "").path.lower()
+    except Exception:
+        p = (href or "").lower()
+    return any(p.startswith(x) for x in IRRAWADDY_EXCLUDE_PREFIXES)
+
+
+def irrawaddy_home_links(raw, date_obj) -> List[str]:
+    """ホームの kuDRpuo カラム → 表示日が対象日の記事URL（出現順）"""
+    soup_home = make_soup(raw, "html.parser")
+
+    # data-id でスコープ特定（class でも拾えるように冗長化）
+    home_scope = soup_home.select_one(
+        'div.elementor-element-kuDRpuo[data-id="kuDRpuo"], '
+        "div.elementor-element-kuDRpuo, "
+        '[data-id="kuDRpuo"]'
+    )
+    hits = []
+    if home_scope:
+        links = home_scope.select(".jeg_meta_date a[href]")
+        links = [a for a in links if a.find("i", class_="fa fa-clock-o")]
+        for a in links:
+            href = a.get("href") or ""
+            raw = a.get_text(" ", strip=True)
+            try:
+                shown_date = _parse_category_date_text(raw)
+            except Exception:
+                continue
+
+            # ▼ ここでも除外
+            if _irrawaddy_excluded_url(href):
+                continue
+
+            if date_matches(shown_date, date_obj) and href and href not in hits:
+                hits.append(href)
+    return hits
+
+
 # irrawaddy
-def get_irrawaddy_articles_for(date_obj, debug=True):
+def get_irrawaddy_articles_for(date_obj, debug=True, max_pages=1):
     """
     指定の Irrawaddy カテゴリURL群（相対パス）を1回ずつ巡回し、
     MMTの指定日(既定: 今日)にヒットする記事のみ返す。
@@ -1346,6 +3989,9 @@ def get_irrawaddy_articles_for(date_obj, debug=True):
     - 一覧では「時計アイコン付きの日付リンク」から当日候補を抽出
     - 記事側では <meta property="article:published_time"> を MMT に変換して再確認
     - 本文は <div class="content-inner "> 配下の <p> から抽出（特定ブロック配下は除外）
+    - WordPress REST / news sitemap が使えればそちらを優先（一覧巡回を省略）
+    - backfill 用に date_obj は日付集合も可。max_pages>1 なら /page/N/ まで辿り、
+      一覧の日付が対象範囲より古くなった時点で打ち切る
     返り値: [{url, title, date}]
     依存: MMT, get_today_date_mmt, fetch_with_retry, any_keyword_hit
     """
@@ -1391,20 +4037,9 @@ def get_irrawaddy_articles_for(date_obj, debug=True):
         # "/category/photo", # 2016年で更新止まってる
         # "/category/photo-essay", # 2021年で更新止まってる
     ]
-    BASE = "https://www.irrawaddy.com"
-    EXCLUDE_PREFIXES = [
-        "/category/news/asia",  # 除外依頼有
-        "/category/news/world",  # 除外依頼有
-        "/video",  # "/category/Video"は除外対象だがこのパターンもある
-        "/cartoons",  # "/category/Cartoons"は除外対象だがこのパターンもある
-    ]  # 先頭一致・大小無視
-
-    def _is_excluded_url(href: str) -> bool:
-        try:
-            p = urlparse(href or "").path.lower()
-        except Exception:
-            p = (href or "").lower()
-        return any(p.startswith(x) for x in EXCLUDE_PREFIXES)
+    BASE = SOURCE_BASE_URLS["irrawaddy"]
+    EXCLUDE_PREFIXES = IRRAWADDY_EXCLUDE_PREFIXES
+    _is_excluded_url = _irrawaddy_excluded_url
 
     # ==== 正規化・ユニーク化・除外 ====
     def _norm(p: str) -> str:
@@ -1426,118 +4061,239 @@ def get_irrawaddy_articles_for(date_obj, debug=True):
     seen_urls = set()
     candidate_urls = []
 
-    # ==== 1) 各カテゴリURLを1回ずつ巡回 → 当日候補抽出 ====
-    for rel_path in paths:
-        url = f"{BASE}{rel_path}"
-        # print(f"Fetching {url}")
-        try:
-            res = fetch_with_retry_irrawaddy(url, session=session)
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            continue
-
-        soup = BeautifulSoup(res.content, "html.parser")
-        wrapper = soup.select_one("div.jeg_content")  # テーマによっては無いこともある
+    # ==== 0) WordPress REST / news sitemap で当日分を取得（使えなければ HTML 巡回へ） ====
+    # HTML 巡回と同じカテゴリ（paths）だけを通す。REST はカテゴリ slug で絞り、記事URLは
+    # カテゴリを含むパーマリンク（/news/burma/... 等）なので sitemap 分も先頭一致で絞る
+    # （除外依頼のあった culture/books や更新の止まった Lifestyle などを拾わないように）
+    ARTICLE_EXCLUDE_PREFIXES = ["/news/asia", "/news/world"]
+    category_slugs = list(
+        dict.fromkeys(p.strip("/").split("/")[-1].lower() for p in paths)
+    )
+    article_prefixes = tuple(
+        dict.fromkeys(
+            "/" + p.lower().strip("/").removeprefix("category/").split("/")[0] + "/"
+            for p in paths
+        )
+    )
 
-        # ✅ union 方式：wrapper 内→見つからなければページ全体の順で探索
-        scopes = ([wrapper] if wrapper else []) + [soup]
+    def _wp_url_ok(href: str) -> bool:
+        p = urlparse(href or "").path.lower()
+        return (
+            p.startswith(article_prefixes)
+            and not _is_excluded_url(href)
+            and not any(p.startswith(x) for x in ARTICLE_EXCLUDE_PREFIXES)
+        )
 
-        for scope in scopes:
-            # ヒーロー枠＋通常リスト＋汎用メタを一発で拾う
-            links = scope.select(
-                ".jnews_category_hero_container .jeg_meta_date a[href], "
-                "div.jeg_postblock_content .jeg_meta_date a[href], "
-                ".jeg_post_meta .jeg_meta_date a[href]"
+    posts = discover_wp_posts_for(
+        date_obj,
+        BASE,
+        category_slugs=category_slugs,
+        exclude_category_slugs=[
+            "asia",
+            "world",
+            "video",
+            "cartoons",
+            "culture",
+            "books",
+        ],
+        # /wp-json だけ塞がれていることがあるので、探索の失敗ではホストを open にしない
+        fetcher=lambda u: fetch_with_retry_irrawaddy(
+            u, retries=1, wait_seconds=0, session=session, count_host_failures=False
+        ),
+        url_filter=_wp_url_ok,
+        log_tag="irrawaddy",
+    )
+    for post in traced_iter("article", posts or [], attr="url"):
+        if _norm_id(post["url"]) in seen_urls:
+            continue
+        seen_urls.add(_norm_id(post["url"]))
+        if seen_skip("Irrawaddy", post["url"]):
+            continue
+        if post["content_html"] is None:
+            # sitemap 由来（本文なし）は 2) の記事ページ確認へ回す
+            candidate_urls.append(post["url"])
+            continue
+        body = extract_body_irrawaddy(
+            make_soup(
+                f'<div class="content-inner">{post["content_html"]}</div>',
+                "html.parser",
+            )
+        )
+        if post["title"] and body:
+            results.append(
+                Article(
+                    "Irrawaddy",
+                    post["url"],
+                    _norm_text(post["title"]),
+                    body,
+                    post["date"],
+                    nfc=True,
+                )
             )
-            # 時計アイコン付きだけに限定（ノイズ回避）
-            links = [a for a in links if a.find("i", class_="fa fa-clock-o")]
-
-            # （任意）デバッグ表示
-            # dbg(f"[cat] union-links={len(links)} @ {url}")
-            for a in links[:2]:
-                _txt = re.sub(r"\s+", " ", a.get_text(" ", strip=True))
-                # dbg("   →", _txt, "|", a.get("href"))
 
-            found = 0
-            for a in links:
-                href = a.get("href") or ""
-                raw = a.get_text(" ", strip=True)
-                try:
-                    shown_date = _parse_category_date_text(raw)
-                except Exception:
-                    # 必要最小限のデバッグだけ
-                    # dbg("[cat] date-parse-fail:", re.sub(r"\s+", " ", raw)[:120])
-                    continue
+    # ==== 1) 各カテゴリURLを巡回 → 当日候補抽出 ====
+    # 一覧はスレッドで並行に取り、結果は期待値の高い順に突き合わせて新規件数を数える
+    oldest_target, _ = target_date_span(date_obj)
 
-                # ▼ ここで /video などを除外
-                if _is_excluded_url(href):
-                    continue
+    def _scan_category(rel_path):
+        """当日候補の href を一覧の出現順で返す（1ページ目が取れなければ None）"""
+        hits, local_seen = [], set()
+        for page_no in traced_iter(
+            "listing", range(1, max_pages + 1), attr="page", path=rel_path
+        ):
+            url = (
+                f"{BASE}{rel_path}"
+                if page_no == 1
+                else f"{BASE}{rel_path.rstrip('/')}/page/{page_no}/"
+            )
+            # print(f"Fetching {url}")
+            try:
+                res = fetch_with_retry_irrawaddy(url, session=session)
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                return hits if page_no > 1 else None
+
+            soup = make_soup(res.content, "html.parser")
+            # テーマによっては無いこともある
+            wrapper = soup.select_one("div.jeg_content")
+
+            # ✅ union 方式：wrapper 内→見つからなければページ全体の順で探索
+            scopes = ([wrapper] if wrapper else []) + [soup]
+            page_dates = []
+
+            for scope in scopes:
+                # ヒーロー枠＋通常リスト＋汎用メタを一発で拾う
+                links = scope.select(
+                    ".jnews_category_hero_container .jeg_meta_date a[href], "
+                    "div.jeg_postblock_content .jeg_meta_date a[href], "
+                    ".jeg_post_meta .jeg_meta_date a[href]"
+                )
+                # 時計アイコン付きだけに限定（ノイズ回避）
+                links = [a for a in links if a.find("i", class_="fa fa-clock-o")]
 
-                if shown_date == date_obj and href and href not in seen_urls:
-                    candidate_urls.append(href)
-                    seen_urls.add(href)
-                    found += 1
+                found = 0
+                for a in links:
+                    href = a.get("href") or ""
+                    raw = a.get_text(" ", strip=True)
+                    try:
+                        shown_date = _parse_category_date_text(raw)
+                    except Exception:
+                        continue
+
+                    # ▼ ここで /video などを除外
+                    if _is_excluded_url(href):
+                        continue
+
+                    page_dates.append(shown_date)
+                    if (
+                        date_matches(shown_date, date_obj)
+                        and href
+                        and href not in local_seen
+                    ):
+                        hits.append(href)
+                        local_seen.add(href)
+                        found += 1
+
+                # wrapper 内で“当日”が見つかったら soup まで広げず終了。
+                # wrapper が無い場合（scopes が [soup] だけの時）も1周で抜ける。
+                if found > 0:
+                    break
 
-            # wrapper 内で“当日”が見つかったら soup まで広げず終了。
-            # wrapper が無い場合（scopes が [soup] だけの時）も1周で抜ける。
-            if found > 0:
-                # dbg(f"[cat] STOP (added {found} candidates) @ {url}")
+            # 一覧の日付がすべて対象範囲より古ければ次ページは見ない
+            if not page_dates or max(page_dates) < oldest_target:
                 break
+        return hits
 
-    # ==== 1.5) ホーム（kuDRpuoカラム）巡回 → 当日候補抽出（新規） ====
-    try:
-        home_url = f"{BASE}/"
-        res_home = fetch_with_retry_irrawaddy(home_url, session=session)
-        soup_home = BeautifulSoup(res_home.content, "html.parser")
-
-        # data-id でスコープ特定（class でも拾えるように冗長化）
-        home_scope = soup_home.select_one(
-            'div.elementor-element-kuDRpuo[data-id="kuDRpuo"], '
-            "div.elementor-element-kuDRpuo, "
-            '[data-id="kuDRpuo"]'
-        )
+    # ==== 1.5) ホーム（kuDRpuoカラム）巡回 → 当日候補抽出 ====
+    def _scan_home():
+        try:
+            home_url = f"{BASE}/"
+            res_home = fetch_with_retry_irrawaddy(home_url, session=session)
+        except Exception as e:
+            print(f"Error scanning homepage column kuDRpuo: {e}")
+            return None
+        return irrawaddy_home_links(res_home.content, date_obj)
+
+    # REST/sitemap で取得できた場合は一覧もホームも不要
+    scanners = {}
+    if posts is None:
+        scanners = {p: functools.partial(_scan_category, p) for p in paths}
+        scanners["home:kuDRpuo"] = _scan_home
+
+    # 収穫履歴で順序付け・間引き（backfill の多ページ巡回では全部見る）
+    history = None
+    today = get_today_date_mmt()
+    order = list(scanners)
+    if scanners and IRRAWADDY_ADAPTIVE_ENABLED and max_pages == 1:
+        history = _CategoryYield(load_json_state(IRRAWADDY_YIELD_STATE, {}))
+        order, skipped = history.plan(order, today)
+        if skipped:
+            dbg(
+                f"[irrawaddy] listing: fetch {len(order)}/{len(scanners)}, skip {skipped}"
+            )
 
-        if home_scope:
-            links = home_scope.select(".jeg_meta_date a[href]")
-            links = [a for a in links if a.find("i", class_="fa fa-clock-o")]
-            for a in links:
-                href = a.get("href") or ""
-                raw = a.get_text(" ", strip=True)
+    if order:
+        with ThreadPoolExecutor(max_workers=IRRAWADDY_LISTING_WORKERS) as pool:
+            # 予算（time_budget）を各スレッドへ引き継ぐ
+            futures = {
+                k: pool.submit(contextvars.copy_context().run, scanners[k])
+                for k in order
+            }
+            for k in order:
                 try:
-                    shown_date = _parse_category_date_text(raw)
-                except Exception:
-                    continue
-
-                # ▼ ここでも除外
-                if _is_excluded_url(href):
-                    continue
-
-                if shown_date == date_obj and href and href not in seen_urls:
-                    candidate_urls.append(href)
-                    seen_urls.add(href)
-    except Exception as e:
-        print(f"Error scanning homepage column kuDRpuo: {e}")
+                    hits = futures[k].result()
+                except Exception as e:
+                    print(f"Error scanning {k}: {e}")
+                    hits = None
+                new = 0
+                for href in hits or []:
+                    if _norm_id(href) not in seen_urls:
+                        candidate_urls.append(href)
+                        seen_urls.add(_norm_id(href))
+                        new += 1
+                # 取れなかった・時間切れで途中までの回は学習しない
+                if history and hits is not None and not current_budget().expired():
+                    history.update(k, new, today)
+        if history:
+            save_json_state(IRRAWADDY_YIELD_STATE, history.state)
 
     # ログ、候補URL収集が終わった直後（カテゴリ＋ホーム統合のあと）
     dbg(f"[irrawaddy] candidates={len(candidate_urls)} (unique)")
 
     # ==== 2) 候補記事で厳密確認（meta日付/本文/キーワード） ====
-    for url in candidate_urls:
-        if _is_excluded_url(url):  # ベルト＆サスペンダー
-            continue
-        try:
-            res_article = fetch_with_retry_irrawaddy(url, session=session)
-            soup_article = BeautifulSoup(res_article.content, "html.parser")
-
-            if _article_date_from_meta_mmt(soup_article) != date_obj:
+    def _fetch_pages():
+        for url in traced_iter("article", candidate_urls, attr="url"):
+            if _is_excluded_url(url):  # ベルト＆サスペンダー
+                continue
+            if seen_skip("Irrawaddy", url):
                 continue
+            if head_probe_skip(
+                "Irrawaddy",
+                url,
+                date_obj,
+                strategies=BROWSER_TIERS,
+                session=session,
+                headers=IRRAWADDY_HEADERS,
+                timeout=30,
+            ):
+                continue
+            try:
+                yield url, fetch_with_retry_irrawaddy(url, session=session).content
+            except Exception as e:
+                print(f"Error processing {url}: {e}")
 
-            title = _extract_title(soup_article)
-            if not title:
+    for url, rec in parse_fetched(_fetch_pages(), "irrawaddy"):
+        try:
+            if not rec:
+                continue
+            article_date = rec["date"]
+            if article_date and not date_matches(article_date, date_obj):
+                seen_record("Irrawaddy", url, "off_date")
                 continue
 
-            body = extract_body_irrawaddy(soup_article)
-            if not body:
+            title, body = rec["title"], rec["body"]
+            if not article_date or not title or not body:
+                seen_record("Irrawaddy", url, "empty")
                 continue
 
             # irrawaddyはどの記事もほしいとのことなのでキーワード検索は外す
@@ -1546,13 +4302,15 @@ def get_irrawaddy_articles_for(date_obj, debug=True):
             #     continue
 
             results.append(
-                {
-                    "url": url,
-                    "title": title,
-                    "date": date_obj.isoformat(),
-                    "body": body,
-                    "source": "irrawaddy",  # 重複削除関数を使うため追加
-                }
+                Article(
+                    "Irrawaddy",
+                    url,
+                    title,
+                    body,
+                    article_date,
+                    nfc=True,
+                    keyword_hit=rec["keyword_hit"],
+                )
             )
         except Exception as e:
             print(f"Error processing {url}: {e}")
@@ -1581,10 +4339,14 @@ def get_irrawaddy_articles_for(date_obj, debug=True):
 
 
 # DVB
-def get_dvb_articles_for(date_obj: date, debug: bool = True) -> List[Dict]:
+def get_dvb_articles_for(
+    date_obj: date, debug: bool = True, max_pages: int = 2
+) -> List[Dict]:
     """
-    - /category/... の一覧（1ページ目＋?page=2）から、指定日と一致するカードだけ候補化。
-    - 記事ページでは <title> / .full_content p を抽出。
+    - /category/... の一覧（1ページ目＋?page=2…max_pages）から、指定日と一致するカードだけ候補化。
+      （backfill では date_obj に日付集合を渡し、一覧が対象範囲より古くなったら打ち切る）
+    - 一覧・記事とも埋め込みデータ（__NEXT_DATA__）を優先し、無ければ DOM
+      （一覧はカードの表示日、記事は <title> / .full_content p）を読む。
     - タイトル・本文をNFC正規化して any_keyword_hit でフィルタ。
     - 返り値: [{url, title, date, body, source}]
     ※ DVB専用 fetch_with_retry_dvb を使用。
@@ -1594,7 +4356,7 @@ def get_dvb_articles_for(date_obj: date, debug: bool = True) -> List[Dict]:
     - /category/6/features
     当該3カテゴリは除外したいグループになるので/category/8/newsのみを取得対象とする。
     """
-    BASE = "https://burmese.dvb.no"
+    BASE = SOURCE_BASE_URLS["dvb"]
     CATEGORY_PATHS = [
         "/category/8/news",
         # "/category/17/news_politics-new",
@@ -1616,38 +4378,12 @@ def get_dvb_articles_for(date_obj: date, debug: bool = True) -> List[Dict]:
     def _norm_path(p: str) -> str:
         return re.sub(r"/{2,}", "/", (p or "").strip())
 
-    def _parse_dvb_date(text: str) -> Optional[date]:
-        if not text:
-            return None
-        s = re.sub(r"\s+", " ", text.strip())
-        try:
-            return datetime.strptime(s, "%B %d, %Y").date()
-        except ValueError:
-            return None
-
-    def _extract_title_dvb(soup: BeautifulSoup) -> str:
-        t = (soup.title.string or "").strip() if soup.title else ""
-        if t:
-            return t
-        h = soup.select_one(".text-2xl, h1, .post-title")
-        return (h.get_text(" ", strip=True) if h else "").strip()
-
-    def _extract_body_dvb(soup: BeautifulSoup) -> str:
-        host = soup.select_one(".full_content")
-        if not host:
-            return ""
-        parts = []
-        for p in host.select("p"):
-            txt = p.get_text(" ", strip=True)
-            txt = re.sub(r"\s+", " ", txt)
-            if txt:
-                parts.append(txt)
-        return "\n".join(parts).strip()
-
     log = (lambda *a, **k: print(*a, **k)) if debug else (lambda *a, **k: None)
     results: List[Dict] = []
     candidate_urls: List[str] = []
+    candidate_dates: Dict[str, date] = {}
     seen_urls = set()
+    oldest_target, _ = target_date_span(date_obj)
 
     # 共有セッション（cookies/指紋を一覧→記事で引き継ぐ）
     try:
@@ -1658,8 +4394,10 @@ def get_dvb_articles_for(date_obj: date, debug: bool = True) -> List[Dict]:
     # ---- 1) カテゴリ一覧巡回（各カテゴリにつき page=1,2）
     for rel in CATEGORY_PATHS:
         rel = _norm_path(rel)
-        for page_no in (1, 2):
-            url = f"{BASE}{rel}" if page_no == 1 else f"{BASE}{rel}?page=2"
+        for page_no in traced_iter(
+            "listing", range(1, max_pages + 1), attr="page", path=rel
+        ):
+            url = f"{BASE}{rel}" if page_no == 1 else f"{BASE}{rel}?page={page_no}"
             try:
                 res = fetch_with_retry_dvb(url, retries=4, wait_seconds=2, session=sess)
             except Exception as e:
@@ -1670,77 +4408,64 @@ def get_dvb_articles_for(date_obj: date, debug: bool = True) -> List[Dict]:
                 log(f"[skip] non-200 ({res.status_code}) {url}")
                 continue
 
-            soup = BeautifulSoup(
-                getattr(res, "content", None) or res.text, "html.parser"
-            )
-
-            # 一覧ブロック（特徴で特定。無ければフォールバックでページ全体）
-            blocks = soup.select(
-                "div.md\\:grid.grid-cols-3.gap-4.mt-5, div.grid.grid-cols-3.gap-4.mt-5"
-            ) or [soup]
+            # まずは埋め込みデータ（正確な公開時刻）。無ければ DOM のカードを読む
+            cards, via = dvb_listing(res.content, BASE)
 
             found = 0
-            for scope in blocks:
-                anchors = scope.select('a[href^="/post/"]')
-                for a in anchors:
-                    href = a.get("href") or ""
-                    # 第一候補：カード内の date ブロック
-                    date_div = a.select_one(
-                        "div.flex.gap-1.text-xs.mt-2.text-gray-500 div"
-                    )
-                    date_text = (
-                        date_div.get_text(" ", strip=True) if date_div else ""
-                    ).strip()
-                    # フォールバック：英語月名パターン
-                    if not date_text:
-                        full = a.get_text(" ", strip=True)
-                        m = re.search(
-                            r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},\s*\d{4}",
-                            full,
-                        )
-                        date_text = m.group(0) if m else ""
-                    d = _parse_dvb_date(date_text)
-                    if d and d == date_obj:
-                        uabs = href if href.startswith("http") else f"{BASE}{href}"
-                        if uabs not in seen_urls:
-                            candidate_urls.append(uabs)
-                            seen_urls.add(uabs)
-                            found += 1
-            log(f"[list] {url} -> candidates+{found}")
+            page_dates = [d for _, d in cards if d]
+            for uabs, d in cards:
+                if d and date_matches(d, date_obj) and _norm_id(uabs) not in seen_urls:
+                    candidate_urls.append(uabs)
+                    candidate_dates[uabs] = d
+                    seen_urls.add(_norm_id(uabs))
+                    found += 1
+            log(f"[list] {url} -> candidates+{found} ({via})")
+            # 一覧の日付がすべて対象範囲より古ければ次ページは見ない
+            if page_dates and max(page_dates) < oldest_target:
+                break
 
     log(f"[dvb] candidates total = {len(candidate_urls)} (unique)")
 
     # ---- 2) 候補記事ページで抽出（any_keyword_hit で絞り込み）
-    for url in candidate_urls:
-        try:
-            res = fetch_with_retry_dvb(url, retries=4, wait_seconds=2, session=sess)
+    def _fetch_pages():
+        for url in traced_iter("article", candidate_urls, attr="url"):
+            if seen_skip("DVB", url):
+                continue
+            try:
+                res = fetch_with_retry_dvb(url, retries=4, wait_seconds=2, session=sess)
+            except Exception as e:
+                log(f"[warn] article fail {url}: {e}")
+                continue
             if getattr(res, "status_code", 200) != 200:
                 log(f"[skip] non-200 article {res.status_code} {url}")
                 continue
-            soup = BeautifulSoup(
-                getattr(res, "content", None) or res.text, "html.parser"
-            )
+            yield url, res.content
 
-            title = _extract_title_dvb(soup)
-            body = _extract_body_dvb(soup)
+    # 取得しながら解析プールへ（タイトル・本文は NFC 済み、キーワード判定も向こうで）
+    for url, rec in parse_fetched(_fetch_pages(), "dvb"):
+        try:
+            if not rec:
+                continue
+            title, body = rec["title"], rec["body"]
             if not title or not body:
                 log(f"[skip] empty title/body {url}")
+                seen_record("DVB", url, "empty")
                 continue
 
-            title_nfc = unicodedata.normalize("NFC", title)
-            body_nfc = unicodedata.normalize("NFC", body)
-            if not any_keyword_hit(title_nfc, body_nfc):
-                log_no_keyword_hit("DVB", url, title_nfc, body_nfc, "dvb:article")
+            if not rec["keyword_hit"]:
+                log_no_keyword_hit("DVB", url, title, body, "dvb:article")
                 continue
 
             results.append(
-                {
-                    "url": url,
-                    "title": title_nfc,
-                    "date": date_obj.isoformat(),
-                    "body": body_nfc,
-                    "source": "dvb",
-                }
+                Article(
+                    "DVB",
+                    url,
+                    title,
+                    body,
+                    candidate_dates[url],
+                    nfc=True,
+                    keyword_hit=True,
+                )
             )
         except Exception as e:
             log(f"[warn] article fail {url}: {e}")
@@ -1768,12 +4493,13 @@ def deduplicate_by_url(articles):
     seen_urls = set()
     unique_articles = []
     for art in articles:
-        if art["url"] in seen_urls:
+        key = _norm_id(art["url"])
+        if key in seen_urls:
             print(
                 f"🛑 URL Duplicate Removed: {art['source']} | {art['title']} | {art['url']}"
             )
             continue
-        seen_urls.add(art["url"])
+        seen_urls.add(key)
         unique_articles.append(art)
     return unique_articles
 
@@ -1782,25 +4508,420 @@ def deduplicate_by_url(articles):
 translation_queue = []
 
 
+# ===== 翻訳対象キュー（ディスク上、SQLite） =====
+# 本文全体をメモリに抱えないためのキュー。投入時にモデル入力（本文を BODY_MAX_TOKENS に切った先頭）と
+# 全文（zlib 圧縮）を分けて保存し、読み出しはカーソルで少しずつ流す。
+# 何日分・何千件積んでもメモリに載るのは読み出し中の数件だけ。
+# URL は一意（同じ URL の2件目以降は捨てる。deduplicate_by_url と同じ結果）。
+QUEUE_PATH = os.getenv("DIGEST_QUEUE_PATH", "")  # 空なら一時ファイル（終了時に削除）
+QUEUE_READ_CHUNK = 64  # 読み出し1回あたりの行数
+
+
+class ArticleQueue:
+    """list と同じく append / extend / len / iter で使える（iter の本文はモデル入力のみ）"""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS queue (
+        seq INTEGER PRIMARY KEY,
+        url TEXT NOT NULL,
+        key TEXT,         -- 正規化 URL（_norm_id）。重複判定はこちら
+        source TEXT,
+        title TEXT,
+        date TEXT,
+        body TEXT,        -- モデル入力（Article.model_input）
+        full_z BLOB,      -- 全文（zlib）
+        full_len INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS queue_date ON queue(date);
+    """
+
+    def __init__(self, path=None):
+        self.temporary = not path
+        if self.temporary:
+            fd, path = tempfile.mkstemp(prefix="digest_queue_", suffix=".sqlite")
+            os.close(fd)
+        self.path = path
+        self.duplicates = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(self._SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        # key 列のない古いキューファイルは列を足して埋める（正規化で重なる行は先勝ち）
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(queue)")}
+        if "key" not in cols:
+            self._conn.execute("ALTER TABLE queue ADD COLUMN key TEXT")
+        rows = self._conn.execute(
+            "SELECT seq, url FROM queue WHERE key IS NULL ORDER BY seq"
+        ).fetchall()
+        if rows:
+            keys = {
+                k
+                for (k,) in self._conn.execute(
+                    "SELECT key FROM queue WHERE key IS NOT NULL"
+                )
+            }
+            for seq, url in rows:
+                key = _norm_id(url)
+                if key in keys:
+                    self._conn.execute("DELETE FROM queue WHERE seq = ?", (seq,))
+                    continue
+                keys.add(key)
+                self._conn.execute("UPDATE queue SET key = ? WHERE seq = ?", (key, seq))
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS queue_key ON queue(key)")
+        self._conn.commit()
+
+    def append(self, item: dict) -> None:
+        art = Article.of(item)
+        full = art.body
+        cur = self._conn.execute(
+            "INSERT OR IGNORE INTO queue"
+            " (url, key, source, title, date, body, full_z, full_len)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                item["url"],
+                _norm_id(item["url"]),
+                item.get("source"),
+                item.get("title"),
+                item.get("date"),
+                art.model_input(),
+                zlib.compress(full.encode("utf-8"), 6),
+                len(full),
+            ),
+        )
+        if cur.rowcount == 0:
+            self.duplicates += 1
+            print(
+                f"🛑 URL Duplicate Removed: {item.get('source')} | {item.get('title')} | {item['url']}"
+            )
+
+    def extend(self, items) -> None:
+        for item in items:
+            self.append(item)
+
+    def count(self, date=None) -> int:
+        if date is None:
+            return self._conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE date = ?", (date,)
+        ).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def iter_items(self, date=None):
+        """投入順に queued レコードを流す（date を渡すとその公開日だけ）"""
+        self._conn.commit()
+        sql = "SELECT source, url, title, body, date FROM queue"
+        args = ()
+        if date is not None:
+            sql, args = sql + " WHERE date = ?", (date,)
+        cur = self._conn.execute(sql + " ORDER BY seq", args)
+        while True:
+            rows = cur.fetchmany(QUEUE_READ_CHUNK)
+            if not rows:
+                return
+            for source, url, title, body, d in rows:
+                yield Article(source, url, title, body, d, nfc=True, model_input=True)
+
+    def __iter__(self):
+        return self.iter_items()
+
+    def select(self, date):
+        """公開日で絞った読み出し専用のビュー（len / iter）"""
+        return _QueueSlice(self, date)
+
+    def full_body(self, url) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT full_z FROM queue WHERE key = ?", (_norm_id(url),)
+        ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def describe(self) -> str:
+        n, full, stored, model = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(full_len), 0),"
+            " COALESCE(SUM(LENGTH(full_z)), 0), COALESCE(SUM(LENGTH(body)), 0)"
+            " FROM queue"
+        ).fetchone()
+        return (
+            f"{n} article(s), full text {full:,} chars → {stored / 1024:,.0f} KB zlib, "
+            f"model input {model:,} chars, {self.duplicates} duplicate(s) dropped"
+        )
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
+        if self.temporary:
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _QueueSlice:
+    def __init__(self, queue: ArticleQueue, date):
+        self.queue, self.date = queue, date
+
+    def __len__(self) -> int:
+        return self.queue.count(self.date)
+
+    def __iter__(self):
+        return self.queue.iter_items(self.date)
+
+
+# ===== 処理済み URL（当日分、SQLite ＋ Bloom フィルタ） =====
+# 同じ日に run をやり直しても、処理済みの記事は取りにいかない。MMT の対象日ごとに
+# URL と結果（queued / no_keyword / off_date / empty / excluded / error）を state の SQLite に残し、
+# コレクタは記事ページを取る前にここを引く。引く前にソースごとの Bloom フィルタを見て、
+# 「確実に未処理」はディスクを見ずに返す。queued だった記事は本文ごと残しておき、
+# 取り直さずにそのままキューへ戻す（要約はキャッシュに当たる）。error は次の実行で取り直す。
+SEEN_ENABLED = str(os.getenv("DIGEST_SEEN", "1")).lower() not in (
+    "0",
+    "false",
+    "no",
+)
+SEEN_DB = "seen_urls.sqlite"
+SEEN_BLOOM_CAPACITY = (
+    4096  # ソースごとの想定件数（超えても誤判定が増えるだけで結果は変わらない）
+)
+SEEN_BLOOM_ERROR = 0.01
+SEEN_RETRY_OUTCOMES = frozenset({"error"})
+SEEN_KEEP_DAYS = 2  # これより前の日の行は開いたときに捨てる（daemon と run が同じ state を使ってもよい）
+
+
+class BloomFilter:
+    """ビット配列＋二重ハッシュ。偽陽性はあるが偽陰性はない"""
+
+    def __init__(self, capacity: int, error_rate: float = SEEN_BLOOM_ERROR):
+        capacity = max(1, capacity)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        h = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(h[:8], "little")
+        h2 = int.from_bytes(h[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class SeenStore:
+    """対象日（MMT）1日分の処理済み URL。古い日の行は開いたときに捨てる（1行ごとに commit）"""
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS seen (
+        day TEXT NOT NULL,
+        url TEXT NOT NULL,
+        source TEXT,
+        outcome TEXT NOT NULL,
+        at REAL,
+        title TEXT,
+        date TEXT,
+        body_z BLOB,      -- queued のときだけ（本文、zlib）
+        PRIMARY KEY (day, url)
+    );
+    """
+
+    def __init__(self, day, path=None):
+        day = day if hasattr(day, "isoformat") else date.fromisoformat(str(day))
+        self.day = day.isoformat()
+        self.path = path or _state_path(SEEN_DB)
+        self.stats = Counter()
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.executescript(self._SCHEMA)
+        horizon = (day - timedelta(days=SEEN_KEEP_DAYS)).isoformat()
+        self._conn.execute("DELETE FROM seen WHERE day < ?", (horizon,))
+        self._conn.commit()
+        self._blooms = {}
+        rows = self._conn.execute(
+            "SELECT source, url FROM seen WHERE day = ?", (self.day,)
+        ).fetchall()
+        per_source = Counter(source for source, _ in rows)
+        for source, url in rows:
+            self._bloom(source, per_source[source]).add(_norm_id(url))
+
+    def _bloom(self, source, expected=0) -> BloomFilter:
+        source = canonical_source(source)
+        bloom = self._blooms.get(source)
+        if bloom is None:
+            bloom = BloomFilter(max(SEEN_BLOOM_CAPACITY, 2 * expected))
+            self._blooms[source] = bloom
+        return bloom
+
+    def outcome(self, source, url) -> Optional[str]:
+        key = _norm_id(url)
+        if key not in self._bloom(source):
+            self.stats["bloom_negative"] += 1
+            return None
+        row = self._conn.execute(
+            "SELECT outcome FROM seen WHERE day = ? AND url = ?", (self.day, key)
+        ).fetchone()
+        if row is None:
+            self.stats["bloom_false_positive"] += 1
+            return None
+        return row[0]
+
+    def skip(self, source, url) -> bool:
+        """処理済み（取り直す必要がない）なら True"""
+        outcome = self.outcome(source, url)
+        if outcome is None or outcome in SEEN_RETRY_OUTCOMES:
+            return False
+        self.stats[f"skip:{outcome}"] += 1
+        return True
+
+    def record(self, source, url, outcome: str, art=None) -> None:
+        key = _norm_id(url)
+        title = published = body_z = None
+        if art is not None:
+            title, published = art.get("title"), art.get("date")
+            body_z = zlib.compress((art.get("body") or "").encode("utf-8"), 6)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO seen"
+            " (day, url, source, outcome, at, title, date, body_z)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.day,
+                key,
+                canonical_source(source),
+                outcome,
+                time.time(),
+                title,
+                published,
+                body_z,
+            ),
+        )
+        self._conn.commit()
+        self._bloom(source).add(key)
+        self.stats[outcome] += 1
+
+    def queued(self, source) -> List["Article"]:
+        """前の実行でキューに積んだ記事（本文つき、NFC・キーワード判定済み）"""
+        rows = self._conn.execute(
+            "SELECT url, title, date, body_z FROM seen"
+            " WHERE day = ? AND source = ? AND outcome = 'queued' ORDER BY at",
+            (self.day, canonical_source(source)),
+        ).fetchall()
+        return [
+            Article(
+                source,
+                url,
+                title,
+                zlib.decompress(body_z).decode("utf-8") if body_z else "",
+                d,
+                nfc=True,
+                keyword_hit=True,
+            )
+            for url, title, d, body_z in rows
+        ]
+
+    def describe(self) -> str:
+        rows = self._conn.execute(
+            "SELECT outcome, COUNT(*) FROM seen WHERE day = ? GROUP BY outcome",
+            (self.day,),
+        ).fetchall()
+        known = ", ".join(f"{o} {n}" for o, n in sorted(rows)) or "none"
+        skipped = sum(n for k, n in self.stats.items() if k.startswith("skip:"))
+        return (
+            f"{self.day}: {known}; skipped {skipped} fetch(es) this run "
+            f"(bloom negatives {self.stats['bloom_negative']}, "
+            f"false positives {self.stats['bloom_false_positive']})"
+        )
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_SEEN = contextvars.ContextVar("digest_seen", default=None)
+
+
+def seen_store() -> Optional[SeenStore]:
+    return _SEEN.get()
+
+
+@contextlib.contextmanager
+def seen_urls_for(day, path=None):
+    """with seen_urls_for(date_mmt): の中では seen_skip / seen_record が効く（無効なら何もしない）"""
+    if not SEEN_ENABLED:
+        yield None
+        return
+    with SeenStore(day, path) as store:
+        token = _SEEN.set(store)
+        try:
+            yield store
+        finally:
+            _SEEN.reset(token)
+            print(f"👀 seen urls: {store.describe()}")
+
+
+def seen_skip(source, url) -> bool:
+    """記事ページを取る前に呼ぶ。今日すでに処理した URL なら True"""
+    store = _SEEN.get()
+    return store is not None and store.skip(source, url)
+
+
+def seen_record(source, url, outcome: str, art=None) -> None:
+    store = _SEEN.get()
+    if store is not None and url:
+        store.record(source, url, outcome, art)
+
+
+def _is_queue_db(path) -> bool:
+    return bool(path) and path.endswith((".sqlite", ".db"))
+
+
 def process_and_enqueue_articles(
     articles,
     source_name,
     seen_urls=None,
     bypass_keyword=False,
     trust_existing_body=False,
+    queue=None,
 ):
+    """queue 未指定ならグローバルの translation_queue に積む"""
     if seen_urls is None:
         seen_urls = set()
+    if queue is None:
+        queue = translation_queue
 
-    queued_items = []
-    for art in articles:
-        if art["url"] in seen_urls:
+    for art in traced_iter("enqueue", articles, attr="url", source=source_name):
+        key = _norm_id(art["url"])
+        if key in seen_urls:
+            continue
+        seen_urls.add(key)
+        if seen_skip(source_name, art["url"]):
             continue
-        seen_urls.add(art["url"])
 
         try:
+            art = Article.of(art, source_name)
             # ① まずは記事オブジェクトに本文が来ていたらそれを使う
-            body_text = (art.get("body") or "").strip() if trust_existing_body else ""
+            body_text = art.body.strip() if trust_existing_body else ""
 
             # ② 無ければフェッチ（内部で再フェッチ付きユーティリティを使用）
             if not body_text:
@@ -1825,38 +4946,31 @@ def process_and_enqueue_articles(
                         quiet=True,
                     )
 
-            # ③ 正規化
-            title_nfc = unicodedata.normalize("NFC", art["title"])
-            body_nfc = unicodedata.normalize("NFC", body_text)
+            # 取れなかった（遮断中・締め切り・通信エラー）なら error で残す（同じ日の再実行で取り直す）
+            if not body_text:
+                print(f"[enqueue] no body fetched, will retry: {art.url}")
+                seen_record(source_name, art.url, "error")
+                continue
 
-            # ④ キーワード判定（Irrawaddyなど必要に応じてバイパス）
-            if not bypass_keyword:
-                if not any_keyword_hit(title_nfc, body_nfc):
-                    log_no_keyword_hit(
-                        source_name,
-                        art["url"],
-                        title_nfc,
-                        body_nfc,
-                        "enqueue:after-fetch",
-                    )
-                    continue
+            # ③ 正規化（コレクタで済んでいれば何もしない）
+            art = art.with_body(body_text).normalized()
 
-            # ⑤ キュー投入
-            queued_items.append(
-                {
-                    "source": source_name,
-                    "url": art["url"],
-                    "title": art["title"],  # 翻訳前タイトル
-                    "body": body_text,  # 翻訳前本文
-                }
-            )
+            # ④ キーワード判定（Irrawaddyなど必要に応じてバイパス。判定済みなら再計算しない）
+            if not bypass_keyword and not art.keyword_hit:
+                log_no_keyword_hit(
+                    source_name, art.url, art.title, art.body, "enqueue:after-fetch"
+                )
+                continue
+
+            # ⑤ キュー投入（1件ずつ。ディスク上のキューならここで全文は手放す）
+            queue.append(art)
+            seen_record(source_name, art.url, "queued", art)
 
         except Exception as e:
             print(f"Error processing {art['url']}: {e}")
+            seen_record(source_name, art["url"], "error")
             continue
 
-    translation_queue.extend(queued_items)
-
 
 # MEMO: ログ用、デバック用関数
 # def process_translation_batches(batch_size=10, wait_seconds=60):
@@ -2025,16 +5139,21 @@ def dedupe_articles_with_llm(
     logger=None,
     ultra_max_chars=300,
     summary_fallback_chars=600,
+    pinned=(),
 ):
     """
     summarized_results (list[dict]) を受け取り、重複クラスターごとに1本だけ残した配列を返す。
     Irrawaddy（source == "Irrawaddy" または URL に "irrawaddy.com" を含む）は
     LLM での重複判定をスキップして常に keep する。
+    pinned（URL）はすでに配信済みの記事：LLM の選択に関係なく残し、それと同じクラスターに
+    入った他の記事は落とす（配信済みの記事がクラスターの代表になる）。
     依存: call_gemini_with_retries, _safe_json_loads_maybe_extract, _strip_tags, log_dedupe_report
     """
 
-    if not summarized_results:
+    # 比べる相手がいなければ LLM は呼ばない
+    if len(summarized_results) < 2:
         return summarized_results
+    pinned = {_norm_id(u) for u in pinned}
 
     # 出力関数
     if debug:
@@ -2134,9 +5253,20 @@ def dedupe_articles_with_llm(
         "・kept/removed/clusters の id は必ず入力 articles の id に含まれていること。\n"
         "・clusters[].member_ids は入力 id を重複なくすべて含むこと。クラスター数と kept件数は同数。\n"
         "・removed[].duplicate_of は同一クラスター内の kept id を指すこと。\n"
-        "・why は16〜24字程度、event_key は25字以内に収めること。\n\n"
-        "入力:\n"
-        f'{{\\n  "articles": {json.dumps(articles_for_llm, ensure_ascii=False)}\\n}}\\n\\n'
+        "・why は16〜24字程度、event_key は25字以内に収めること。\n"
+        + (
+            "・pinned の id は配信済みの記事。それを含むクラスターでは必ずそれを kept にすること。\n"
+            if pinned
+            else ""
+        )
+        + "\n入力:\n"
+        f'{{\\n  "articles": {json.dumps(articles_for_llm, ensure_ascii=False)}'
+        + (
+            f',\\n  "pinned": {json.dumps(sorted(pinned & set(id_map_llm)), ensure_ascii=False)}'
+            if pinned
+            else ""
+        )
+        + "\\n}\\n\\n"
         "出力フォーマット（JSONのみ）:\n"
         "{\n"
         '  "kept": [ {"id":"<残す記事ID>", "cluster_id":"<ID>", "why":"16-24字"} ],\n'
@@ -2179,6 +5309,26 @@ def dedupe_articles_with_llm(
                 header="🧩 DEDUPE REPORT (non-Irrawaddy only)",
             )
 
+        if pinned:
+            # 配信済みと同じクラスターに入った記事は、LLM がどちらを残したかに関係なく落とす
+            shadowed = set()
+            for c in data.get("clusters") or []:
+                members = set(c.get("member_ids") or [])
+                if members & pinned:
+                    shadowed |= members - pinned
+            shadowed |= {
+                r.get("id")
+                for r in data.get("removed") or []
+                if r.get("duplicate_of") in pinned
+            }
+            removed = {r.get("id") for r in data.get("removed") or []} - pinned
+            keep = (set(id_map_llm) - shadowed - removed) | pinned | irrawaddy_ids
+            return [
+                obj
+                for obj, _id in zip(summarized_results, all_ids_in_order)
+                if _id in keep
+            ]
+
         # kept が出たときのみフィルタ適用し、Irrawaddy を合流
         if kept_ids_others:
             kept_union = set(kept_ids_others) | irrawaddy_ids
@@ -2266,7 +5416,8 @@ STEP3_TASK = (
 SKIP_NOTE_IRRAWADDY = "【重要】本記事は Irrawaddy の記事です。Step 1 と Step 2 は実施せず、直ちに Step 3 のみを実施してください。\n\n"
 
 
-def build_prompt(item: dict, *, skip_filters: bool, body_max: int) -> str:
+def build_prompt(item: dict, *, skip_filters: bool, body_max=None) -> str:
+    """body_max（字数）を省くと item["body"] をそのまま入れる（切り詰めは呼び出し側）"""
     header = "次の手順で記事を判定・処理してください。\n\n"
     pre = SKIP_NOTE_IRRAWADDY if skip_filters else STEP12_FILTERS + "\n\n"
     input_block = (
@@ -2274,7 +5425,7 @@ def build_prompt(item: dict, *, skip_filters: bool, body_max: int) -> str:
         "###\n[記事タイトル]\n###\n"
         f"{item['title']}\n\n"
         "[記事本文]\n###\n"
-        f"{item['body'][:body_max]}\n"
+        f"{item['body'] if body_max is None else item['body'][:body_max]}\n"
         "###\n"
     )
     return header + pre + STEP3_TASK + "\n" + input_block
@@ -2337,133 +5488,251 @@ def _cut_ultra_block(lines):
     return "", lines
 
 
-# 本処理関数
-def process_translation_batches(batch_size=3, wait_seconds=60):
-    # MEMO: TEST用、Geminiを呼ばず、URLリストだけ返す
-    # summarized_results = []
-    # for item in translation_queue:
-    #     summarized_results.append({
-    #         "source": item["source"],
-    #         "url": item["url"],
-    #         "title": item['title'],
-    #         "summary": item['body'][:BODY_MAX_CHARS]
-    #     })
+# ===== 要約キャッシュ（URL＋内容ハッシュ → 要約結果）=====
+# 同日再実行や backfill で同じ記事を Gemini に送り直さない。
+# プロンプト・モデル・モデルに渡す本文（Article.fingerprint）が変わったらキーが変わるので、
+# 古い要約や書き換えられる前の記事の要約は使われない。
+SUMMARY_CACHE_ENABLED = str(os.getenv("SUMMARY_CACHE", "1")).lower() not in (
+    "0",
+    "false",
+    "off",
+)
+SUMMARY_CACHE_STATE = "summary_cache.json"
+SUMMARY_CACHE_KEEP_DAYS = 14
+SUMMARY_MODEL = "gemini-2.5-flash"
 
-    summarized_results = []
-    for i in range(0, len(translation_queue), batch_size):
-        batch = translation_queue[i : i + batch_size]
-        print(f"⚙️ Processing batch {i // batch_size + 1}...")
+_summary_cache = None
 
-        for item in batch:
-            try:
-                # デバッグ: 入力データを確認
-                print("----- DEBUG: Prompt Input -----")
-                print(f"TITLE: {item['title']}")
-                print(f"BODY[:{BODY_MAX_CHARS}]: {item['body'][:BODY_MAX_CHARS]}")
-
-                # プロンプト実行、Irrawaddy は Step1/2 をスキップ
-                is_irrawaddy = (item.get("source") == "Irrawaddy") or (
-                    "irrawaddy.com" in (item.get("url") or "")
-                )
-                prompt = build_prompt(
-                    item, skip_filters=is_irrawaddy, body_max=BODY_MAX_CHARS
-                )
 
-                resp = call_gemini_with_retries(
-                    client_summary, prompt, model="gemini-2.5-flash"
-                )
-                output_text = resp.text.strip()
+def _summary_cache_key(item: dict) -> str:
+    ver = hashlib.sha1(
+        (STEP12_FILTERS + SKIP_NOTE_IRRAWADDY + STEP3_TASK + SUMMARY_MODEL).encode(
+            "utf-8"
+        )
+    ).hexdigest()[:12]
+    return f"{ver}|{_norm_id(item.get('url') or '')}|{Article.of(item).fingerprint}"
 
-                print("----- DEBUG: Model Output -----")
-                print(output_text)
 
-                # --- exit を広めに判定（バッククォートや句読点混入対策）---
-                EXIT_ONLY_RE = re.compile(
-                    r"^\s*(?:`{0,3})?\s*exit\s*(?:`{0,3})?\.?\s*$", re.IGNORECASE
-                )
-                if EXIT_ONLY_RE.match(output_text):
-                    continue
+def _summary_cache_get(item: dict):
+    """キャッシュ済みなら {"result": dict or None(exit)}、未キャッシュなら None"""
+    global _summary_cache
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+    if _summary_cache is None:
+        _summary_cache = load_json_state(SUMMARY_CACHE_STATE, {})
+    return _summary_cache.get(_summary_cache_key(item))
 
-                # --- 行整形（NFC + 空行除去）---
-                lines = [
-                    unicodedata.normalize("NFC", ln).strip()
-                    for ln in output_text.splitlines()
-                    if ln.strip()
-                ]
-
-                # --- 超要約を先に抜く（本文からも消す）---
-                ultra_text, lines = _cut_ultra_block(lines)
-
-                # --- タイトル抽出（要件に合わせて厳格化）---
-                # ルール:
-                #  A) 「【タイトル】訳題」= 同一行
-                #  B) 1行目が「【タイトル】」のみ → 次の行を訳題として採用
-                #  C) 上記以外のラベル揺れ（タイトル:, Title: など）は無視（救済しない）
-                title_text = ""
-                title_idx = next(
-                    (
-                        i
-                        for i, ln in enumerate(lines)
-                        if re.match(r"^【\s*タイトル\s*】", ln)
-                    ),
-                    None,
-                )
-                if title_idx is not None:
-                    # マーカー行を解析
-                    m = re.match(r"^【\s*タイトル\s*】\s*(.*)$", lines[title_idx])
-                    inline = (m.group(1) or "").strip()
-                    # マーカー行は消す
-                    lines.pop(title_idx)
-
-                    if inline:
-                        # A) 同一行（【タイトル】◯◯）
-                        # 先頭にコロンが紛れる事故だけ軽く除去（ラベル救済ではない）
-                        title_text = inline.lstrip(":：").strip()
-                    else:
-                        # B) 次の行をタイトルとして採用（存在すれば）
-                        if title_idx < len(lines):
-                            title_text = lines[title_idx].strip()
-                            lines.pop(title_idx)
-
-                # 最終フォールバック（空を許さない）
-                translated_title = (
-                    title_text or item.get("title") or "（翻訳失敗）"
-                ).strip()
-
-                # --- 要約ラベルを先頭に強制 ---
-                if not lines or not re.match(r"^【\s*要約\s*】\s*$", lines[0]):
-                    lines.insert(0, "【要約】")
-
-                summary_text = "\n".join(lines).strip()
-                summary_html = summary_text.replace("\n", "<br>")
-
-                norm_url = _norm_id(item.get("url") or "")
-
-                summarized_results.append(
-                    {
-                        "source": item["source"],
-                        "url": norm_url,  # ★ 正規化済み
-                        "title": translated_title,
-                        "summary": summary_html,
-                        "ultra": ultra_text,
-                    }
-                )
 
+def _summary_cache_put(item: dict, result) -> None:
+    if not SUMMARY_CACHE_ENABLED or _summary_cache is None:
+        return
+    _summary_cache[_summary_cache_key(item)] = {
+        "result": result,
+        "ts": get_today_date_mmt().isoformat(),
+    }
+
+
+def _summary_cache_save() -> None:
+    global _summary_cache
+    if not SUMMARY_CACHE_ENABLED or _summary_cache is None:
+        return
+    horizon = (
+        get_today_date_mmt() - timedelta(days=SUMMARY_CACHE_KEEP_DAYS)
+    ).isoformat()
+    _summary_cache = {
+        k: v for k, v in _summary_cache.items() if (v.get("ts") or "") >= horizon
+    }
+    save_json_state(SUMMARY_CACHE_STATE, _summary_cache)
+
+
+def summarize_item(item: dict, *, client=None):
+    """
+    1記事を Gemini で翻訳・要約する。
+    返り値: {"source","url","title","summary","ultra"}、Step 2 で除外（exit）なら None
+    """
+    # デバッグ: 入力データを確認
+    print("----- DEBUG: Prompt Input -----")
+    print(f"TITLE: {item['title']}")
+    art = Article.of(item)
+    body = art.model_input()
+    print(f"BODY[~{art.tokens} tokens]: {body}")
+
+    # プロンプト実行、Irrawaddy は Step1/2 をスキップ
+    is_irrawaddy = (item.get("source") == "Irrawaddy") or (
+        "irrawaddy.com" in (item.get("url") or "")
+    )
+    prompt = build_prompt({**item, "body": body}, skip_filters=is_irrawaddy)
+
+    resp = call_gemini_with_retries(
+        client or get_summary_client(), prompt, model=SUMMARY_MODEL
+    )
+    output_text = resp.text.strip()
+
+    print("----- DEBUG: Model Output -----")
+    print(output_text)
+
+    # --- exit を広めに判定（バッククォートや句読点混入対策）---
+    EXIT_ONLY_RE = re.compile(
+        r"^\s*(?:`{0,3})?\s*exit\s*(?:`{0,3})?\.?\s*$", re.IGNORECASE
+    )
+    if EXIT_ONLY_RE.match(output_text):
+        return None
+
+    # --- 行整形（NFC + 空行除去）---
+    lines = [
+        unicodedata.normalize("NFC", ln).strip()
+        for ln in output_text.splitlines()
+        if ln.strip()
+    ]
+
+    # --- 超要約を先に抜く（本文からも消す）---
+    ultra_text, lines = _cut_ultra_block(lines)
+
+    # --- タイトル抽出（要件に合わせて厳格化）---
+    # ルール:
+    #  A) 「【タイトル】訳題」= 同一行
+    #  B) 1行目が「【タイトル】」のみ → 次の行を訳題として採用
+    #  C) 上記以外のラベル揺れ（タイトル:, Title: など）は無視（救済しない）
+    title_text = ""
+    title_idx = next(
+        (i for i, ln in enumerate(lines) if re.match(r"^【\s*タイトル\s*】", ln)),
+        None,
+    )
+    if title_idx is not None:
+        # マーカー行を解析
+        m = re.match(r"^【\s*タイトル\s*】\s*(.*)$", lines[title_idx])
+        inline = (m.group(1) or "").strip()
+        # マーカー行は消す
+        lines.pop(title_idx)
+
+        if inline:
+            # A) 同一行（【タイトル】◯◯）
+            # 先頭にコロンが紛れる事故だけ軽く除去（ラベル救済ではない）
+            title_text = inline.lstrip(":：").strip()
+        else:
+            # B) 次の行をタイトルとして採用（存在すれば）
+            if title_idx < len(lines):
+                title_text = lines[title_idx].strip()
+                lines.pop(title_idx)
+
+    # 最終フォールバック（空を許さない）
+    translated_title = (title_text or item.get("title") or "（翻訳失敗）").strip()
+
+    # --- 要約ラベルを先頭に強制 ---
+    if not lines or not re.match(r"^【\s*要約\s*】\s*$", lines[0]):
+        lines.insert(0, "【要約】")
+
+    summary_text = "\n".join(lines).strip()
+    summary_html = summary_text.replace("\n", "<br>")
+
+    norm_url = _norm_id(item.get("url") or "")
+
+    return {
+        "source": item["source"],
+        "url": norm_url,  # ★ 正規化済み
+        "title": translated_title,
+        "summary": summary_html,
+        "ultra": ultra_text,
+    }
+
+
+def iter_summaries(items, batch_size=3, wait_seconds=60, *, client=None):
+    """
+    items（リストでもストリームでも可）を batch_size 件ずつ要約し、結果を1件ずつ yield する。
+    Step 2 で除外（exit）された記事・失敗した記事は yield しない。
+    """
+
+    def _run_batch(batch, batch_no):
+        print(f"⚙️ Processing batch {batch_no}...")
+        called = 0
+        results = []
+        for item in traced_iter("summary", batch, attr="url"):
+            # キャッシュ済みなら Gemini を呼ばない
+            cached = _summary_cache_get(item)
+            if cached is not None:
+                print(f"♻️ summary cache hit: {item.get('url')}")
+                if cached.get("result"):
+                    results.append(cached["result"])
+                continue
+
+            try:
+                called += 1
+                result = summarize_item(item, client=client)
             except Exception as e:
                 print(
                     "🛑 Error during translation:", e.__class__.__name__, "|", repr(e)
                 )
                 continue
 
+            _summary_cache_put(item, result)
+            if result:
+                results.append(result)
+
             # バッチ内で微スリープしてバーストを抑える
-            time.sleep(0.6)
+            traced_sleep(0.6, "pacing")
+
+        _summary_cache_save()
+        return called, results
 
-        if i + batch_size < len(translation_queue):
+    batch, batch_no, wait_needed = [], 0, False
+    for item in items:
+        batch.append(item)
+        if len(batch) < batch_size:
+            continue
+        # 前のバッチで Gemini を呼んでいたら待つ（全件キャッシュなら待たない）
+        if wait_needed:
+            print(f"🕒 Waiting {wait_seconds} seconds before next batch...")
+            traced_sleep(wait_seconds, "batch_wait")
+        batch_no += 1
+        with TRACER.span("batch", batch=batch_no, size=len(batch)):
+            called, results = _run_batch(batch, batch_no)
+        wait_needed = called > 0
+        batch = []
+        yield from results
+
+    if batch:
+        if wait_needed:
             print(f"🕒 Waiting {wait_seconds} seconds before next batch...")
-            time.sleep(wait_seconds)
+            traced_sleep(wait_seconds, "batch_wait")
+        with TRACER.span("batch", batch=batch_no + 1, size=len(batch)):
+            _, results = _run_batch(batch, batch_no + 1)
+        yield from results
+
+
+# 本処理関数
+def process_translation_batches(batch_size=3, wait_seconds=60, queue=None):
+    """queue 未指定ならグローバルの translation_queue を処理する"""
+    # MEMO: TEST用、Geminiを呼ばず、URLリストだけ返す
+    # summarized_results = []
+    # for item in translation_queue:
+    #     summarized_results.append({
+    #         "source": item["source"],
+    #         "url": item["url"],
+    #         "title": item['title'],
+    #         "summary": item['body'][:BODY_MAX_CHARS]
+    #     })
+    if queue is None:
+        queue = translation_queue
+
+    with TRACER.span("summarize", items=len(queue)), time_budget(
+        "summarize", reserve=FINISH_RESERVE_SEC
+    ):
+        summarized_results = list(iter_summaries(queue, batch_size, wait_seconds))
 
     # 重複判定→片方残し（最終アウトプットの形式は変えない）
-    deduped = dedupe_articles_with_llm(client_dedupe, summarized_results, debug=True)
+    return dedupe_and_normalize(summarized_results)
+
+
+@traced("dedupe")
+def dedupe_and_normalize(summarized_results, *, client=None, pinned=()):
+    if current_budget().expired():
+        # 締め切りを過ぎたら LLM 判定は諦め、URL 重複排除済みのまま出す
+        record_cut("dedupe", [{"source": "重複判定"}] * len(summarized_results))
+        deduped = summarized_results
+    else:
+        deduped = dedupe_articles_with_llm(
+            client or get_dedupe_client(), summarized_results, debug=True, pinned=pinned
+        )
 
     # 念のため：返却フォーマットを固定（余計なキーが混ざっていたら落とす）
     normalized = [
@@ -2478,30 +5747,13 @@ def process_translation_batches(batch_size=3, wait_seconds=60):
     return normalized
 
 
-def send_email_digest(summaries):
-    def _build_gmail_service():
-        cid = os.getenv("GMAIL_CLIENT_ID")
-        csec = os.getenv("GMAIL_CLIENT_SECRET")
-        rtok = os.getenv("GMAIL_REFRESH_TOKEN")
-        if not (cid and csec and rtok):
-            raise RuntimeError(
-                "Gmail API credentials (CLIENT_ID/SECRET/REFRESH_TOKEN) are missing."
-            )
-
-        # リフレッシュトークンがある場合、scopes を渡さない
-        creds = Credentials(
-            token=None,
-            refresh_token=rtok,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=cid,
-            client_secret=csec,
-        )
-        return build("gmail", "v1", credentials=creds, cache_discovery=False)
-
-    sender_email = os.getenv("EMAIL_SENDER")
-    recipient_emails = os.getenv("EMAIL_RECIPIENTS", "").split(",")
-
-    digest_date = get_today_date_mmt()
+def render_digest_html(summaries, digest_date=None, cuts=None):
+    """
+    要約リストからメール件名と本文HTMLを組み立てる（送信はしない）
+    cuts: 時間切れで落とした分（RUN_CUTS）。あれば冒頭に注記する。
+    """
+    if digest_date is None:
+        digest_date = get_today_date_mmt()
     date_str = digest_date.strftime("%Y年%-m月%-d日") + "分"
 
     # メディアごとにまとめる
@@ -2529,6 +5781,16 @@ def send_email_digest(summaries):
     <body style="font-family: Arial, sans-serif; background-color: #ffffff; color: #333333;">
     """
 
+    # 時間切れで省いたものがあれば最初に断っておく
+    cut_lines = cut_summary_lines(cuts) if cuts else []
+    if cut_lines:
+        html_content += (
+            "<div style='margin-bottom:20px;font-size:0.83rem;color:#888888'>"
+            "⏱ 実行時間の上限に達したため、一部を省略しました。<br>"
+            + "<br>".join(_html.escape(x) for x in cut_lines)
+            + "</div>"
+        )
+
     # 先頭にヘッドライン挿入
     html_content += headline_html
 
@@ -2561,6 +5823,40 @@ def send_email_digest(summaries):
     html_content += "</body></html>"
     html_content = clean_html_content(html_content)
 
+    return subject, html_content
+
+
+@traced("email")
+def send_email_digest(summaries, digest_date=None, cuts=None):
+    from googleapiclient.errors import HttpError
+
+    def _build_gmail_service():
+        from google.oauth2.credentials import Credentials
+        from googleapiclient.discovery import build
+
+        cid = os.getenv("GMAIL_CLIENT_ID")
+        csec = os.getenv("GMAIL_CLIENT_SECRET")
+        rtok = os.getenv("GMAIL_REFRESH_TOKEN")
+        if not (cid and csec and rtok):
+            raise RuntimeError(
+                "Gmail API credentials (CLIENT_ID/SECRET/REFRESH_TOKEN) are missing."
+            )
+
+        # リフレッシュトークンがある場合、scopes を渡さない
+        creds = Credentials(
+            token=None,
+            refresh_token=rtok,
+            token_uri="https://oauth2.googleapis.com/token",
+            client_id=cid,
+            client_secret=csec,
+        )
+        return build("gmail", "v1", credentials=creds, cache_discovery=False)
+
+    sender_email = os.getenv("EMAIL_SENDER")
+    recipient_emails = os.getenv("EMAIL_RECIPIENTS", "").split(",")
+
+    subject, html_content = render_digest_html(summaries, digest_date, cuts=cuts)
+
     from_display_name = "Myanmar News Digest"
 
     subject = re.sub(r"[\r\n]+", " ", subject).strip()
@@ -2582,60 +5878,1024 @@ def send_email_digest(summaries):
         sys.exit(1)
 
 
-if __name__ == "__main__":
-    date_mmt = get_today_date_mmt()
-    seen_urls = set()
+MIZZIMA_CATEGORY_PATH = "/category/%e1%80%9e%e1%80%90%e1%80%84%e1%80%ba%e1%80%b8/%e1%80%99%e1%80%bc%e1%80%94%e1%80%ba%e1%80%99%e1%80%ac%e1%80%9e%e1%80%90%e1%80%84%e1%80%ba%e1%80%b8"
+
 
+# ソース定義（巡回関数と、キュー投入時のオプション）。CLI の --source もこのキーを使う
+SOURCE_SPECS = [
+    {
+        "key": "mizzima",
+        "name": "Mizzima (Burmese)",
+        "collect": lambda target, depth_days: get_mizzima_articles_from_category(
+            target,
+            SOURCE_BASE_URLS["mizzima"],
+            "Mizzima (Burmese)",
+            MIZZIMA_CATEGORY_PATH,
+            max_pages=3 * depth_days,
+        ),
+        "enqueue": {"trust_existing_body": True},
+    },
+    {
+        "key": "bbc",
+        "name": "BBC Burmese",
+        "collect": lambda target, depth_days: get_bbc_burmese_articles_for(target),
+        "enqueue": {"trust_existing_body": True},
+    },
+    {
+        "key": "irrawaddy",
+        "name": "Irrawaddy",
+        "collect": lambda target, depth_days: get_irrawaddy_articles_for(
+            target, max_pages=depth_days
+        ),
+        "enqueue": {
+            "bypass_keyword": True,  # ← Irrawaddyはキーワードで落とさない
+            "trust_existing_body": True,  # ← 巡回時の body をそのまま使う（再フェッチしない）
+        },
+    },
+    {
+        "key": "khit_thit",
+        "name": "Khit Thit Media",
+        "collect": lambda target,
+        depth_days: get_khit_thit_media_articles_from_category(
+            target, max_pages=3 * depth_days
+        ),
+        "enqueue": {},
+    },
+    {
+        "key": "dvb",
+        "name": "DVB",
+        "collect": lambda target, depth_days: get_dvb_articles_for(
+            target, debug=True, max_pages=2 * depth_days
+        ),
+        "enqueue": {"trust_existing_body": True},
+    },
+]
+SOURCE_SPECS_BY_KEY = {spec["key"]: spec for spec in SOURCE_SPECS}
+SOURCE_SPECS_BY_NAME = {spec["name"]: spec for spec in SOURCE_SPECS}
+
+
+def _selected_specs(keys=None):
+    if not keys:
+        return SOURCE_SPECS
+    return [SOURCE_SPECS_BY_KEY[k] for k in keys]
+
+
+def collect_and_enqueue_all(target, seen_urls, queue=None, depth_days=1, sources=None):
+    """
+    全ソースを1回ずつ巡回してキューに積む（通常実行と backfill で共用）。
+    target: date または date の集合、depth_days: 一覧を何日分さかのぼるかの目安
+    """
     # articles = get_frontier_articles_for(date_mmt)
     # for art in articles:
     #     print(f"{art['date']} - {art['title']}\n{art['url']}\n")
+    # 収集全体の予算を、まだ回っていないソースで等分する（早く終わったソースの余りは後ろへ回る）
+    specs = _selected_specs(sources)
+    with time_budget("collect", share=COLLECT_SHARE):
+        for i, spec in enumerate(specs):
+            print(f"=== {spec['name']} ===")
+            share = 1.0 / (len(specs) - i)
+            with TRACER.span("source", source=spec["key"]), time_budget(
+                spec["name"], share=share
+            ):
+                # 同じ日の前の実行でキューに積んだ記事は取り直さずに戻す
+                store = seen_store()
+                if store is not None and queue is not None:
+                    restored = store.queued(spec["name"])
+                    for art in restored:
+                        seen_urls.add(_norm_id(art.url))
+                        queue.append(art)
+                    if restored:
+                        print(f"👀 restored {len(restored)} queued article(s)")
+                with time_budget(spec["name"], share=SOURCE_COLLECT_SHARE):
+                    articles = spec["collect"](target, depth_days)
+                process_and_enqueue_articles(
+                    articles, spec["name"], seen_urls, queue=queue, **spec["enqueue"]
+                )
+
+
+def run_backfill(
+    start: date, end: date, *, send=False, out_dir="backfill", queue_path=QUEUE_PATH
+):
+    """
+    期間 [start, end]（MMT日付）の digest をまとめて作り直す。
+    一覧は全期間ぶん1回だけ巡回してディスク上のキューに積み、公開日ごとに読み出して要約する。
+    要約はキャッシュを通すので、再実行や期間の重なりで Gemini を呼び直さない。
+    send=False なら out_dir/digest_YYYY-MM-DD.html に書き出す。
+    """
+    if end < start:
+        start, end = end, start
+    days = (end - start).days + 1
+    dates = frozenset(start + timedelta(days=i) for i in range(days))
+    print(f"=== BACKFILL {start} .. {end} ({days} days) ===")
+
+    with ArticleQueue(queue_path) as queue:
+        collect_and_enqueue_all(dates, set(), queue=queue, depth_days=days)
+        print(f"=== BACKFILL queue: {queue.describe()} ===")
+        print_token_report()
+        boilerplate_save()
+        canonical_save()
+        for d in sorted(dates):
+            items = queue.select(d.isoformat())
+            n = len(items)
+            print(f"=== BACKFILL {d}: {n} article(s) ===")
+            summaries = (
+                process_translation_batches(batch_size=3, wait_seconds=60, queue=items)
+                if n
+                else []
+            )
+            if send:
+                send_email_digest(summaries, digest_date=d)
+                continue
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"digest_{d.isoformat()}.html")
+            subject, html_content = render_digest_html(summaries, digest_date=d)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(html_content)
+            print(f"📝 {subject} → {path}")
+
+
+# ===== 常駐モード（ソースごとに安い入口を、公開ペースに合わせた間隔で見張る） =====
+# 1日1回の run とは別に、各ソースのいちばん安い入口（BBC RSS、DVB の /category/8/news、
+# Irrawaddy ホームの kuDRpuo カラム、Mizzima / Khit Thit の一覧1ページ目）だけを見て、
+# 新しく出た記事だけを取得 → 要約 → 重複判定し、summary レコードとして流す（render / send にそのまま渡せる）。
+# 間隔はソースごと・MMT の時刻（時）ごとに推定した公開ペース（件/時）から、次の新着が
+# DAEMON_TARGET_NEW 件ほど溜まるころにする。セッション・要約キャッシュ・解析プール・処理済み URL は開いたまま。
+# 積んだ記事は処理済み URL に queued として残るので、同じ日の run はそれを取り直さずに digest に入れる。
+DAEMON_MIN_INTERVAL_SEC = float(os.getenv("DIGEST_POLL_MIN_SEC", "120"))
+DAEMON_MAX_INTERVAL_SEC = float(os.getenv("DIGEST_POLL_MAX_SEC", "1800"))
+DAEMON_TARGET_NEW = 1.0  # 1回の見張りで見つかる新着の目安
+DAEMON_PRIOR_RATE = 1.0  # まだ観測のない時間帯の公開ペース（件/時）
+DAEMON_RATE_TAU_H = 2.0  # 推定がこの観測時間でほぼ入れ替わる（指数移動平均の時定数）
+DAEMON_MAX_BACKOFF_EXP = 5  # 入口の取得失敗が続いたときの延長（2 のべき乗）の上限
+POLL_RATES_STATE = "poll_rates.json"
+DAEMON_ALERTS_STATE = "daemon_alerts.json"
+# 重複判定に添える配信済みの記事：新着と似ているもの（文字 bigram の TF-IDF コサイン）だけ、上限件数まで。
+# その日に流した全件を毎回 LLM に送ると、1日の後半ほど判定のコストが膨らむ
+DAEMON_DEDUPE_CONTEXT = 20
+DAEMON_DEDUPE_MIN_SIM = 0.15
+
+
+def _discover_mizzima(poller, target):
+    url = f"{SOURCE_BASE_URLS['mizzima']}{MIZZIMA_CATEGORY_PATH}"
+    res = fetch_url(url, session=poller.session, timeout=10)
+    return [(u, {}) for u in mizzima_listing_links(res.content)]
+
+
+def _discover_khit_thit(poller, target):
+    url = f"{SOURCE_BASE_URLS['khit_thit']}/category/{KHIT_THIT_CATEGORY_SLUGS[0]}/"
+    res = fetch_url(url, session=poller.session, timeout=10)
+    return [(u, {}) for u in khit_thit_listing_links(res.content)]
+
+
+def _discover_irrawaddy(poller, target):
+    url = f"{SOURCE_BASE_URLS['irrawaddy']}/"
+    res = fetch_with_retry_irrawaddy(url, session=poller.session)
+    return [(u, {}) for u in irrawaddy_home_links(res.content, target)]
+
+
+def _discover_dvb(poller, target):
+    base = SOURCE_BASE_URLS["dvb"]
+    res = fetch_with_retry_dvb(f"{base}/category/8/news", session=poller.session)
+    cards, _ = dvb_listing(res.content, base)
+    return [(u, {"date": d}) for u, d in cards if d and date_matches(d, target)]
+
+
+def _discover_bbc(poller, target):
+    """RSS を条件付き GET（変化がなければ 304 で何も返さない）"""
+    res = _traced_http(
+        "requests",
+        poller.session.get,
+        BBC_RSS_URL,
+        timeout=10,
+        headers=poller.memo,
+        stream=True,
+    )
+    if res.status_code == 304:
+        res.close()
+        return []
+    res.raise_for_status()
+    found = []
+    try:
+        res.raw.decode_content = True
+        for item in _iter_rss_items(res.raw):
+            if not item["link"] or not item["pubDate"]:
+                continue
+            try:
+                d = _rss_date_mmt(item["pubDate"])
+            except Exception:
+                continue
+            if date_matches(d, target):
+                found.append((item["link"], {"title": item["title"], "date": d}))
+    finally:
+        res.close()
+    poller.memo = {
+        k: v
+        for k, v in (
+            ("If-None-Match", res.headers.get("ETag")),
+            ("If-Modified-Since", res.headers.get("Last-Modified")),
+        )
+        if v
+    }
+    return found
+
+
+def _fetch_page_plain(url, session, source=None):
+    return fetch_url(
+        url, session=session, timeout=10, stop_after=source and stream_stop(source)
+    )
+
+
+# ソースごとの入口（見張る先）と記事ページの取り方
+DAEMON_SOURCES = {
+    "mizzima": {
+        "discover": _discover_mizzima,
+        "fetch": functools.partial(_fetch_page_plain, source="mizzima"),
+    },
+    "bbc": {"discover": _discover_bbc, "fetch": _fetch_page_plain},
+    "irrawaddy": {
+        "discover": _discover_irrawaddy,
+        "fetch": lambda url, session: fetch_with_retry_irrawaddy(url, session=session),
+    },
+    "khit_thit": {
+        "discover": _discover_khit_thit,
+        "fetch": functools.partial(_fetch_page_plain, source="khit_thit"),
+    },
+    "dvb": {
+        "discover": _discover_dvb,
+        "fetch": lambda url, session: fetch_with_retry_dvb(url, session=session),
+    },
+}
+
+
+class SourcePoller:
+    """1ソースの見張り：セッション、前回入口に出ていた URL、時刻別の公開ペース、次に見る時刻"""
+
+    def __init__(self, spec, rates):
+        self.spec = spec
+        self.key, self.name = spec["key"], spec["name"]
+        self.discover = DAEMON_SOURCES[self.key]["discover"]
+        self.fetch = DAEMON_SOURCES[self.key]["fetch"]
+        self.session = requests.Session()
+        self.memo = {}  # 条件付き GET のヘッダ（ETag など）
+        self.known = set()  # 前回の入口に出ていた URL
+        self.rates = rates.setdefault(self.key, {"rate": [None] * 24})["rate"]
+        self.last_poll = None
+        self.failures = 0
+        self.polls = 0
+        self.next_at = 0.0
+
+    @staticmethod
+    def hour(t: float) -> int:
+        return datetime.fromtimestamp(t, MMT).hour
+
+    def rate(self, hour: int) -> float:
+        r = self.rates[hour]
+        if r is None:
+            seen = [x for x in self.rates if x is not None]
+            r = sum(seen) / len(seen) if seen else DAEMON_PRIOR_RATE
+        return r
+
+    def observe(self, fresh: int, now: float) -> None:
+        """入口に新しく出た URL 数から、いまの時間帯の公開ペースを更新する（初回は基準がないので見送る）"""
+        if self.last_poll is not None:
+            hours = max(1e-6, (now - self.last_poll) / 3600)
+            h = self.hour(now)
+            prev = self.rate(h)
+            a = 1 - math.exp(-hours / DAEMON_RATE_TAU_H)
+            self.rates[h] = round(prev + a * (fresh / hours - prev), 4)
+        self.last_poll = now
+
+    def interval(self, now: float) -> float:
+        """いまと次の時間帯の速いほうのペースで、新着が目安の件数溜まるまでの秒数"""
+        h = self.hour(now)
+        rate = max(self.rate(h), self.rate((h + 1) % 24), 1e-3)
+        sec = 3600 * DAEMON_TARGET_NEW / rate
+        sec *= 2 ** min(self.failures, DAEMON_MAX_BACKOFF_EXP)
+        return min(DAEMON_MAX_INTERVAL_SEC, max(DAEMON_MIN_INTERVAL_SEC, sec))
+
+
+def _polled_article(spec, url, meta, rec, target) -> Optional[Article]:
+    """入口で見つけた記事ページの抽出結果 → Article（対象外は処理済み URL に理由を残して None）"""
+    name = spec["name"]
+    if not rec:
+        seen_record(name, url, "error")
+        return None
+    # DVB は一覧の日付、BBC は RSS のタイトル・日付を使う（コレクタと同じ）
+    title = meta.get("title") or rec["title"]
+    published = meta.get("date") or rec["date"]
+    body = rec["body"]
+    if not title or not published or not body:
+        seen_record(name, url, "empty")
+        return None
+    if not date_matches(published, target):
+        seen_record(name, url, "off_date")
+        return None
+    keyword_hit = rec["keyword_hit"]
+    if spec["key"] == "bbc":
+        title = _remove_bbc_noise(unicodedata.normalize("NFC", title))
+        body = _remove_bbc_noise(unicodedata.normalize("NFC", body))
+        keyword_hit = None
+    art = Article(name, url, title, body, published, keyword_hit=keyword_hit)
+    art = art.normalized()
+    if spec["key"] == "mizzima" and any(
+        kw in art.title for kw in MIZZIMA_EXCLUDE_TITLE_KEYWORDS
+    ):
+        seen_record(name, url, "excluded")
+        return None
+    return art
+
+
+def poll_source(poller: SourcePoller, target, seen_urls, queue) -> int:
+    """入口を1回見て、未処理の記事を取得・判定して queue に積む。積んだ件数を返す"""
+    now = time.time()
+    try:
+        with TRACER.span("poll", source=poller.key):
+            found = poller.discover(poller, target)
+    except Exception as e:
+        poller.failures += 1
+        print(f"[daemon] {poller.key}: discovery failed ({poller.failures}): {e}")
+        return 0
+    poller.failures = 0
+    urls = [u for u, _ in found]
+    poller.observe(len(set(urls) - poller.known), now)
+    poller.known = set(urls)
+
+    # 取得に失敗した記事（error）は次の見張りで取り直す
+    meta = {
+        u: m
+        for u, m in found
+        if _norm_id(u) not in seen_urls and not seen_skip(poller.name, u)
+    }
+
+    def _fetch_pages():
+        for url in traced_iter("article", list(meta), attr="url"):
+            try:
+                yield url, poller.fetch(url, poller.session).content
+            except Exception as e:
+                print(f"[daemon] {poller.key}: {e}")
+                seen_record(poller.name, url, "error")
+
+    before = len(queue)
+    for url, rec in parse_fetched(_fetch_pages(), poller.key):
+        art = _polled_article(poller.spec, url, meta[url], rec, target)
+        if art is not None:
+            process_and_enqueue_articles(
+                [art],
+                poller.name,
+                seen_urls,
+                queue=queue,
+                bypass_keyword=poller.spec["enqueue"].get("bypass_keyword", False),
+                trust_existing_body=True,
+            )
+    added = len(queue) - before
+    print(
+        f"[daemon] {poller.key}: {len(found)} on entry, {len(meta)} new, "
+        f"{added} queued (rate {poller.rate(poller.hour(now)):.2f}/h)"
+    )
+    return added
+
+
+def emit_new_summaries(
+    queue, alerted, handled, write, *, batch_size=3, wait_seconds=60
+):
+    """
+    queue の記事を要約し、その日にすでに流した分と合わせて重複判定したうえで、
+    新しく残ったものだけを write する。流した要約は alerted に、要約にかけた URL は
+    （除外・重複で流さなかったものも）handled に足す。流した件数を返す
+    """
+    summaries = list(iter_summaries(queue, batch_size, wait_seconds))
+    handled.update(_norm_id(item["url"]) for item in queue)
+    queue.clear()
+    if not summaries:
+        return 0
+    done = {_norm_id(x.get("url")) for x in alerted}
+    # 配信済みはクラスターの代表として固定し、新着はそれと重ならないものだけ流す
+    context = related_alerted(alerted, summaries)
+    kept = dedupe_and_normalize(
+        context + summaries, pinned=[x.get("url") for x in context]
+    )
+    fresh = [x for x in kept if _norm_id(x.get("url")) not in done]
+    fresh_ids = {_norm_id(x.get("url")) for x in fresh}
+    for x in fresh:
+        write(x)
+    alerted.extend(x for x in summaries if _norm_id(x.get("url")) in fresh_ids)
+    print(
+        f"[daemon] {len(summaries)} summarized, {len(fresh)} new after dedupe "
+        f"({len(alerted)} today)"
+    )
+    return len(fresh)
+
+
+def _dedupe_features(item) -> Counter:
+    text = _strip_tags(f"{item.get('title') or ''}\n{item.get('summary') or ''}")
+    text = _WS_RE.sub("", text)
+    return Counter(text[i : i + 2] for i in range(len(text) - 1))
+
+
+def related_alerted(alerted, summaries, *, limit=DAEMON_DEDUPE_CONTEXT):
+    """配信済みのうち、新着のどれかと似ているものを似ている順に limit 件まで（元の順で返す）"""
+    if not alerted:
+        return []
+    vecs = _tfidf([_dedupe_features(x) for x in alerted + summaries])
+    old, new = vecs[: len(alerted)], vecs[len(alerted) :]
+    scored = [(max(_cosine(v, w) for w in new), i) for i, v in enumerate(old)]
+    picked = sorted(
+        (
+            i
+            for sim, i in sorted(scored, reverse=True)[:limit]
+            if sim >= DAEMON_DEDUPE_MIN_SIM
+        )
+    )
+    return [alerted[i] for i in picked]
+
+
+def _load_alerted(day: str):
+    """(その日に流した要約, 要約にかけた URL) を state から読む（別の日なら空）"""
+    state = load_json_state(DAEMON_ALERTS_STATE, None) or {}
+    if state.get("day") != day:
+        return [], set()
+    return state.get("items", []), set(state.get("handled", []))
+
+
+def run_daemon(
+    write, *, sources=None, rounds=0, duration=0, batch_size=3, wait_seconds=60
+):
+    """
+    ソースごとの入口を見張り続け、新しい記事の要約を write(summary) で流す。
+    rounds: 各ソースをこの回数見たら終わる、duration: この秒数で終わる（どちらも 0 なら止めるまで）
+    MMT の日付が変わったら処理済み URL と「今日流した分」を新しい日に切り替える。
+    """
+    rates = load_json_state(POLL_RATES_STATE, None) or {}
+    pollers = [SourcePoller(spec, rates) for spec in _selected_specs(sources)]
+    end = time.monotonic() + duration if duration else None
+    day, stack = None, contextlib.ExitStack()
+    try:
+        while True:
+            active = [p for p in pollers if not rounds or p.polls < rounds]
+            if not active:
+                break
+            poller = min(active, key=lambda p: p.next_at)
+            wait = poller.next_at - time.time()
+            if end is not None and time.monotonic() + max(0.0, wait) >= end:
+                break
+            if wait > 0:
+                traced_sleep(wait, "poll_wait")
+
+            today = get_today_date_mmt()
+            if today != day:
+                stack.close()
+                stack = contextlib.ExitStack()
+                store = stack.enter_context(seen_urls_for(today))
+                day, seen_urls = today, set()
+                alerted, handled = _load_alerted(day.isoformat())
+                # 前に積んだまま要約にかけていない記事（途中で止まった回）は取り直さずに流す
+                queue = []
+                restored = (
+                    [a for p in pollers for a in store.queued(p.name)] if store else []
+                )
+                for art in restored:
+                    seen_urls.add(_norm_id(art.url))
+                    if _norm_id(art.url) not in handled:
+                        queue.append(art)
+                print(
+                    f"[daemon] {day}: {len(alerted)} already sent, {len(queue)} pending"
+                )
+
+            poll_source(poller, day, seen_urls, queue)
+            if queue:
+                emit_new_summaries(
+                    queue,
+                    alerted,
+                    handled,
+                    write,
+                    batch_size=batch_size,
+                    wait_seconds=wait_seconds,
+                )
+                save_json_state(
+                    DAEMON_ALERTS_STATE,
+                    {
+                        "day": day.isoformat(),
+                        "items": alerted,
+                        "handled": sorted(handled),
+                    },
+                )
+            now = time.time()
+            poller.polls += 1
+            poller.next_at = now + poller.interval(now)
+            save_json_state(POLL_RATES_STATE, rates)
+            boilerplate_save()
+            canonical_save()
+    finally:
+        stack.close()
+        print(
+            "[daemon] next polls: "
+            + ", ".join(
+                f"{p.key} {max(0.0, p.next_at - time.time()) / 60:.0f}m"
+                for p in pollers
+            )
+        )
+
+
+# ===== ステージ間の受け渡し形式（JSONL、1行1レコード） =====
+# {"v": 1, "kind": "article"|"queued"|"summary", ...本体}
+# ストリームで読み書きするので、件数が増えてもメモリは増えない。
+RECORD_VERSION = 1
+
+
+def _dump_record(kind: str, rec: dict) -> str:
+    return (
+        json.dumps({"v": RECORD_VERSION, "kind": kind, **rec}, ensure_ascii=False)
+        + "\n"
+    )
+
+
+@contextlib.contextmanager
+def record_writer(path, kind: str, *, append=False):
+    """
+    レコードを書き出す write(rec) を返す。
+    path が "-"/None なら stdout（この間のログは stderr に逃がす）、
+    ファイルなら一時ファイルに書いて完了時に置き換える（途中で落ちても前回の出力は壊れない）。
+    append=True なら既存のファイルに1件ずつ追記する（常駐モード用。書くたびに flush）。
+    """
+    if path in (None, "-"):
+        out = sys.stdout
+
+        def _write(rec):
+            out.write(_dump_record(kind, rec))
+            out.flush()
+
+        with contextlib.redirect_stdout(sys.stderr):
+            yield _write
+        return
+
+    if append:
+        with open(path, "a", encoding="utf-8") as f:
+
+            def _append(rec):
+                f.write(_dump_record(kind, rec))
+                f.flush()
+
+            yield _append
+        return
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        yield lambda rec: f.write(_dump_record(kind, rec))
+    os.replace(tmp, path)
+
+
+def read_records(path, kind=None):
+    """JSONL を1件ずつ読む（"-"/None は stdin）。未対応バージョンは ValueError"""
+    fp = sys.stdin if path in (None, "-") else open(path, "r", encoding="utf-8")
+    try:
+        for lineno, line in enumerate(fp, 1):
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            v = rec.pop("v", None)
+            k = rec.pop("kind", None)
+            if v != RECORD_VERSION:
+                raise ValueError(
+                    f"unsupported record version {v!r} at {path or '-'}:{lineno}"
+                )
+            if kind and k != kind:
+                raise ValueError(
+                    f"expected kind={kind!r} but got {k!r} at {path or '-'}:{lineno}"
+                )
+            yield rec
+    finally:
+        if fp is not sys.stdin:
+            fp.close()
+
+
+def _in_shard(item: dict, shard) -> bool:
+    """--shard K/N：URL のハッシュで N 分割したうちの K 番目だけ処理する"""
+    if not shard:
+        return True
+    k, n = shard
+    h = int(hashlib.sha1(_norm_id(item.get("url") or "").encode()).hexdigest(), 16)
+    return h % n == k
+
+
+def _parse_shard(text: str):
+    k, n = (int(x) for x in text.split("/", 1))
+    if not (0 <= k < n):
+        raise argparse.ArgumentTypeError(f"invalid shard: {text}")
+    return k, n
+
+
+def _target_from_args(args):
+    """--date または --from/--to から (target, depth_days) を作る"""
+    if getattr(args, "date_from", None) and getattr(args, "date_to", None):
+        start, end = sorted([args.date_from, args.date_to])
+        days = (end - start).days + 1
+        return frozenset(start + timedelta(days=i) for i in range(days)), days
+    return (args.date or get_today_date_mmt()), 1
+
+
+def _cmd_run(args):
+    date_mmt = args.date or get_today_date_mmt()
+    deadline = args.deadline_min * 60 if args.deadline_min > 0 else None
+
+    # キューはディスク上（URL 重複は投入時に落ちる）。本文はモデル入力だけを読み出す
+    with ArticleQueue(args.queue) as queue, time_budget("run", deadline):
+        # 同じ日の再実行では処理済みの URL を取りにいかない
+        with seen_urls_for(date_mmt):
+            collect_and_enqueue_all(date_mmt, set(), queue=queue, sources=args.source)
+        print(f"⚙️ queue: {queue.describe()}")
+        print_token_report()
+        boilerplate_save()
+        canonical_save()
+
+        # バッチ翻訳実行 (5件ごとに1分待機)。永続キュー（--queue）に前の日の行が
+        # 残っていても、今日の digest には対象日の記事だけを入れる
+        all_summaries = process_translation_batches(
+            batch_size=args.batch_size,
+            wait_seconds=args.wait,
+            queue=queue.select(date_mmt.isoformat()),
+        )
+
+    # 締め切りを過ぎていても、できた分は必ず送る
+    if RUN_CUTS:
+        print("⏱ cut by run deadline:", file=sys.stderr)
+        for line in cut_summary_lines():
+            print(f"  {line}", file=sys.stderr)
+    send_email_digest(all_summaries, digest_date=date_mmt, cuts=RUN_CUTS)
 
-    # === Mizzima (Burmese) ===
-    print("=== Mizzima (Burmese) ===")
-    articles_mizzima = get_mizzima_articles_from_category(
-        date_mmt,
-        "https://bur.mizzima.com",
-        "Mizzima (Burmese)",
-        "/category/%e1%80%9e%e1%80%90%e1%80%84%e1%80%ba%e1%80%b8/%e1%80%99%e1%80%bc%e1%80%94%e1%80%ba%e1%80%99%e1%80%ac%e1%80%9e%e1%80%90%e1%80%84%e1%80%ba%e1%80%b8",
-        max_pages=3,
+
+def _cmd_collect(args):
+    target, depth_days = _target_from_args(args)
+    with record_writer(args.output, "article") as write:
+        for spec in _selected_specs(args.source):
+            print(f"=== {spec['name']} ===")
+            with TRACER.span("source", source=spec["key"]):
+                articles = spec["collect"](target, depth_days)
+            for art in articles:
+                write({**art, "source": spec["name"]})
+
+
+def _cmd_enqueue(args):
+    seen_urls = set()
+    if _is_queue_db(args.output):
+        # -o queue.sqlite：JSONL ではなくディスク上のキューに積む（summarize -i でそのまま読める）
+        with ArticleQueue(args.output) as queue:
+            for art in read_records(args.input, "article"):
+                spec = SOURCE_SPECS_BY_NAME.get(art.get("source")) or {}
+                process_and_enqueue_articles(
+                    [art],
+                    art.get("source"),
+                    seen_urls,
+                    queue=queue,
+                    **spec.get("enqueue", {}),
+                )
+            print(f"⚙️ queue: {queue.describe()}")
+            print_token_report()
+            boilerplate_save()
+            canonical_save()
+        return
+    with record_writer(args.output, "queued") as write:
+        for art in read_records(args.input, "article"):
+            spec = SOURCE_SPECS_BY_NAME.get(art.get("source")) or {}
+            buf = []
+            process_and_enqueue_articles(
+                [art],
+                art.get("source"),
+                seen_urls,
+                queue=buf,
+                **spec.get("enqueue", {}),
+            )
+            for item in buf:
+                write(item)
+
+
+def _cmd_summarize(args):
+    with contextlib.ExitStack() as stack:
+        if _is_queue_db(args.input):
+            source = stack.enter_context(ArticleQueue(args.input))
+        else:
+            source = read_records(args.input, "queued")
+        items = (it for it in source if _in_shard(it, args.shard))
+        with record_writer(args.output, "summary") as write:
+            for result in iter_summaries(items, args.batch_size, args.wait):
+                write(result)
+    print_token_report(file=sys.stderr)
+    boilerplate_save()
+    canonical_save()
+
+
+def _cmd_dedupe(args):
+    summaries = [
+        rec for path in (args.input or ["-"]) for rec in read_records(path, "summary")
+    ]
+    with record_writer(args.output, "summary") as write:
+        for rec in dedupe_and_normalize(summaries):
+            write(rec)
+
+
+def _cmd_render(args):
+    summaries = list(read_records(args.input, "summary"))
+    digest_date = args.date or get_today_date_mmt()
+    subject, html_content = render_digest_html(summaries, digest_date)
+    out = args.output or f"digest_{digest_date.isoformat()}.html"
+    if out == "-":
+        sys.stdout.write(html_content)
+        return
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(html_content)
+    print(f"📝 {subject} → {out}")
+
+
+def _cmd_send(args):
+    summaries = list(read_records(args.input, "summary"))
+    send_email_digest(summaries, digest_date=args.date)
+
+
+def _cmd_tokens(args):
+    rows = load_token_samples(args.log)
+    rates = fit_token_rates(rows)
+    if len(rows) >= TOKEN_CALIBRATION_MIN:
+        print(
+            f"calibrated on {len(rows)} call(s) in {args.log}: mean abs error "
+            f"{token_rate_error(rows, rates):.1%} "
+            f"(defaults: {token_rate_error(rows, DEFAULT_TOKEN_RATES):.1%})"
+        )
+    else:
+        print(
+            f"{len(rows)} call(s) with prompt_chars in {args.log} "
+            f"(need {TOKEN_CALIBRATION_MIN}); using defaults"
+        )
+    for k in TOKEN_SCRIPTS:
+        print(f"  {k:<6} {rates[k]:.3f} tokens/char ({1 / rates[k]:.2f} chars/token)")
+
+    if args.input:
+        global _token_rates
+        _token_rates = rates
+        for rec in read_records(args.input):
+            Article.of(rec).model_input()
+        for line in boilerplate_report_lines() + token_report_lines():
+            print(line)
+
+    if args.boilerplate:
+        model = boilerplate_model()
+        for source in sorted(model.sources):
+            src = model.sources[source]
+            learned = model.learned(source)
+            print(
+                f"{source}: {src['docs']:.0f} article(s), {len(learned)} boilerplate unit(s)"
+            )
+            for n, text in learned[: args.boilerplate]:
+                print(f"  {n / src['docs']:>4.0%}  {text}")
+
+
+def _cmd_daemon(args):
+    with record_writer(args.output, "summary", append=True) as write:
+        try:
+            run_daemon(
+                write,
+                sources=args.source,
+                rounds=args.rounds,
+                duration=args.duration_min * 60,
+                batch_size=args.batch_size,
+                wait_seconds=args.wait,
+            )
+        except KeyboardInterrupt:
+            print("[daemon] stopped")
+
+
+def _cmd_backfill(args):
+    run_backfill(
+        args.start, args.end, send=args.send, out_dir=args.out, queue_path=args.queue
+    )
+
+
+# import 時間の予算（ms）。超えたら importtime は終了コード 1
+IMPORT_BUDGET_MS = float(os.getenv("DIGEST_IMPORT_BUDGET_MS", "300"))
+
+
+def import_time_report(budget_ms=IMPORT_BUDGET_MS, top=15):
+    """
+    別プロセスで `python -X importtime -c "import fetch_articles"` を実行し、
+    このモジュールが直接 import したモジュールごとの累積時間（ms）を重い順に出す。
+    合計が budget_ms を超えるか、LAZY_MODULES が import 時点で読み込まれていれば False。
+    """
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        f"import sys; sys.path.insert(0, {here!r}); import fetch_articles; "
+        "print(','.join(m for m in fetch_articles.LAZY_MODULES if m in sys.modules))"
     )
-    process_and_enqueue_articles(
-        articles_mizzima, "Mizzima (Burmese)", seen_urls, trust_existing_body=True
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
     )
 
-    print("=== BBC Burmese ===")
-    articles_bbc = get_bbc_burmese_articles_for(date_mmt)
-    process_and_enqueue_articles(
-        articles_bbc, "BBC Burmese", seen_urls, trust_existing_body=True
+    # "import time: self [us] | cumulative | <字下げ>name"。子は親より先に出る
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cum_us, name = (x for x in re.split(r"\s*\|\s?|:\s+", line, 3))
+        level = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((level, name.strip(), int(self_us) / 1000, int(cum_us) / 1000))
+
+    idx = max(i for i, r in enumerate(rows) if r[1] == "fetch_articles" and r[0] == 0)
+    total_ms, self_ms = rows[idx][3], rows[idx][2]
+    children = []
+    for level, name, _, cum in reversed(rows[:idx]):
+        if level == 0:
+            break
+        if level == 1:
+            children.append((name, cum))
+    children.sort(key=lambda x: -x[1])
+
+    print(f"{'module':<40} {'cumulative ms':>14}")
+    for name, cum in children[:top]:
+        print(f"{name:<40} {cum:>14.1f}")
+    print(f"{'(fetch_articles self)':<40} {self_ms:>14.1f}")
+    print(f"{'TOTAL':<40} {total_ms:>14.1f}  (budget {budget_ms:.0f} ms)")
+
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    ok = total_ms <= budget_ms and not loaded
+    if loaded:
+        print(
+            f"⚠️ 遅延 import のはずが import 時に読み込まれている: {', '.join(loaded)}"
+        )
+    if total_ms > budget_ms:
+        print(f"⚠️ import 時間が予算超過: {total_ms:.1f} ms > {budget_ms:.0f} ms")
+    return ok
+
+
+def _cmd_importtime(args):
+    return 0 if import_time_report(args.budget_ms, args.top) else 1
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="fetch_articles.py",
+        description="Myanmar News Digest（引数なしは run と同じ）",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="BASE",
+        help="span トレースを BASE.jsonl / BASE.trace.json に書き出す（DIGEST_TRACE と同じ）",
     )
+    sub = parser.add_subparsers(dest="command")
+
+    def _date_opts(p):
+        p.add_argument("--date", type=date.fromisoformat, help="MMT日付（既定: 今日）")
+
+    def _io_opts(p, *, multi_input=False):
+        if multi_input:
+            p.add_argument("-i", "--input", action="append", help="入力JSONL（複数可）")
+        else:
+            p.add_argument(
+                "-i", "--input", default="-", help="入力JSONL（既定: stdin）"
+            )
+        p.add_argument("-o", "--output", default="-", help="出力JSONL（既定: stdout）")
+
+    def _source_opts(p):
+        p.add_argument(
+            "--source",
+            action="append",
+            choices=list(SOURCE_SPECS_BY_KEY),
+            help="対象ソース（複数可、既定: 全部）",
+        )
 
-    print("=== Irrawaddy ===")
-    articles_irrawaddy = get_irrawaddy_articles_for(date_mmt)
-    # MEMO: ログ用、デバックでログ確認
-    # print("RESULTS:", json.dumps(articles_irrawaddy, ensure_ascii=False, indent=2))
-    process_and_enqueue_articles(
-        articles_irrawaddy,
-        "Irrawaddy",
-        seen_urls,
-        bypass_keyword=True,  # ← Irrawaddyはキーワードで落とさない
-        trust_existing_body=True,  # ← さっき入れた body をそのまま使う（再フェッチしない）
+    def _batch_opts(p):
+        p.add_argument("--batch-size", type=int, default=3)
+        p.add_argument("--wait", type=float, default=60, help="バッチ間の待機秒")
+
+    p = sub.add_parser("run", help="巡回→要約→重複判定→メール送信を一括実行")
+    _date_opts(p)
+    _source_opts(p)
+    _batch_opts(p)
+    p.add_argument(
+        "--deadline-min",
+        type=float,
+        default=RUN_DEADLINE_MIN,
+        help="全体の制限時間（分、0で無制限。既定: DIGEST_DEADLINE_MIN）",
+    )
+    p.add_argument(
+        "--queue",
+        default=QUEUE_PATH,
+        metavar="PATH",
+        help="翻訳キューの SQLite ファイル（既定: DIGEST_QUEUE_PATH、空なら一時ファイル）",
     )
+    p.set_defaults(func=_cmd_run)
+
+    p = sub.add_parser("collect", help="各ソースを巡回して article レコードを出力")
+    _date_opts(p)
+    p.add_argument("--from", dest="date_from", type=date.fromisoformat)
+    p.add_argument("--to", dest="date_to", type=date.fromisoformat)
+    _source_opts(p)
+    p.add_argument("-o", "--output", default="-", help="出力JSONL（既定: stdout）")
+    p.set_defaults(func=_cmd_collect)
+
+    p = sub.add_parser("enqueue", help="article → queued（本文補完・キーワード判定）")
+    _io_opts(p)
+    p.set_defaults(func=_cmd_enqueue)
+
+    p = sub.add_parser("summarize", help="queued → summary（Gemini 要約）")
+    _io_opts(p)
+    _batch_opts(p)
+    p.add_argument("--shard", type=_parse_shard, help="K/N：N分割のK番目だけ処理")
+    p.set_defaults(func=_cmd_summarize)
+
+    p = sub.add_parser("dedupe", help="summary → summary（LLM 重複判定）")
+    _io_opts(p, multi_input=True)
+    p.set_defaults(func=_cmd_dedupe)
+
+    p = sub.add_parser("render", help="summary → メールHTML")
+    _date_opts(p)
+    p.add_argument("-i", "--input", default="-")
+    p.add_argument("-o", "--output", help="既定: digest_YYYY-MM-DD.html")
+    p.set_defaults(func=_cmd_render)
+
+    p = sub.add_parser("send", help="summary → Gmail 送信")
+    _date_opts(p)
+    p.add_argument("-i", "--input", default="-")
+    p.set_defaults(func=_cmd_send)
+
+    p = sub.add_parser("backfill", help="期間の digest をまとめて作り直す")
+    p.add_argument("start", type=date.fromisoformat)
+    p.add_argument("end", type=date.fromisoformat)
+    p.add_argument("--send", action="store_true", help="HTML出力ではなくメール送信")
+    p.add_argument("--out", default="backfill", help="HTML出力先ディレクトリ")
+    p.add_argument(
+        "--queue",
+        default=QUEUE_PATH,
+        metavar="PATH",
+        help="翻訳キューの SQLite ファイル（既定: DIGEST_QUEUE_PATH、空なら一時ファイル）",
+    )
+    p.set_defaults(func=_cmd_backfill)
 
-    print("=== Khit Thit Media ===")
-    articles_khit = get_khit_thit_media_articles_from_category(date_mmt, max_pages=3)
-    process_and_enqueue_articles(articles_khit, "Khit Thit Media", seen_urls)
+    p = sub.add_parser(
+        "daemon",
+        help="各ソースの入口を見張り、新着の要約を summary レコードで流し続ける",
+    )
+    _source_opts(p)
+    _batch_opts(p)
+    p.add_argument(
+        "-o", "--output", default="-", help="summary JSONL の追記先（既定: stdout）"
+    )
+    p.add_argument(
+        "--rounds",
+        type=int,
+        default=0,
+        help="各ソースをこの回数見たら終わる（0で無制限）",
+    )
+    p.add_argument(
+        "--duration-min", type=float, default=0, help="この分数で終わる（0で無制限）"
+    )
+    p.set_defaults(func=_cmd_daemon)
 
-    print("=== DVB ===")
-    articles_dvb = get_dvb_articles_for(date_mmt, debug=True)
-    process_and_enqueue_articles(
-        articles_dvb, "DVB", seen_urls, trust_existing_body=True
+    p = sub.add_parser(
+        "tokens", help="トークン見積もりの較正結果と、切り詰めによる節約量"
+    )
+    p.add_argument("--log", default=GEMINI_USAGE_LOG, help="較正に使う使用量ログ")
+    p.add_argument("-i", "--input", help="article / queued JSONL（節約量の見積もり）")
+    p.add_argument(
+        "--boilerplate",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="学習済みの定型文をソースごとに上位 N 件表示",
     )
+    p.set_defaults(func=_cmd_tokens)
+
+    p = sub.add_parser("importtime", help="import 時間（モジュール別）と予算チェック")
+    p.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    p.add_argument("--top", type=int, default=15)
+    p.set_defaults(func=_cmd_importtime)
+
+    return parser
 
-    # URLベースの重複排除を先に行う
-    print(f"⚙️ Removing URL duplicates from {len(translation_queue)} articles...")
-    translation_queue = deduplicate_by_url(translation_queue)
 
-    # バッチ翻訳実行 (5件ごとに1分待機)
-    all_summaries = process_translation_batches(batch_size=3, wait_seconds=60)
+def main(argv=None):
+    parser = build_arg_parser()
+    argv = sys.argv[1:] if argv is None else argv
+    args = parser.parse_args(argv or ["run"])
+    if not getattr(args, "func", None):
+        # 「--trace X」だけ指定されたときも run として扱う
+        if argv and argv[0].startswith("-") and "-h" not in argv:
+            args = parser.parse_args([*argv, "run"])
+        else:
+            parser.print_help()
+            return 2
+    if args.trace:
+        TRACER.out_base = args.trace
+    try:
+        with TRACER.span("run", command=args.command):
+            rc = args.func(args)
+    finally:
+        TRACER.export()
+    return rc or 0
 
-    send_email_digest(all_summaries)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1132 @@
+"""
+ニュースサイトのローカル模擬サーバ（巡回の負荷試験・打ち切りロジックの確認用）
+
+合成コーパス（ビルマ語/英語の記事をサイトごとに数千件）から、各サイトの形のページを生成して返す。
+  mizzima   : WordPress（main.site-main の post-thumbnail カード、/page/N/、og:title）
+  khit_thit : WordPress / tagDiv（p.entry-title.td-module-title、カテゴリ別 /page/N/）
+  irrawaddy : JNews（.jeg_meta_date + fa-clock-o の日付リンク、ホームの kuDRpuo カラム、/amp）
+  dvb       : Next.js + Tailwind（/post/... カード、?page=N、/amp・?output=amp、__NEXT_DATA__）
+  bbc       : RSS（ETag / If-None-Match で 304）
+WordPress 系は --wp-json で /wp-json/wp/v2/* と news sitemap も返す（既定は 403 で HTML 巡回に落ちる）。
+
+  # 全コレクタを模擬サイトに向けて collect → enqueue を通す（ネットワーク不要）
+  python mock_sites.py run --articles 3000 --errors 403=0.02,429=0.02,503=0.02 --time-scale 0.05
+
+  # サーバだけ立てて、表示される環境変数で fetch_articles.py を向ける
+  python mock_sites.py serve --latency uniform:0.05,0.3 --max-pages 5
+"""
+
+import argparse
+import contextlib
+import email.utils
+import hashlib
+import html
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fake_gemini import parse_latency, parse_rates
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MMT = timezone(timedelta(hours=6, minutes=30))
+
+SITES = ["mizzima", "bbc", "irrawaddy", "khit_thit", "dvb"]
+BASE_URL_ENV = {
+    "mizzima": "MIZZIMA_BASE_URL",
+    "khit_thit": "KHIT_THIT_BASE_URL",
+    "irrawaddy": "IRRAWADDY_BASE_URL",
+    "dvb": "DVB_BASE_URL",
+}
+ERROR_KINDS = ["403", "404", "429", "500", "503", "reset"]
+
+# fetch_articles.MIZZIMA_CATEGORY_PATH と同じ（デコード済みで比較する）
+MIZZIMA_CATEGORY = "/category/သတင်း/မြန်မာသတင်း"
+KHIT_THIT_CATEGORIES = ["news", "politics", "editor-choice", "interview", "china-watch"]
+# Irrawaddy の記事パス（先頭がカテゴリ）。asia / world / video はコレクタ側で除外対象
+IRRAWADDY_SECTIONS = [
+    ("news/burma", 30),
+    ("news/war-against-the-junta", 8),
+    ("news/conflicts-in-numbers", 2),
+    ("news/junta-crony", 3),
+    ("news/ethnic-issues", 4),
+    ("news/asia", 6),
+    ("news/world", 6),
+    ("business/economy", 6),
+    ("opinion/editorial", 2),
+    ("opinion/commentary", 3),
+    ("opinion/analysis", 3),
+    ("in-person/interview", 2),
+    ("specials/myanmar-china-watch", 2),
+    ("video", 3),
+    ("culture/books", 2),
+    ("lifestyle", 1),
+]
+IRRAWADDY_EXCLUDED = ("news/asia", "news/world", "video", "culture", "lifestyle")
+
+# ===== 合成テキスト（bench_corpus と同じ文。キーワード文は KEYWORDS に当たる） =====
+MY_FILL = [
+    "ဒေသခံများက ပြောကြားသည်။",
+    "စစ်ကောင်စီတပ်များ၏ တိုက်ခိုက်မှုကြောင့် ကျေးရွာသားများ ထွက်ပြေးခဲ့ရသည်။",
+    "ပြည်သူ့ကာကွယ်ရေးတပ်ဖွဲ့ (PDF) က ထုတ်ပြန်ချက်တစ်စောင် ထုတ်ပြန်ခဲ့သည်။",
+    "လျှပ်စစ်မီး ပြတ်တောက်မှုများ ဆက်လက်ဖြစ်ပေါ်နေကြောင်း သိရသည်။",
+    "စားသောက်ကုန် ဈေးနှုန်းများ ထပ်မံမြင့်တက်လာသည်။",
+    "ဒုက္ခသည်စခန်းများတွင် ဆေးဝါးလိုအပ်ချက်များ ရှိနေသည်။",
+    "ကျောင်းသားများ ပညာသင်ကြားရေး အခက်အခဲများ ကြုံတွေ့နေရသည်။",
+    "လမ်းပန်းဆက်သွယ်ရေး ပိတ်ဆို့ခံထားရသဖြင့် ကုန်စည်စီးဆင်းမှု နှောင့်နှေးနေသည်။",
+    "အမည်မဖော်လိုသူ ဒေသခံတစ်ဦးက ယခုကဲ့သို့ ပြောသည်။",
+    "ထိခိုက်ဒဏ်ရာရသူများကို ဆေးရုံသို့ ပို့ဆောင်ခဲ့သည်။",
+]
+MY_KW = [
+    "မြန်မာနိုင်ငံ အနှံ့ စစ်ရေးတင်းမာမှုများ မြင့်တက်နေသည်။",
+    "ရန်ကုန်တိုင်း အတွင်း စစ်မှုထမ်း ခေါ်ယူမှုများ ပြုလုပ်နေသည်။",
+    "ငွေကျပ် သိန်း ၅၀ ကျော် ဒဏ်ငွေ ချမှတ်ခံရသည်။",
+    "မင်းအောင်လှိုင် ဦးဆောင်သော စစ်ကောင်စီက ကြေညာခဲ့သည်။",
+]
+EN_FILL = [
+    "Residents said the fighting forced hundreds of families to flee their homes.",
+    "The regime has not responded to requests for comment.",
+    "Local resistance forces said they had seized several outposts this week.",
+    "Prices of rice and cooking oil have risen sharply in recent months.",
+    "Power cuts of up to twelve hours a day have hit businesses hard.",
+    "Aid groups warned of shortages of medicine in displacement camps.",
+    "The junta-appointed administrator declined to comment on the incident.",
+]
+EN_KW = [
+    "Myanmar's military regime announced new travel restrictions on Friday.",
+    "The junta's conscription drive has intensified across Yangon Region.",
+]
+
+CHALLENGE = (
+    b"<!DOCTYPE html><html><head><title>Just a moment...</title></head>"
+    b'<body><div id="challenge-running">Checking your browser before accessing the site.</div>'
+    b"</body></html>"
+)
+
+
+def today_mmt():
+    return datetime.now(MMT).date()
+
+
+def _en_date(d):
+    return f"{d:%B} {d.day}, {d.year}"
+
+
+# ===== コーパス =====
+class Article:
+    __slots__ = ("site", "id", "dt", "kw", "lang", "title", "section", "path")
+
+    def __init__(self, site, id, dt, kw, lang, title, section, path):
+        self.site = site
+        self.id = id
+        self.dt = dt
+        self.kw = kw
+        self.lang = lang
+        self.title = title
+        self.section = section
+        self.path = path
+
+    @property
+    def day(self):
+        return self.dt.astimezone(MMT).date()
+
+
+class Corpus:
+    """
+    サイトごとに n 件、end_date までの days 日に散らした記事（新しい順）。
+    本文は (seed, site, id) から都度生成するので、件数を増やしてもメモリはメタデータ分だけ。
+    """
+
+    def __init__(self, n=2000, days=14, end_date=None, seed=0, kw_rate=0.5):
+        self.n = n
+        self.days = days
+        self.end_date = end_date or today_mmt()
+        self.seed = seed
+        self.kw_rate = kw_rate
+        self.by_site = {site: self._generate(site) for site in SITES}
+        self.by_path = {
+            site: {a.path: a for a in arts} for site, arts in self.by_site.items()
+        }
+
+    def _generate(self, site):
+        rng = random.Random(f"{self.seed}:{site}")
+        start = datetime.combine(
+            self.end_date - timedelta(days=self.days - 1), dtime(0, 0), MMT
+        )
+        span = self.days * 86400
+        sections = [s for s, _ in IRRAWADDY_SECTIONS]
+        weights = [w for _, w in IRRAWADDY_SECTIONS]
+        arts = []
+        for i in range(self.n):
+            dt = start + timedelta(seconds=rng.randrange(span))
+            kw = rng.random() < self.kw_rate
+            lang = "en" if site == "irrawaddy" else "my"
+            fill = EN_FILL if lang == "en" else MY_FILL
+            title = " ".join(rng.choice(fill) for _ in range(2))[:90].strip()
+            aid = 100000 + i
+            if site == "mizzima":
+                section = MIZZIMA_CATEGORY
+                path = f"/{dt:%Y/%m/%d}/mizzima-news-{aid}/"
+            elif site == "khit_thit":
+                section = rng.choice(KHIT_THIT_CATEGORIES)
+                path = f"/{dt:%Y/%m/%d}/khitthit-{aid}/"
+            elif site == "irrawaddy":
+                section = rng.choices(sections, weights)[0]
+                path = f"/{section}/irrawaddy-story-{aid}.html"
+            elif site == "dvb":
+                section = "news"
+                path = f"/post/{aid}"
+            else:
+                section = "burmese"
+                path = f"/burmese/articles/c{aid}o"
+            arts.append(Article(site, aid, dt, kw, lang, title, section, path))
+        arts.sort(key=lambda a: a.dt, reverse=True)
+        return arts
+
+    def paragraphs(self, art):
+        rng = random.Random(f"{self.seed}:{art.site}:{art.id}")
+        fill, kws = (EN_FILL, EN_KW) if art.lang == "en" else (MY_FILL, MY_KW)
+        n = rng.randint(10, 24)
+        out = []
+        for i in range(n):
+            s = " ".join(rng.choice(fill) for _ in range(rng.randint(2, 5)))
+            if art.kw and i == n // 2:
+                s = rng.choice(kws) + " " + s
+            out.append(s)
+        return out
+
+    def eligible(self, site, target):
+        """コレクタが拾うべき件数（対象日・キーワード・除外カテゴリ）"""
+        out = []
+        for a in self.by_site[site]:
+            if a.day != target:
+                continue
+            if site == "irrawaddy":
+                if a.section.startswith(IRRAWADDY_EXCLUDED):
+                    continue
+            elif not a.kw:
+                continue
+            out.append(a)
+        return out
+
+
+# ===== ページ生成 =====
+def _nav(n=30):
+    return "".join(
+        f'<li class="menu-item"><a href="/category/c{i}/">Menu {i}</a></li>'
+        for i in range(n)
+    )
+
+
+def _page(head, body, *, amp=False, lang="my"):
+    amp_attr = " amp" if amp else ""
+    return (
+        f'<!DOCTYPE html><html{amp_attr} lang="{lang}"><head><meta charset="utf-8">{head}'
+        f"</head><body>{body}</body></html>"
+    ).encode("utf-8")
+
+
+def _ps(paras):
+    return "".join(f"<p>{html.escape(t)}</p>" for t in paras)
+
+
+class MockSite:
+    """1サイトぶんのルーティング。route() は (status, body, content_type, headers) を返す"""
+
+    listing_kind = "listing"
+
+    def __init__(self, key, corpus, *, per_page=12, max_pages=50, wp_json=False):
+        self.key = key
+        self.corpus = corpus
+        self.articles = corpus.by_site[key]
+        self.per_page = per_page
+        self.max_pages = max_pages
+        self.wp_json = wp_json
+        self.base = ""
+
+    # --- 共通 ---
+    def paginate(self, arts, page):
+        if page < 1 or page > self.max_pages:
+            return None
+        chunk = arts[(page - 1) * self.per_page : page * self.per_page]
+        if not chunk and page > 1:
+            return None
+        return chunk
+
+    def not_found(self):
+        return 404, _page("<title>Page not found</title>", "<h1>404</h1>"), None, {}
+
+    def html(self, body, headers=None):
+        return 200, body, "text/html; charset=utf-8", headers or {}
+
+    def route(self, path, query):
+        return self.not_found()
+
+    def article_for(self, path):
+        return self.corpus.by_path[self.key].get(path)
+
+    # --- WordPress REST / news sitemap ---
+    wp_categories = {}
+
+    def wp_route(self, path, query):
+        if not self.wp_json:
+            return 403, CHALLENGE, "text/html; charset=utf-8", {}
+        if path == "/wp-json/wp/v2/categories":
+            slugs = set((query.get("slug") or [""])[0].split(","))
+            data = [
+                {"id": cid, "slug": slug}
+                for slug, cid in self.wp_categories.items()
+                if slug in slugs
+            ]
+            return self.json(data)
+        if path == "/wp-json/wp/v2/posts":
+            return self.wp_posts(query)
+        if path == "/news-sitemap.xml":
+            return self.news_sitemap()
+        return self.not_found()
+
+    def json(self, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return 200, body, "application/json; charset=UTF-8", headers or {}
+
+    def wp_category_of(self, art):
+        return art.section
+
+    def wp_posts(self, query):
+        def _q(k, default=None):
+            return (query.get(k) or [default])[0]
+
+        def _ts(s):
+            return datetime.fromisoformat(s).replace(tzinfo=timezone.utc) if s else None
+
+        after, before = _ts(_q("after")), _ts(_q("before"))
+        id_to_slug = {cid: slug for slug, cid in self.wp_categories.items()}
+        inc = {id_to_slug.get(int(x)) for x in (_q("categories") or "").split(",") if x}
+        exc = {
+            id_to_slug.get(int(x))
+            for x in (_q("categories_exclude") or "").split(",")
+            if x
+        }
+        arts = []
+        for a in self.articles:
+            dt = a.dt.astimezone(timezone.utc)
+            if (after and dt <= after) or (before and dt >= before):
+                continue
+            cats = set(self.wp_category_chain(a))
+            if inc and not (cats & inc):
+                continue
+            if exc and cats & exc:
+                continue
+            arts.append(a)
+        per_page = min(100, int(_q("per_page", 10)))
+        page = int(_q("page", 1))
+        total_pages = max(1, -(-len(arts) // per_page))
+        if page > total_pages:
+            return (
+                400,
+                json.dumps({"code": "rest_post_invalid_page_number"}).encode(),
+                "application/json",
+                {},
+            )
+        chunk = arts[(page - 1) * per_page : page * per_page]
+        data = [
+            {
+                "id": a.id,
+                "link": f"{self.base}{a.path}",
+                "date_gmt": a.dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S"),
+                "title": {"rendered": html.escape(a.title)},
+                "content": {"rendered": _ps(self.corpus.paragraphs(a))},
+            }
+            for a in chunk
+        ]
+        return self.json(
+            data, {"X-WP-Total": str(len(arts)), "X-WP-TotalPages": str(total_pages)}
+        )
+
+    def wp_category_chain(self, art):
+        return [self.wp_category_of(art)]
+
+    def news_sitemap(self):
+        # Google News sitemap は直近 48 時間分
+        horizon = self.articles[0].dt - timedelta(hours=48) if self.articles else None
+        urls = "".join(
+            "<url>"
+            f"<loc>{self.base}{a.path}</loc>"
+            "<news:news><news:publication><news:name>site</news:name><news:language>my</news:language></news:publication>"
+            f"<news:publication_date>{a.dt.isoformat()}</news:publication_date>"
+            f"<news:title>{html.escape(a.title)}</news:title></news:news>"
+            "</url>"
+            for a in self.articles
+            if a.dt >= horizon
+        )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+            'xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">'
+            f"{urls}</urlset>"
+        ).encode("utf-8")
+        return 200, body, "application/xml; charset=UTF-8", {}
+
+
+def _split_page(path, prefix):
+    """ "{prefix}" → 1, "{prefix}/page/N/" → N、該当しなければ None"""
+    p = path.rstrip("/")
+    prefix = prefix.rstrip("/")
+    if p == prefix:
+        return 1
+    if p.startswith(prefix + "/page/"):
+        tail = p[len(prefix) + len("/page/") :]
+        if tail.isdigit():
+            return int(tail)
+    return None
+
+
+class MizzimaSite(MockSite):
+    wp_categories = {"မြန်မာသတင်း": 11}
+
+    def wp_category_of(self, art):
+        return "မြန်မာသတင်း"
+
+    def route(self, path, query):
+        page = _split_page(path, MIZZIMA_CATEGORY)
+        if page is not None:
+            chunk = self.paginate(self.articles, page)
+            if chunk is None:
+                return self.not_found()
+            cards = "".join(
+                f'<article class="post"><a class="post-thumbnail" href="{self.base}{a.path}">'
+                f'<img src="/t/{a.id}.jpg"></a><h2 class="entry-title"><a href="{self.base}{a.path}">'
+                f"{html.escape(a.title)}</a></h2></article>"
+                for a in chunk
+            )
+            return self.html(
+                _page(
+                    "<title>Mizzima</title>",
+                    f'<header><ul>{_nav()}</ul></header><main class="site-main">{cards}</main>',
+                )
+            )
+        return self.wp_article(path)
+
+    def wp_article(self, path):
+        amp = path.endswith("/amp/") or path.endswith("/amp")
+        if amp:
+            path = path[: path.rstrip("/").rfind("/amp")] + "/"
+        a = self.article_for(path)
+        if not a:
+            return self.not_found()
+        head = (
+            f"<title>{html.escape(a.title)}</title>"
+            f'<meta property="og:title" content="{html.escape(a.title)}">'
+            f'<meta property="article:published_time" content="{a.dt.isoformat()}">'
+            f'<link rel="canonical" href="{self.base}{a.path}">'
+        )
+        if not amp:
+            head += f'<link rel="amphtml" href="{self.base}{a.path}amp/">'
+        body = self.wp_article_body(a)
+        return self.html(_page(head, body, amp=amp))
+
+    def wp_article_body(self, a):
+        related = _ps(self.corpus.paragraphs(self.articles[-1])[:4])
+        return (
+            f'<header id="masthead"><ul>{_nav()}</ul></header><main class="site-main"><article>'
+            f'<h1 class="entry-title">{html.escape(a.title)}</h1><div class="entry-content">'
+            f"{_ps(self.corpus.paragraphs(a))}<h2>Related Posts</h2>{related}</div></article></main>"
+        )
+
+
+class KhitThitSite(MizzimaSite):
+    wp_categories = {slug: 20 + i for i, slug in enumerate(KHIT_THIT_CATEGORIES)}
+
+    def wp_category_of(self, art):
+        return art.section
+
+    def route(self, path, query):
+        for slug in KHIT_THIT_CATEGORIES:
+            page = _split_page(path, f"/category/{slug}")
+            if page is None:
+                continue
+            chunk = self.paginate([a for a in self.articles if a.section == slug], page)
+            if chunk is None:
+                return self.not_found()
+            cards = "".join(
+                f'<div class="td_module_flex"><div class="td-module-thumb"><a href="{self.base}{a.path}">'
+                f'<img src="/k/{a.id}.jpg"></a></div><p class="entry-title td-module-title">'
+                f'<a href="{self.base}{a.path}">{html.escape(a.title)}</a></p></div>'
+                for a in chunk
+            )
+            return self.html(
+                _page(
+                    "<title>Khit Thit</title>",
+                    f'<div class="td-header-wrap"><ul>{_nav()}</ul></div><div class="td-main-content">{cards}</div>',
+                )
+            )
+        return self.wp_article(path)
+
+    def wp_article_body(self, a):
+        paras = self.corpus.paragraphs(a)
+        body = "".join(
+            f'<p>{html.escape(t)} <a href="/tag/t{j}/">#ခေတ်သစ်{j}</a></p>'
+            if j % 4 == 0
+            else f"<p>{html.escape(t)}</p>"
+            for j, t in enumerate(paras)
+        )
+        return (
+            f'<div class="td-header-wrap"><ul>{_nav()}</ul></div><div class="td-post-content">'
+            f'<h1 class="tdb-title-text">{html.escape(a.title)}</h1>'
+            f'<div class="entry-content">{body}</div></div>'
+        )
+
+
+class IrrawaddySite(MockSite):
+    wp_categories = {
+        slug: 30 + i
+        for i, slug in enumerate(
+            sorted({p for s, _ in IRRAWADDY_SECTIONS for p in s.split("/")})
+        )
+    }
+
+    def wp_category_chain(self, art):
+        return art.section.split("/")
+
+    def _card(self, a):
+        return (
+            f'<div class="jeg_postblock_content"><h3 class="jeg_post_title">'
+            f'<a href="{self.base}{a.path}">{html.escape(a.title)}</a></h3>'
+            f'<div class="jeg_post_meta"><div class="jeg_meta_date"><a href="{self.base}{a.path}">'
+            f'<i class="fa fa-clock-o"></i> {_en_date(a.day)}</a></div></div></div>'
+        )
+
+    def route(self, path, query):
+        p = path.lower().rstrip("/")
+        if p == "":
+            # ホーム：kuDRpuo カラムに最新記事
+            latest = [
+                a for a in self.articles if not a.section.startswith(IRRAWADDY_EXCLUDED)
+            ][:20]
+            return self.html(
+                _page(
+                    "<title>The Irrawaddy</title>",
+                    f'<div class="jeg_header"><ul>{_nav()}</ul></div>'
+                    '<div class="elementor-element elementor-element-kuDRpuo" data-id="kuDRpuo">'
+                    f"{''.join(self._card(a) for a in latest)}</div>",
+                    lang="en",
+                )
+            )
+        if p.startswith("/category/"):
+            cat, _, tail = p[len("/category/") :].partition("/page/")
+            page = int(tail) if tail.isdigit() else 1
+            # 親カテゴリの一覧には子カテゴリの記事も出る（asia/world/video は出さない）
+            arts = [
+                a
+                for a in self.articles
+                if (a.section == cat or a.section.startswith(cat + "/"))
+                and not a.section.startswith(IRRAWADDY_EXCLUDED)
+            ]
+            chunk = self.paginate(arts, page)
+            if chunk is None:
+                return self.not_found()
+            return self.html(
+                _page(
+                    "<title>Category</title>",
+                    f'<div class="jeg_header"><ul>{_nav()}</ul></div>'
+                    f'<div class="jeg_content">{"".join(self._card(a) for a in chunk)}</div>',
+                    lang="en",
+                )
+            )
+        amp = path.endswith("/amp")
+        a = self.article_for(path[: -len("/amp")] if amp else path)
+        if not a:
+            return self.not_found()
+        paras = self.corpus.paragraphs(a)
+        half = len(paras) // 2
+        body = (
+            _ps(paras[:half])
+            + f'<div class="jnews_inline_related_post"><p>READ MORE: {html.escape(EN_FILL[0])}</p></div>'
+            + _ps(paras[half:])
+        )
+        head = (
+            f"<title>{html.escape(a.title)}</title>"
+            f'<meta property="article:published_time" content="{a.dt.isoformat()}">'
+            f'<link rel="canonical" href="{self.base}{a.path}">'
+        )
+        return self.html(
+            _page(
+                head,
+                f'<div class="jeg_main_content"><h1 class="jeg_post_title">{html.escape(a.title)}</h1>'
+                f'<div class="content-inner ">{body}</div>'
+                f'<div class="jnews_related_post_container">{_ps(EN_KW)}</div></div>',
+                amp=amp,
+                lang="en",
+            )
+        )
+
+
+def _next_data(page_props):
+    """Next.js と同じく <, >, & を \\u エスケープして埋め込む（</script> で切れないように）"""
+    raw = json.dumps(
+        {"props": {"pageProps": page_props}, "page": "/", "buildId": "mock"},
+        ensure_ascii=False,
+    )
+    for ch in "<>&":
+        raw = raw.replace(ch, f"\\u{ord(ch):04x}")
+    return f'<script id="__NEXT_DATA__" type="application/json">{raw}</script>'
+
+
+def _post_json(a):
+    return {
+        "id": a.id,
+        "title": a.title,
+        "slug": a.path.rsplit("/", 1)[-1],
+        "published_at": a.dt.astimezone(timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z"),
+    }
+
+
+class DvbSite(MockSite):
+    def __init__(self, *args, next_data=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.next_data = next_data
+
+    def route(self, path, query):
+        if path.rstrip("/") == "/category/8/news":
+            page = int((query.get("page") or ["1"])[0])
+            chunk = self.paginate(self.articles, page)
+            if chunk is None:
+                return self.not_found()
+            cards = "".join(
+                f'<a href="{a.path}" class="block"><img src="/d/{a.id}.jpg"><h3>{html.escape(a.title)}</h3>'
+                f'<div class="flex gap-1 text-xs mt-2 text-gray-500"><div>{_en_date(a.day)}</div></div></a>'
+                for a in chunk
+            )
+            data = ""
+            if self.next_data:
+                data = _next_data(
+                    {
+                        "posts": [_post_json(a) for a in chunk],
+                        "popular": [_post_json(a) for a in self.articles[:5]],
+                    }
+                )
+            return self.html(
+                _page(
+                    "<title>DVB</title>",
+                    f'<div id="__next"><nav class="flex">{_nav()}</nav>'
+                    f'<div class="md:grid grid-cols-3 gap-4 mt-5">{cards}</div></div>{data}',
+                )
+            )
+        amp = path.endswith("/amp") or (query.get("output") or [""])[0] == "amp"
+        a = self.article_for(path[: -len("/amp")] if path.endswith("/amp") else path)
+        if not a:
+            return self.not_found()
+        content = _ps(self.corpus.paragraphs(a))
+        data = ""
+        if self.next_data and not amp:
+            data = _next_data({"post": {**_post_json(a), "content": content}})
+        return self.html(
+            _page(
+                f"<title>{html.escape(a.title)}</title>",
+                f'<div id="__next"><nav class="flex">{_nav()}</nav>'
+                f'<h1 class="text-2xl">{html.escape(a.title)}</h1>'
+                f'<div class="full_content">{content}</div></div>{data}',
+                amp=amp,
+            )
+        )
+
+
+class BbcSite(MockSite):
+    def __init__(self, *args, rss_hours=48, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rss_hours = rss_hours
+        self._rss = None
+
+    def rss(self):
+        if self._rss is None:
+            horizon = self.articles[0].dt - timedelta(hours=self.rss_hours)
+            items = "".join(
+                f"<item><title><![CDATA[{a.title}]]></title>"
+                f"<description><![CDATA[{MY_FILL[a.id % len(MY_FILL)]}]]></description>"
+                f"<link>{self.base}{a.path}</link>"
+                f'<guid isPermaLink="false">{a.path}</guid>'
+                f"<pubDate>{email.utils.format_datetime(a.dt.astimezone(timezone.utc), usegmt=True)}</pubDate></item>"
+                for a in self.articles
+                if a.dt >= horizon
+            )
+            body = (
+                '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>BBC News မြန်မာ</title>{items}</channel></rss>"
+            ).encode("utf-8")
+            self._rss = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+        return self._rss
+
+    def route(self, path, query, headers=None):
+        if path == "/rss.xml":
+            body, etag = self.rss()
+            if headers and headers.get("If-None-Match") == etag:
+                return 304, b"", None, {"ETag": etag}
+            return 200, body, "application/rss+xml; charset=utf-8", {"ETag": etag}
+        a = self.article_for(path)
+        if not a:
+            return self.not_found()
+        return self.html(
+            _page(
+                f"<title>{html.escape(a.title)} - BBC News မြန်မာ</title>",
+                f'<header role="banner"><p>BBC News မြန်မာ</p><ul>{_nav()}</ul></header>'
+                f'<main role="main"><h1>{html.escape(a.title)}</h1>'
+                '<section role="region" aria-labelledby="article-byline"><p>BBC News မြန်မာ</p></section>'
+                f"{_ps(self.corpus.paragraphs(a))}"
+                f'<section data-e2e="recommendations-heading" role="region">{_ps(MY_KW)}</section></main>'
+                '<footer role="contentinfo"><p>© BBC</p></footer>',
+            )
+        )
+
+
+SITE_CLASSES = {
+    "mizzima": MizzimaSite,
+    "khit_thit": KhitThitSite,
+    "irrawaddy": IrrawaddySite,
+    "dvb": DvbSite,
+    "bbc": BbcSite,
+}
+
+
+# ===== HTTP =====
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)$")
+SEND_CHUNK = 8192
+
+
+def _page_tail(nbytes):
+    """本文のあとに続くフッタ・関連記事・スクリプト（実サイトでは数百 KB になる）"""
+    links = "".join(
+        f'<li><a href="/related/{i}">{html.escape(EN_FILL[i % len(EN_FILL)])}</a></li>'
+        for i in range(20)
+    )
+    head = f'<footer class="site-footer"><ul>{links}</ul></footer><script>'
+    pad = max(0, nbytes - len(head) - len("</script>"))
+    return f"{head}{'/*' + 'x' * max(0, pad - 4) + '*/'}</script>".encode()
+
+
+class _QuietServer(ThreadingHTTPServer):
+    """流し読みのクライアントが途中で閉じたときの ConnectionReset / BrokenPipe は黙って捨てる"""
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class SiteServer:
+    """
+    1サイト1ポート。リクエストごとに遅延 → エラー抽選 → ルーティング。
+    block_canonical なら記事の正規URLは常に 403（/amp 側だけ通る）。
+    200 の応答は Range: bytes=a-b に 206 で答える（honor_range=False なら無視して全体を返す）。
+    送ったバイト数は実際に書けた分だけ数える（クライアントが途中で閉じたら残りは数えない）。
+    page_tail > 0 なら記事ページの </body> の前に、その長さのフッタ・スクリプト相当の埋め草を足す。
+    """
+
+    def __init__(
+        self,
+        site,
+        *,
+        latency="0",
+        errors=None,
+        block_canonical=False,
+        honor_range=True,
+        page_tail=0,
+        seed=None,
+        host="127.0.0.1",
+        port=0,
+    ):
+        self.site = site
+        self.sample_latency = parse_latency(latency)
+        self.errors = dict(errors or {})
+        self.block_canonical = block_canonical
+        self.honor_range = honor_range
+        self.page_tail = page_tail
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = _QuietServer((host, port), Handler)
+        self.base = f"http://{host}:{self.httpd.server_address[1]}"
+        site.base = self.base
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def _draw(self):
+        with self._lock:
+            latency = self.sample_latency(self.rng)
+            for kind, rate in self.errors.items():
+                if self.rng.random() < rate:
+                    return latency, kind
+            return latency, None
+
+    def _count(self, *keys, nbytes=0):
+        with self._lock:
+            for k in keys:
+                self.stats[k] += 1
+            self.bytes_sent += nbytes
+
+    def handle(self, req):
+        parsed = urllib.parse.urlsplit(req.path)
+        path = urllib.parse.unquote(parsed.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        latency, fault = self._draw()
+        if latency > 0:
+            time.sleep(latency)
+
+        is_amp = (
+            path.rstrip("/").endswith("/amp")
+            or (query.get("output") or [""])[0] == "amp"
+        )
+        is_article = not is_amp and self.site.article_for(path) is not None
+        if fault is None and self.block_canonical and is_article:
+            fault = "403"
+        if fault == "reset":
+            self._count("requests", "error:reset")
+            req.close_connection = True
+            with contextlib.suppress(Exception):
+                req.connection.shutdown(2)
+            return
+        if fault:
+            headers = {}
+            if fault in ("429", "503"):
+                headers["Retry-After"] = str(self.rng.randint(1, 5))
+            body = CHALLENGE if fault == "403" else b"error"
+            return self._send(
+                req, int(fault), body, "text/html", headers, f"error:{fault}"
+            )
+
+        if path.startswith("/wp-json/") or path.endswith("sitemap.xml"):
+            status, body, ctype, headers = self.site.wp_route(path, query)
+            kind = "wp"
+        elif isinstance(self.site, BbcSite):
+            status, body, ctype, headers = self.site.route(path, query, req.headers)
+            kind = "rss" if path == "/rss.xml" else "article"
+        else:
+            status, body, ctype, headers = self.site.route(path, query)
+            kind = "article" if is_article else "amp" if is_amp else "listing"
+            if self.page_tail and status == 200 and kind != "listing":
+                body = body.replace(
+                    b"</body>", _page_tail(self.page_tail) + b"</body>", 1
+                )
+        self._send(req, status, body, ctype, headers, f"{kind}:{status}")
+
+    def _send(self, req, status, body, ctype, headers, stat_key):
+        headers = dict(headers or {})
+        m = _RANGE_RE.match(req.headers.get("Range") or "")
+        if m and status == 200 and self.honor_range and body:
+            start = int(m.group(1))
+            end = min(int(m.group(2) or len(body) - 1), len(body) - 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            status, body = 206, body[start : end + 1]
+            stat_key = stat_key.replace(":200", ":206")
+        self._count("requests", stat_key)
+        req.send_response(status)
+        if ctype:
+            req.send_header("Content-Type", ctype)
+        for k, v in headers.items():
+            req.send_header(k, v)
+        req.send_header("Content-Length", str(len(body)))
+        req.end_headers()
+        for i in range(0, len(body), SEND_CHUNK):
+            try:
+                req.wfile.write(body[i : i + SEND_CHUNK])
+            except (BrokenPipeError, ConnectionResetError):
+                req.close_connection = True
+                return
+            self._count(nbytes=len(body[i : i + SEND_CHUNK]))
+
+    def reset_counters(self):
+        with self._lock:
+            self.stats.clear()
+            self.bytes_sent = 0
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_servers(corpus, args, sites=None, port_base=0):
+    per_site_errors = {}
+    for spec in args.errors_for or []:
+        site, _, rates = spec.partition("=")
+        per_site_errors[site] = parse_rates(rates, ERROR_KINDS)
+    default_errors = parse_rates(args.errors, ERROR_KINDS)
+    blocked = set(filter(None, (args.block_canonical or "").split(",")))
+
+    servers = {}
+    for i, key in enumerate(sites or SITES):
+        site = SITE_CLASSES[key](
+            key,
+            corpus,
+            per_page=args.per_page,
+            max_pages=args.max_pages,
+            wp_json=args.wp_json,
+            **({"next_data": not args.dvb_dom_only} if key == "dvb" else {}),
+        )
+        servers[key] = SiteServer(
+            site,
+            latency=args.latency,
+            errors=per_site_errors.get(key, default_errors),
+            block_canonical=key in blocked,
+            honor_range=not args.no_range,
+            page_tail=args.page_tail_kb * 1024,
+            seed=None if args.seed is None else args.seed + i,
+            port=(port_base + i) if port_base else 0,
+        )
+    return servers
+
+
+def env_for(servers):
+    env = {}
+    for key, srv in servers.items():
+        if key == "bbc":
+            env["BBC_RSS_URL"] = f"{srv.base}/rss.xml"
+        else:
+            env[BASE_URL_ENV[key]] = srv.base
+    return env
+
+
+# ===== 通し実行 =====
+def run_collectors(args):
+    target = date.fromisoformat(args.date) if args.date else today_mmt()
+    corpus = Corpus(args.articles, args.days, target, args.seed or 0, args.kw_rate)
+    sites = args.sources.split(",") if args.sources else SITES
+    servers = start_servers(corpus, args, sites, port_base=args.port_base)
+
+    os.environ.update(env_for(servers))
+    os.environ["SUMMARY_CACHE"] = "0"
+    # --state-dir を指定すると実行をまたいで学習状態（収穫履歴など）を引き継ぐ
+    os.environ["DIGEST_STATE_DIR"] = args.state_dir or tempfile.mkdtemp(
+        prefix="mock_sites_state_"
+    )
+    sys.path.insert(0, HERE)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import fetch_articles as fa
+
+    # リトライ・バックオフ待ちは time_scale 倍に縮める（待った秒数は理由ごとに数える）
+    slept = Counter()
+    real_sleep = fa.traced_sleep
+
+    def _scaled_sleep(seconds, reason):
+        slept[reason] += seconds
+        real_sleep(seconds * args.time_scale, reason)
+
+    fa.traced_sleep = _scaled_sleep
+    log = open(args.log, "w", encoding="utf-8") if args.log else io.StringIO()
+    rows = []
+    specs = [spec for spec in fa.SOURCE_SPECS if spec["key"] in servers]
+    # --seen：本番の run と同じく処理済み URL を引く（同じ --state-dir で2回流すと再実行を再現できる）
+    seen = fa.seen_urls_for(target) if args.seen else contextlib.nullcontext()
+    try:
+        # --deadline は本番の run と同じ割り振り（収集に COLLECT_SHARE、残りをソースで等分）
+        with seen as store, fa.time_budget("run", args.deadline), fa.time_budget(
+            "collect", share=fa.COLLECT_SHARE
+        ):
+            for i, spec in enumerate(specs):
+                key = spec["key"]
+                srv = servers[key]
+                srv.reset_counters()
+                slept.clear()
+                queue = store.queued(spec["name"]) if store else []
+                seen_urls = {fa._norm_id(art.url) for art in queue}
+                t0 = time.perf_counter()
+                with contextlib.redirect_stdout(log), fa.time_budget(
+                    spec["name"], share=1.0 / (len(specs) - i)
+                ):
+                    print(f"=== {spec['name']} ===")
+                    with fa.time_budget(spec["name"], share=fa.SOURCE_COLLECT_SHARE):
+                        articles = spec["collect"](target, args.depth_days)
+                    t1 = time.perf_counter()
+                    fa.process_and_enqueue_articles(
+                        articles,
+                        spec["name"],
+                        seen_urls,
+                        queue=queue,
+                        **spec["enqueue"],
+                    )
+                t2 = time.perf_counter()
+                rows.append(
+                    {
+                        "source": key,
+                        "eligible": len(corpus.eligible(key, target)),
+                        "collected": len(articles),
+                        "queued": len(queue),
+                        "requests": srv.stats["requests"],
+                        "bytes": srv.bytes_sent,
+                        "errors": sum(
+                            v for k, v in srv.stats.items() if k.startswith("error:")
+                        ),
+                        "stats": dict(srv.stats),
+                        "collect_s": t1 - t0,
+                        "enqueue_s": t2 - t1,
+                        "slept_s": dict(slept),
+                    }
+                )
+    finally:
+        fa.traced_sleep = real_sleep
+        if args.log:
+            log.close()
+        for srv in servers.values():
+            srv.close()
+
+    print(
+        f"target={target} corpus={args.articles}/site x {args.days} days "
+        f"per_page={args.per_page} max_pages={args.max_pages} wp_json={args.wp_json}"
+    )
+    print(
+        f"{'source':<10} {'eligible':>8} {'collect':>7} {'queued':>6} {'reqs':>5} "
+        f"{'errors':>6} {'MB':>6} {'coll s':>7} {'enq s':>6} {'slept s':>7}"
+    )
+    for r in rows:
+        print(
+            f"{r['source']:<10} {r['eligible']:>8} {r['collected']:>7} {r['queued']:>6} "
+            f"{r['requests']:>5} {r['errors']:>6} {r['bytes'] / 1e6:>6.2f} "
+            f"{r['collect_s']:>7.2f} {r['enqueue_s']:>6.2f} {sum(r['slept_s'].values()):>7.1f}"
+        )
+    if args.verbose:
+        for r in rows:
+            print(f"  {r['source']}: {dict(sorted(r['stats'].items()))}")
+    for line in fa.cut_summary_lines():
+        print(f"⏱ cut: {line}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"target": target.isoformat(), "rows": rows},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"📝 saved → {args.json}")
+    return rows
+
+
+def serve(args):
+    target = date.fromisoformat(args.date) if args.date else today_mmt()
+    corpus = Corpus(args.articles, args.days, target, args.seed or 0, args.kw_rate)
+    sites = args.sources.split(",") if args.sources else SITES
+    servers = start_servers(corpus, args, sites, port_base=args.port_base)
+    print(f"# corpus: {args.articles} articles/site, {args.days} days up to {target}")
+    for k, v in env_for(servers).items():
+        print(f"export {k}={v}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for key, srv in servers.items():
+            print(f"{key}: {dict(sorted(srv.stats.items()))}")
+            srv.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def _common(p):
+        p.add_argument("--date", help="対象日（MMT, YYYY-MM-DD。既定: 今日）")
+        p.add_argument("--articles", type=int, default=2000, help="サイトごとの記事数")
+        p.add_argument("--days", type=int, default=14, help="記事を散らす日数")
+        p.add_argument(
+            "--kw-rate", type=float, default=0.5, help="キーワードを含む記事の割合"
+        )
+        p.add_argument("--seed", type=int)
+        p.add_argument("--sources", help="カンマ区切り（既定: 全サイト）")
+        p.add_argument("--latency", default="0", help="例: uniform:0.05,0.3")
+        p.add_argument(
+            "--errors", default="", help="例: 403=0.02,429=0.02,503=0.02,reset=0.01"
+        )
+        p.add_argument(
+            "--errors-for",
+            action="append",
+            metavar="SITE=RATES",
+            help="サイト別のエラー率（例: irrawaddy=403=0.3）",
+        )
+        p.add_argument(
+            "--block-canonical",
+            default="",
+            help="記事の正規URLを常に 403 にするサイト（/amp だけ通る。例: irrawaddy,dvb）",
+        )
+        p.add_argument(
+            "--no-range",
+            action="store_true",
+            help="Range を無視して常に全体を返す（下見の </head> 打ち切りの確認用）",
+        )
+        p.add_argument(
+            "--page-tail-kb",
+            type=int,
+            default=0,
+            help="記事ページの本文のあとに足す埋め草（KB。流し読みの打ち切りの確認用）",
+        )
+        p.add_argument("--per-page", type=int, default=12, help="一覧1ページの件数")
+        p.add_argument(
+            "--max-pages", type=int, default=50, help="一覧を何ページまで返すか"
+        )
+        p.add_argument(
+            "--wp-json",
+            action="store_true",
+            help="/wp-json と news sitemap を有効にする",
+        )
+        p.add_argument(
+            "--dvb-dom-only",
+            action="store_true",
+            help="DVB のページに __NEXT_DATA__ を埋め込まない（DOM 抽出の確認用）",
+        )
+
+    p = sub.add_parser("serve", help="模擬サイトを起動して環境変数を表示")
+    _common(p)
+    p.add_argument("--port-base", type=int, default=8801)
+
+    p = sub.add_parser("run", help="全コレクタを模擬サイトに向けて collect → enqueue")
+    _common(p)
+    p.add_argument(
+        "--port-base", type=int, default=0, help="固定ポート（0 なら空いているポート）"
+    )
+    p.add_argument("--depth-days", type=int, default=1)
+    p.add_argument("--time-scale", type=float, default=1.0, help="リトライ待ちの倍率")
+    p.add_argument("--log", help="パイプラインのログ出力先（既定: 捨てる）")
+    p.add_argument("--json", help="結果を JSON で保存")
+    p.add_argument(
+        "--deadline", type=float, help="全体の制限時間（秒）。収集はその COLLECT_SHARE"
+    )
+    p.add_argument(
+        "--state-dir", help="DIGEST_STATE_DIR（既定: 毎回新しい一時ディレクトリ）"
+    )
+    p.add_argument(
+        "--seen",
+        action="store_true",
+        help="処理済み URL（seen_urls.sqlite）を使う。同じ --state-dir で再実行を確認",
+    )
+    p.add_argument("-v", "--verbose", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        return serve(args)
+    run_collectors(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())